@@ -8,6 +8,8 @@ from .models import (
     ModuleAssignment,
     QuizAssignment,
     ScheduledMessage,
+    ClassroomDayProgress,
+    ExportJob,
 )
 
 @admin.register(CustomUser)
@@ -43,3 +45,13 @@ class ScheduledMessageAdmin(admin.ModelAdmin):
     list_display  = ('classroom', 'subject', 'scheduled_time', 'sent', 'sent_at')
     list_filter   = ('classroom', 'sent')
     search_fields = ('subject',)
+
+@admin.register(ClassroomDayProgress)
+class ClassroomDayProgressAdmin(admin.ModelAdmin):
+    list_display  = ('classroom', 'day', 'completed', 'updated_at')
+    list_filter   = ('classroom', 'day')
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display  = ('owner', 'kind', 'status', 'created_at', 'finished_at')
+    list_filter   = ('kind', 'status')
@@ -0,0 +1,149 @@
+# classroom_admin/analytics.py
+import numpy as np
+from django.db.models import Avg, Count, F, Max, Min
+
+from student_activities.models import StudentResponse, QuizAttempt
+from .models import Classroom
+from .progress import DAYS
+
+# Quiz scores are stored as a fraction correct (0.0 – 1.0)
+MAX_SCORE      = 1.0
+PERCENTILES    = (10, 25, 50, 75, 90)
+HISTOGRAM_BINS = 10
+
+
+def score_summary(scores):
+    """
+    Constant-size summary of a 1-D array of scores.
+    """
+    count = int(scores.size)
+    edges = np.linspace(0.0, MAX_SCORE, HISTOGRAM_BINS + 1)
+    counts, _ = np.histogram(np.clip(scores, 0.0, MAX_SCORE), bins=edges)
+    summary = {
+        'count':       count,
+        'average':     float(scores.mean()) if count else 0,
+        'median':      None,
+        'std':         None,
+        'min':         None,
+        'max':         None,
+        'percentiles': {f'p{p}': None for p in PERCENTILES},
+        'histogram':   {
+            'edges':  [round(float(e), 4) for e in edges],
+            'counts': counts.tolist(),
+        },
+    }
+    if count:
+        values = np.percentile(scores, PERCENTILES)
+        summary.update({
+            'median':      float(np.median(scores)),
+            'std':         float(scores.std()),
+            'min':         float(scores.min()),
+            'max':         float(scores.max()),
+            'percentiles': {f'p{p}': float(v) for p, v in zip(PERCENTILES, values)},
+        })
+    return summary
+
+
+def normalized_gain(pre_ids, pre_scores, post_ids, post_scores):
+    """
+    Hake's normalized gain, g = (post - pre) / (MAX_SCORE - pre), over students
+    with both attempts. Students who already had a perfect pre score are excluded
+    from the per-student average because their gain is undefined.
+    """
+    _, pre_idx, post_idx = np.intersect1d(pre_ids, post_ids, assume_unique=True, return_indices=True)
+    pre, post = pre_scores[pre_idx], post_scores[post_idx]
+    result = {'pairs': int(pre.size), 'average_gain': None, 'class_gain': None, 'average_change': None}
+    if not pre.size:
+        return result
+
+    headroom = MAX_SCORE - pre
+    defined = headroom > 0
+    if defined.any():
+        result['average_gain'] = float(((post[defined] - pre[defined]) / headroom[defined]).mean())
+    if MAX_SCORE - pre.mean() > 0:
+        result['class_gain'] = float((post.mean() - pre.mean()) / (MAX_SCORE - pre.mean()))
+    result['average_change'] = float((post - pre).mean())
+    return result
+
+
+def quiz_overview(classroom_id):
+    """
+    Pre/post summaries and paired gain for one classroom from a single fetch.
+    """
+    rows = list(
+        QuizAttempt.objects.filter(student__student_profile__classroom=classroom_id)
+        .values_list('student_id', 'quiz_type', 'score')
+    )
+    if rows:
+        student_ids, quiz_types, scores = zip(*rows)
+    else:
+        student_ids, quiz_types, scores = (), (), ()
+    student_ids = np.asarray(student_ids, dtype=np.int64)
+    quiz_types  = np.asarray(quiz_types, dtype=object)
+    scores      = np.asarray(scores, dtype=np.float64)
+
+    is_pre  = quiz_types == QuizAttempt.PRE
+    is_post = quiz_types == QuizAttempt.POST
+    return {
+        QuizAttempt.PRE:  score_summary(scores[is_pre]),
+        QuizAttempt.POST: score_summary(scores[is_post]),
+        'gain': normalized_gain(
+            student_ids[is_pre], scores[is_pre], student_ids[is_post], scores[is_post]
+        ),
+    }
+
+
+def teacher_overview(teacher, since=None, until=None):
+    """
+    Completion and quiz stats for every classroom `teacher` owns.
+    Three queries in total: classrooms, one GROUP BY (classroom, day) over
+    responses and one GROUP BY (classroom, quiz_type) over quiz attempts.
+    `since`/`until` bound completed_at and timestamp (until is exclusive).
+    """
+    classrooms = list(
+        Classroom.objects.filter(teacher=teacher)
+        .annotate(total_students=Count('students'))
+        .order_by('name')
+        .values('id', 'name', 'total_students')
+    )
+
+    responses = StudentResponse.objects.filter(student__student_profile__classroom__teacher=teacher)
+    attempts  = QuizAttempt.objects.filter(student__student_profile__classroom__teacher=teacher)
+    if since:
+        responses = responses.filter(completed_at__gte=since)
+        attempts  = attempts.filter(timestamp__gte=since)
+    if until:
+        responses = responses.filter(completed_at__lt=until)
+        attempts  = attempts.filter(timestamp__lt=until)
+
+    completed = {
+        (row['classroom'], row['day']): row['completed']
+        for row in responses.values(
+            classroom=F('student__student_profile__classroom'), day=F('module__day')
+        ).annotate(completed=Count('id')).order_by()
+    }
+    quizzes = {
+        (row['classroom'], row['quiz_type']): row
+        for row in attempts.values(
+            'quiz_type', classroom=F('student__student_profile__classroom')
+        ).annotate(
+            count=Count('id'), average=Avg('score'), min=Min('score'), max=Max('score')
+        ).order_by()
+    }
+
+    empty_quiz = {'count': 0, 'average': 0, 'min': None, 'max': None}
+    result = []
+    for c in classrooms:
+        total = c['total_students']
+        by_day = []
+        for day in DAYS:
+            n = completed.get((c['id'], day), 0)
+            by_day.append({'day': day, 'completed': n, 'percent': (n / total * 100) if total else 0})
+        quiz_stats = {}
+        for qtype in (QuizAttempt.PRE, QuizAttempt.POST):
+            row = quizzes.get((c['id'], qtype))
+            quiz_stats[qtype] = (
+                {k: row[k] for k in ('count', 'average', 'min', 'max')} if row else dict(empty_quiz)
+            )
+        result.append({**c, 'by_day': by_day, 'quizzes': quiz_stats})
+    return result
@@ -14,10 +14,16 @@ from .api_views import (
     ScheduledMessageSendNowAPIView,
     ClassroomProgressAPIView,
     ClassroomQuizOverviewAPIView,
+    ClassroomQuizItemAnalysisAPIView,
+    ClassroomDashboardAPIView,
+    TeacherAnalyticsAPIView,
     StudentDetailAPIView,
     ClassroomRosterExportAPIView,
     ClassroomProgressExportAPIView,
     ClassroomQuizExportAPIView,
+    ExportJobCreateAPIView,
+    ExportJobDetailAPIView,
+    ExportJobDownloadAPIView,
 )
 
 urlpatterns = [
@@ -45,10 +51,18 @@ urlpatterns = [
     # Reporting
     path('classrooms/<int:pk>/progress/',                   ClassroomProgressAPIView.as_view(),       name='teacher-classroom-progress'),
     path('classrooms/<int:pk>/quizzes/',                    ClassroomQuizOverviewAPIView.as_view(),   name='teacher-classroom-quizzes'),
+    path('classrooms/<int:pk>/quizzes/<str:quiz_type>/items/', ClassroomQuizItemAnalysisAPIView.as_view(), name='teacher-classroom-quiz-items'),
+    path('classrooms/<int:pk>/dashboard/',                  ClassroomDashboardAPIView.as_view(),      name='teacher-classroom-dashboard'),
+    path('analytics/',                                      TeacherAnalyticsAPIView.as_view(),        name='teacher-analytics'),
     path('classrooms/<int:pk>/students/<int:student_id>/details/', StudentDetailAPIView.as_view(),      name='teacher-student-details'),
 
     # CSV Exports
     path('classrooms/<int:pk>/export/roster/',              ClassroomRosterExportAPIView.as_view(),   name='teacher-export-roster'),
     path('classrooms/<int:pk>/export/progress/',            ClassroomProgressExportAPIView.as_view(), name='teacher-export-progress'),
     path('classrooms/<int:pk>/export/quizzes/',             ClassroomQuizExportAPIView.as_view(),     name='teacher-export-quizzes'),
+
+    # Asynchronous export jobs
+    path('exports/',                                        ExportJobCreateAPIView.as_view(),         name='teacher-export-job-create'),
+    path('exports/<int:pk>/',                               ExportJobDetailAPIView.as_view(),         name='teacher-export-job-detail'),
+    path('exports/<int:pk>/download/',                      ExportJobDownloadAPIView.as_view(),       name='teacher-export-job-download'),
 ]
@@ -1,5 +1,6 @@
-import csv
-from django.http import HttpResponse
+from django.db.models import Count, F
+from django.db import transaction
+from django.http import FileResponse
 from django.shortcuts import get_object_or_404
 from django.utils import timezone
 from drf_yasg.utils import swagger_auto_schema
@@ -8,6 +9,7 @@ from rest_framework import generics, status
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import BasePermission
+from rest_framework.pagination import PageNumberPagination
 
 from .models import (
     Classroom,
@@ -15,6 +17,7 @@ from .models import (
     ModuleAssignment,
     QuizAssignment,
     ScheduledMessage,
+    ExportJob,
 )
 from student_activities.models import StudentResponse, QuizAttempt, Message
 from .serializers import (
@@ -24,8 +27,15 @@ from .serializers import (
     ModuleAssignmentSerializer,
     QuizAssignmentSerializer,
     ScheduledMessageSerializer,
+    ExportJobSerializer,
+    AnalyticsRangeSerializer,
 )
-from .tasks import schedule_message_task, send_scheduled_message_task
+from .tasks import send_scheduled_message_task
+from .progress import progress_by_day
+from .analytics import quiz_overview, teacher_overview
+from .item_analysis import item_report
+from .export_jobs import request_export
+from .exports import csv_response, ROSTER_COLUMNS, PROGRESS_COLUMNS, QUIZ_COLUMNS
 
 
 class IsTeacherUser(BasePermission):
@@ -81,7 +91,7 @@ class RosterListAPIView(generics.ListAPIView):
 
     def get_queryset(self):
         classroom = get_object_or_404(Classroom, pk=self.kwargs['pk'], teacher=self.request.user)
-        return Student.objects.filter(classroom=classroom)
+        return Student.objects.filter(classroom=classroom).select_related('user')
 
 
 class RosterAddAPIView(APIView):
@@ -208,8 +218,10 @@ class ScheduledMessageListCreateAPIView(generics.ListCreateAPIView):
     def perform_create(self, serializer):
         classroom = get_object_or_404(Classroom, pk=self.kwargs['pk'], teacher=self.request.user)
         msg = serializer.save(classroom=classroom)
-        # schedule via Celery
-        schedule_message_task.apply_async((msg.id,), eta=msg.scheduled_time)
+        # future messages are picked up by the dispatch_due_messages beat task;
+        # ones that are already due go out straight away
+        if msg.scheduled_time <= timezone.now():
+            transaction.on_commit(lambda: send_scheduled_message_task.delay(msg.id))
 
 
 class ScheduledMessageSendNowAPIView(APIView):
@@ -235,40 +247,103 @@ class ClassroomProgressAPIView(APIView):
         responses={200: openapi.Response('Progress by day')}
     )
     def get(self, request, pk):
-        classroom = get_object_or_404(Classroom, pk=pk, teacher=self.request.user)
-        total_students = classroom.students.count()
-        data = []
-        for day in range(1, 6):
-            completed = StudentResponse.objects.filter(
-                student__student_profile__classroom=classroom,
-                module__day=day
-            ).count()
-            percent = (completed / total_students * 100) if total_students else 0
-            data.append({'day': day, 'completed': completed, 'percent': percent})
-        return Response({'total_students': total_students, 'by_day': data})
+        classroom = get_object_or_404(
+            Classroom.objects.annotate(total_students=Count('students')),
+            pk=pk, teacher=self.request.user
+        )
+        data = progress_by_day(classroom.pk, classroom.total_students)
+        return Response({'total_students': classroom.total_students, 'by_day': data})
 
 
 class ClassroomQuizOverviewAPIView(APIView):
     permission_classes = [IsTeacherUser]
 
     @swagger_auto_schema(
-        operation_summary="Get class-average and all scores for pre/post quizzes",
+        operation_summary="Get score statistics and normalized gain for pre/post quizzes",
+        manual_parameters=[
+            openapi.Parameter(
+                'scores', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=[QuizAttempt.PRE, QuizAttempt.POST],
+                description="Also return a page of raw scores for this quiz type"
+            ),
+            openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER),
+        ],
         responses={200: openapi.Response('Quiz overview')}
     )
     def get(self, request, pk):
         classroom = get_object_or_404(Classroom, pk=pk, teacher=self.request.user)
-        result = {}
-        for qtype in [QuizAttempt.PRE, QuizAttempt.POST]:
+        result = quiz_overview(classroom.pk)
+
+        qtype = request.query_params.get('scores')
+        if qtype in (QuizAttempt.PRE, QuizAttempt.POST):
             attempts = QuizAttempt.objects.filter(
                 student__student_profile__classroom=classroom,
                 quiz_type=qtype
-            )
-            scores = list(attempts.values_list('score', flat=True))
-            avg = sum(scores) / len(scores) if scores else 0
-            result[qtype] = {'average': avg, 'scores': scores}
+            ).order_by('id').values('student_id', 'score')
+            paginator = PageNumberPagination()
+            page = paginator.paginate_queryset(attempts, request, view=self)
+            result['scores'] = paginator.get_paginated_response(page).data
         return Response(result)
 
 
+class ClassroomQuizItemAnalysisAPIView(APIView):
+    permission_classes = [IsTeacherUser]
+
+    @swagger_auto_schema(
+        operation_summary="Get per-question difficulty, discrimination and distractor counts",
+        responses={200: openapi.Response('Item analysis'), 404: 'Unknown quiz type'}
+    )
+    def get(self, request, pk, quiz_type):
+        if quiz_type not in (QuizAttempt.PRE, QuizAttempt.POST):
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        classroom = get_object_or_404(Classroom, pk=pk, teacher=request.user)
+        return Response(item_report(classroom.pk, quiz_type))
+
+
+class ClassroomDashboardAPIView(APIView):
+    permission_classes = [IsTeacherUser]
+
+    @swagger_auto_schema(
+        operation_summary="Get classroom detail, roster, progress, quiz overview and scheduled messages in one call",
+        responses={200: openapi.Response('Classroom dashboard')}
+    )
+    def get(self, request, pk):
+        # Five queries regardless of roster size: classroom (+ student count),
+        # roster (+ users), progress rollup, quiz scores, scheduled messages.
+        classroom = get_object_or_404(
+            Classroom.objects.annotate(total_students=Count('students')),
+            pk=pk, teacher=request.user
+        )
+        roster = Student.objects.filter(classroom=classroom).select_related('user').order_by('user_id')
+        messages = ScheduledMessage.objects.filter(classroom=classroom).order_by('scheduled_time')
+        return Response({
+            'classroom': ClassroomSerializer(classroom).data,
+            'roster':    RosterStudentSerializer(roster, many=True).data,
+            'progress':  {
+                'total_students': classroom.total_students,
+                'by_day':         progress_by_day(classroom.pk, classroom.total_students),
+            },
+            'quizzes':   quiz_overview(classroom.pk),
+            'scheduled_messages': ScheduledMessageSerializer(
+                messages, many=True, context={'request': request}
+            ).data,
+        })
+
+
+class TeacherAnalyticsAPIView(APIView):
+    permission_classes = [IsTeacherUser]
+
+    @swagger_auto_schema(
+        operation_summary="Get completion and quiz stats for all of your classrooms",
+        query_serializer=AnalyticsRangeSerializer,
+        responses={200: openapi.Response('Per-classroom analytics')}
+    )
+    def get(self, request):
+        params = AnalyticsRangeSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        classrooms = teacher_overview(request.user, **params.validated_data)
+        return Response({'classrooms': classrooms})
+
+
 class StudentDetailAPIView(APIView):
     permission_classes = [IsTeacherUser]
 
@@ -287,7 +362,8 @@ class StudentDetailAPIView(APIView):
             'quiz_type', 'score', 'attempt_data', 'timestamp'
         )
         inbox = Message.objects.filter(recipient=profile.user).values(
-            'subject', 'body', 'timestamp', 'is_read'
+            'timestamp', 'is_read',
+            subject=F('content__subject'), body=F('content__body'),
         )
 
         return Response({
@@ -313,15 +389,8 @@ class ClassroomRosterExportAPIView(APIView):
     )
     def get(self, request, pk):
         classroom = get_object_or_404(Classroom, pk=pk, teacher=request.user)
-        students = Student.objects.filter(classroom=classroom)
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="roster_{classroom.name}.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['id', 'username', 'first_name', 'last_name'])
-        for s in students:
-            writer.writerow([s.user.id, s.user.username, s.first_name, s.last_name])
-        return response
+        students = Student.objects.filter(classroom=classroom).order_by('user_id')
+        return csv_response(f"roster_{classroom.name}.csv", ROSTER_COLUMNS, students)
 
 
 class ClassroomProgressExportAPIView(APIView):
@@ -332,21 +401,12 @@ class ClassroomProgressExportAPIView(APIView):
         responses={200: openapi.Response('CSV file')}
     )
     def get(self, request, pk):
-        classroom = get_object_or_404(Classroom, pk=pk, teacher=request.user)
-        total_students = classroom.students.count()
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="progress_{classroom.name}.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['day', 'completed', 'percent'])
-        for day in range(1, 6):
-            completed = StudentResponse.objects.filter(
-                student__student_profile__classroom=classroom,
-                module__day=day
-            ).count()
-            percent = (completed / total_students * 100) if total_students else 0
-            writer.writerow([day, completed, f"{percent:.1f}"])
-        return response
+        classroom = get_object_or_404(
+            Classroom.objects.annotate(total_students=Count('students')),
+            pk=pk, teacher=request.user
+        )
+        rows = progress_by_day(classroom.pk, classroom.total_students)
+        return csv_response(f"progress_{classroom.name}.csv", PROGRESS_COLUMNS, rows)
 
 
 class ClassroomQuizExportAPIView(APIView):
@@ -358,18 +418,58 @@ class ClassroomQuizExportAPIView(APIView):
     )
     def get(self, request, pk):
         classroom = get_object_or_404(Classroom, pk=pk, teacher=request.user)
-
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = f'attachment; filename="quizzes_{classroom.name}.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['quiz_type', 'student_id', 'username', 'score'])
-        for attempt in QuizAttempt.objects.filter(
+        attempts = QuizAttempt.objects.filter(
             student__student_profile__classroom=classroom
-        ):
-            writer.writerow([
-                attempt.quiz_type,
-                attempt.student.id,
-                attempt.student.username,
-                attempt.score
-            ])
-        return response
+        ).order_by('id')
+        return csv_response(f"quizzes_{classroom.name}.csv", QUIZ_COLUMNS, attempts)
+
+
+# — Asynchronous Export Jobs —
+class ExportJobCreateAPIView(generics.CreateAPIView):
+    permission_classes = [IsTeacherUser]
+    serializer_class = ExportJobSerializer
+
+    @swagger_auto_schema(
+        operation_summary="Start an export job (or reuse an up-to-date artifact)",
+        responses={200: ExportJobSerializer(), 202: ExportJobSerializer()}
+    )
+    def post(self, request):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        job, cached = request_export(request.user, serializer.validated_data['kind'])
+        code = status.HTTP_200_OK if cached else status.HTTP_202_ACCEPTED
+        return Response(self.get_serializer(job).data, status=code)
+
+
+class ExportJobDetailAPIView(generics.RetrieveAPIView):
+    permission_classes = [IsTeacherUser]
+    serializer_class = ExportJobSerializer
+
+    @swagger_auto_schema(
+        operation_summary="Poll the status of an export job",
+        responses={200: ExportJobSerializer()}
+    )
+    def get(self, request, *args, **kwargs):
+        return super().get(request, *args, **kwargs)
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(owner=self.request.user)
+
+
+class ExportJobDownloadAPIView(APIView):
+    permission_classes = [IsTeacherUser]
+
+    @swagger_auto_schema(
+        operation_summary="Download a finished export artifact",
+        responses={200: openapi.Response('ZIP archive'), 404: 'Not ready'}
+    )
+    def get(self, request, pk):
+        job = get_object_or_404(ExportJob, pk=pk, owner=request.user, status=ExportJob.DONE)
+        if not job.artifact:
+            return Response(status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(
+            job.artifact.open('rb'),
+            as_attachment=True,
+            filename=f"{job.kind}_export.zip",
+            content_type='application/zip',
+        )
@@ -0,0 +1,184 @@
+# classroom_admin/export_jobs.py
+import hashlib
+import tempfile
+import zipfile
+from datetime import timedelta
+
+from django.core.files import File
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from student_activities.models import StudentResponse, QuizAttempt
+from .models import Classroom, Student, ExportJob
+from .exports import iter_csv, ROSTER_COLUMNS, PROGRESS_COLUMNS, QUIZ_COLUMNS, RESPONSE_COLUMNS
+from .progress import progress_by_day
+from .research import write_research_archive
+
+
+# — Data versions —
+# A cheap fingerprint of everything an export reads: aggregates for the
+# large tables, a hash of the (small) roster. Any write that changes the
+# export also changes one of these values.
+def _fingerprint_students(classroom_ids):
+    # the exported name columns themselves, so renames change the version
+    digest = hashlib.sha256()
+    rows = (
+        Student.objects.filter(classroom__in=classroom_ids)
+        .order_by('user_id')
+        .values_list('user_id', 'classroom_id', 'user__username', 'first_name', 'last_name')
+    )
+    for row in rows.iterator():
+        digest.update(repr(row).encode())
+    return digest.hexdigest()
+
+
+def _fingerprint_responses(classroom_ids):
+    return StudentResponse.objects.filter(
+        student__student_profile__classroom__in=classroom_ids
+    ).aggregate(n=Count('id'), latest=Max('completed_at'))
+
+
+def _fingerprint_quizzes(classroom_ids):
+    return QuizAttempt.objects.filter(
+        student__student_profile__classroom__in=classroom_ids
+    ).aggregate(n=Count('id'), latest=Max('updated_at'), total=Sum('score'))
+
+
+def _classrooms(owner):
+    return list(Classroom.objects.filter(teacher=owner).order_by('id').values_list('id', 'name'))
+
+
+def data_version(kind, owner):
+    """
+    Hash identifying the data an export of `kind` for `owner` would contain.
+    """
+    classrooms = _classrooms(owner)
+    ids = [pk for pk, _ in classrooms]
+    parts = [kind, owner.pk, classrooms, _fingerprint_students(ids)]
+    parts += [_fingerprint_responses(ids)]
+    if kind in (ExportJob.CLASSROOMS, ExportJob.RESEARCH):
+        parts += [_fingerprint_quizzes(ids)]
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+# — Artifact writers —
+def _write_csv(archive, name, columns, rows):
+    with archive.open(name, 'w') as fh:
+        for chunk in iter_csv(columns, rows):
+            fh.write(chunk.encode())
+
+
+def write_classrooms(archive, owner):
+    classrooms = Classroom.objects.filter(teacher=owner).annotate(
+        total_students=Count('students')
+    ).order_by('id')
+    for classroom in classrooms:
+        folder = f"{classroom.pk}_{classroom.name}"
+        _write_csv(
+            archive, f"{folder}/roster.csv", ROSTER_COLUMNS,
+            Student.objects.filter(classroom=classroom).order_by('user_id'),
+        )
+        _write_csv(
+            archive, f"{folder}/progress.csv", PROGRESS_COLUMNS,
+            progress_by_day(classroom.pk, classroom.total_students),
+        )
+        _write_csv(
+            archive, f"{folder}/quizzes.csv", QUIZ_COLUMNS,
+            QuizAttempt.objects.filter(student__student_profile__classroom=classroom).order_by('id'),
+        )
+
+
+def write_responses(archive, owner):
+    _write_csv(
+        archive, "responses.csv", RESPONSE_COLUMNS,
+        StudentResponse.objects.filter(
+            student__student_profile__classroom__teacher=owner
+        ).order_by('id'),
+    )
+
+
+def write_research(archive, owner):
+    classroom_ids = Classroom.objects.filter(teacher=owner).values_list('id', flat=True)
+    write_research_archive(archive, classroom_ids=list(classroom_ids))
+
+
+WRITERS = {
+    ExportJob.CLASSROOMS: write_classrooms,
+    ExportJob.RESPONSES:  write_responses,
+    ExportJob.RESEARCH:   write_research,
+}
+
+
+# — Job lifecycle —
+def _is_stale(job, cutoff):
+    if job.status == ExportJob.PENDING:
+        return job.created_at < cutoff
+    if job.status == ExportJob.RUNNING:
+        return (job.started_at or job.created_at) < cutoff
+    return False
+
+
+def request_export(owner, kind):
+    """
+    Return (job, cached). A finished job with the same data version is reused
+    as-is; an in-flight one is shared unless it outlived the task time limit,
+    in which case it is marked failed; otherwise a new job is queued.
+    """
+    from .tasks import EXPORT_TIME_LIMIT, run_export_job
+
+    key = data_version(kind, owner)
+    existing = (
+        ExportJob.objects.filter(owner=owner, kind=kind, cache_key=key)
+        .exclude(status=ExportJob.FAILED)
+        .order_by('-created_at')
+        .first()
+    )
+    cutoff = timezone.now() - timedelta(seconds=EXPORT_TIME_LIMIT)
+    if existing and _is_stale(existing, cutoff):
+        ExportJob.objects.filter(pk=existing.pk, status=existing.status).update(
+            status=ExportJob.FAILED, error="Timed out", finished_at=timezone.now()
+        )
+    elif existing and (existing.status != ExportJob.DONE or existing.artifact):
+        return existing, existing.status == ExportJob.DONE
+
+    job = ExportJob.objects.create(owner=owner, kind=kind, cache_key=key)
+    transaction.on_commit(lambda: run_export_job.delay(job.pk))
+    return job, False
+
+
+def build_artifact(job):
+    """
+    Write the compressed artifact for `job` under MEDIA_ROOT/exports/.
+    Memory stays bounded: rows stream from chunked queries into a temp file.
+    Runs on the worker, for a job run_export_job has claimed; the web process
+    serves the file, so MEDIA_ROOT must be shared storage.
+    """
+    try:
+        with tempfile.TemporaryFile() as tmp:
+            with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                WRITERS[job.kind](archive, job.owner)
+            tmp.seek(0)
+            job.artifact.save(f"{job.kind}_{job.cache_key[:16]}.zip", File(tmp), save=False)
+    except Exception as e:
+        job.status = ExportJob.FAILED
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        raise
+
+    job.status = ExportJob.DONE
+    job.finished_at = timezone.now()
+    job.save(update_fields=['artifact', 'status', 'finished_at'])
+
+    # Older artifacts of the same export are superseded
+    superseded = ExportJob.objects.filter(
+        owner=job.owner, kind=job.kind,
+        status__in=[ExportJob.DONE, ExportJob.FAILED],
+        created_at__lt=job.created_at,
+    ).exclude(cache_key=job.cache_key)
+    for old in superseded:
+        if old.artifact:
+            old.artifact.delete(save=False)
+        old.delete()
+    return job
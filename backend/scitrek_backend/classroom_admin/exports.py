@@ -0,0 +1,102 @@
+# classroom_admin/exports.py
+import csv
+import json
+
+from django.db.models import QuerySet
+from django.http import StreamingHttpResponse
+
+CHUNK_SIZE = 2000
+
+
+class Echo:
+    """
+    File-like object whose write() hands the formatted line straight back,
+    so csv.writer can be driven without an in-memory buffer.
+    """
+    def write(self, value):
+        return value
+
+
+class Column:
+    """
+    One CSV column: a header, the values() field it reads and an optional formatter.
+    """
+    def __init__(self, header, field=None, format=None):
+        self.header = header
+        self.field  = field or header
+        self.format = format
+
+    def render(self, value):
+        if self.format is not None and value is not None:
+            return self.format(value)
+        return value
+
+
+# — Column specs for the classroom exports —
+ROSTER_COLUMNS = [
+    Column('id',         'user_id'),
+    Column('username',   'user__username'),
+    Column('first_name'),
+    Column('last_name'),
+]
+
+PROGRESS_COLUMNS = [
+    Column('day'),
+    Column('completed'),
+    Column('percent', format=lambda v: f"{v:.1f}"),
+]
+
+QUIZ_COLUMNS = [
+    Column('quiz_type'),
+    Column('student_id'),
+    Column('username', 'student__username'),
+    Column('score'),
+]
+
+RESPONSE_COLUMNS = [
+    Column('classroom',    'student__student_profile__classroom__name'),
+    Column('student_id'),
+    Column('username',     'student__username'),
+    Column('day',          'module__day'),
+    Column('completed_at', format=lambda v: v.isoformat()),
+    Column('answers',      format=json.dumps),
+]
+
+
+def iter_rows(columns, rows, chunk_size=CHUNK_SIZE):
+    """
+    Yield value tuples in column order.
+    A QuerySet is read with one values_list() query through a chunked
+    iterator; any other iterable must yield dicts keyed by Column.field.
+    """
+    fields = [c.field for c in columns]
+    if isinstance(rows, QuerySet):
+        yield from rows.values_list(*fields).iterator(chunk_size=chunk_size)
+    else:
+        for row in rows:
+            yield tuple(row[f] for f in fields)
+
+
+def iter_csv(columns, rows, chunk_size=CHUNK_SIZE):
+    """
+    Yield the CSV as text chunks of up to `chunk_size` lines, header first.
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow([c.header for c in columns])
+    lines = []
+    for values in iter_rows(columns, rows, chunk_size):
+        lines.append(writer.writerow([c.render(v) for c, v in zip(columns, values)]))
+        if len(lines) >= chunk_size:
+            yield ''.join(lines)
+            lines = []
+    if lines:
+        yield ''.join(lines)
+
+
+def csv_response(filename, columns, rows, chunk_size=CHUNK_SIZE):
+    """
+    Stream an export as a CSV attachment; the header goes out before the first query row.
+    """
+    response = StreamingHttpResponse(iter_csv(columns, rows, chunk_size), content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
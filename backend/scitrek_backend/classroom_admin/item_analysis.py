@@ -0,0 +1,147 @@
+# classroom_admin/item_analysis.py
+"""
+Per-question statistics for a classroom's pre/post quiz.
+
+QuizAttempt.attempt_data maps question id -> chosen option key, e.g.
+{"12": "A", "13": "C"}. A classroom's attempts are read once into a
+students x questions matrix of option indices; every statistic below is
+a vectorized reduction over that matrix.
+"""
+import numpy as np
+from django.core.cache import cache
+
+from scitrek_backend.cache_versions import get_version
+from student_activities.models import QuizAttempt, QuizQuestion
+
+# Share of students in each of the upper and lower groups (Kelley's 27%)
+GROUP_FRACTION = 0.27
+CACHE_TIMEOUT  = 60 * 60 * 24
+BLANK          = -1
+
+
+def _nan_to_none(values):
+    return [None if np.isnan(v) else round(float(v), 4) for v in values]
+
+
+def answer_matrix(questions, attempts):
+    """
+    Return (responses, keys, options): an int matrix of chosen option indices
+    (BLANK when missing, not a string or not a valid option), the key index per question
+    and the option labels per question.
+    """
+    options = [sorted(choices or {}) for _, _, choices in questions]
+    lookup  = [{label: i for i, label in enumerate(labels)} for labels in options]
+    keys = np.array([lookup[j].get(answer, BLANK) for j, (_, answer, _) in enumerate(questions)], dtype=np.int16)
+
+    ids = [str(qid) for qid, _, _ in questions]
+    responses = np.full((len(attempts), len(questions)), BLANK, dtype=np.int16)
+    for i, data in enumerate(attempts):
+        if not isinstance(data, dict):
+            continue
+        for j, qid in enumerate(ids):
+            choice = data.get(qid)
+            if isinstance(choice, str):
+                responses[i, j] = lookup[j].get(choice, BLANK)
+    return responses, keys, options
+
+
+def item_statistics(responses, keys):
+    """
+    Difficulty, upper/lower discrimination index, corrected point-biserial
+    correlation and option frequencies for every question at once.
+    """
+    n_students, n_questions = responses.shape
+    correct = (responses == keys) & (keys != BLANK)
+    totals  = correct.sum(axis=1)
+
+    stats = {
+        'difficulty':     np.full(n_questions, np.nan),
+        'discrimination': np.full(n_questions, np.nan),
+        'point_biserial': np.full(n_questions, np.nan),
+        'reliability':    None,
+    }
+    if n_students == 0:
+        return stats
+
+    stats['difficulty'] = correct.mean(axis=0)
+
+    if n_students >= 2:
+        k = max(1, int(round(n_students * GROUP_FRACTION)))
+        order = np.argsort(totals, kind='stable')
+        stats['discrimination'] = correct[order[-k:]].mean(axis=0) - correct[order[:k]].mean(axis=0)
+
+        x = correct.astype(np.float64)
+        y = totals[:, None] - x                      # rest score excludes the item itself
+        xm, ym = x - x.mean(axis=0), y - y.mean(axis=0)
+        den = np.sqrt((xm ** 2).sum(axis=0) * (ym ** 2).sum(axis=0))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            stats['point_biserial'] = np.where(den > 0, (xm * ym).sum(axis=0) / den, np.nan)
+
+        variance = totals.var()
+        if n_questions > 1 and variance > 0:
+            p = stats['difficulty']
+            kr20 = n_questions / (n_questions - 1) * (1 - (p * (1 - p)).sum() / variance)
+            stats['reliability'] = round(float(kr20), 4)
+    return stats
+
+
+def option_counts(responses, n_options):
+    """
+    questions x options matrix of how often each option was chosen.
+    """
+    return (responses[:, :, None] == np.arange(n_options)).sum(axis=0)
+
+
+def build_report(classroom_id, quiz_type):
+    questions = list(
+        QuizQuestion.objects.filter(classroom_id=classroom_id, quiz_type=quiz_type)
+        .order_by('id')
+        .values_list('id', 'answer', 'choices')
+    )
+    attempts = list(
+        QuizAttempt.objects.filter(
+            student__student_profile__classroom=classroom_id, quiz_type=quiz_type
+        ).values_list('attempt_data', flat=True)
+    )
+    responses, keys, options = answer_matrix(questions, attempts)
+    stats  = item_statistics(responses, keys)
+    counts = option_counts(responses, max((len(o) for o in options), default=0))
+    blanks = (responses == BLANK).sum(axis=0)
+
+    difficulty     = _nan_to_none(stats['difficulty'])
+    discrimination = _nan_to_none(stats['discrimination'])
+    point_biserial = _nan_to_none(stats['point_biserial'])
+    items = []
+    for j, (qid, answer, _) in enumerate(questions):
+        items.append({
+            'question_id':    qid,
+            'answer':         answer,
+            'difficulty':     difficulty[j],
+            'discrimination': discrimination[j],
+            'point_biserial': point_biserial[j],
+            'options':        {label: int(counts[j, i]) for i, label in enumerate(options[j])},
+            'blank':          int(blanks[j]),
+        })
+    return {
+        'quiz_type':   quiz_type,
+        'students':    len(attempts),
+        'questions':   len(questions),
+        'reliability': stats['reliability'],
+        'items':       items,
+    }
+
+
+def item_report(classroom_id, quiz_type):
+    """
+    Cached item report; a new attempt or question edit changes the key.
+    """
+    key = "item-analysis:{}:{}:{}:{}".format(
+        classroom_id, quiz_type,
+        get_version('quiz-attempts', classroom_id, quiz_type),
+        get_version('quiz-questions', classroom_id, quiz_type),
+    )
+    report = cache.get(key)
+    if report is None:
+        report = build_report(classroom_id, quiz_type)
+        cache.set(key, report, CACHE_TIMEOUT)
+    return report
@@ -0,0 +1,35 @@
+# classroom_admin/management/commands/export_research.py
+import zipfile
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from classroom_admin.research import write_research_archive, default_format, CHUNK_SIZE, PARQUET, NDJSON
+
+class Command(BaseCommand):
+    help = "Export flattened StudentResponse.answers and QuizAttempt.attempt_data for research"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', help="Path of the ZIP archive to write")
+        parser.add_argument('--format', choices=[PARQUET, NDJSON], default=None,
+                            help="Defaults to parquet when pyarrow is installed, else ndjson")
+        parser.add_argument('--classroom', type=int, action='append', dest='classrooms',
+                            help="Classroom id to include (repeatable). Defaults to every classroom.")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or default_format()
+        output = options['output'] or f"research_{timezone.now():%Y%m%d_%H%M%S}.zip"
+        try:
+            with zipfile.ZipFile(output, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                manifest = write_research_archive(
+                    archive,
+                    classroom_ids=options['classrooms'],
+                    fmt=fmt,
+                    chunk_size=options['chunk_size'],
+                )
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Wrote {len(manifest['partitions'])} {fmt} partitions to {output}"
+        ))
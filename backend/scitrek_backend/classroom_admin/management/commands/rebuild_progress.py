@@ -0,0 +1,19 @@
+# classroom_admin/management/commands/rebuild_progress.py
+
+from django.core.management.base import BaseCommand
+from classroom_admin.progress import rebuild_progress
+
+class Command(BaseCommand):
+    help = "Rebuild the per-classroom, per-day progress rollup from StudentResponse"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--classroom', type=int, action='append', dest='classrooms',
+            help="Classroom id to rebuild (repeatable). Defaults to every classroom.",
+        )
+
+    def handle(self, *args, **options):
+        rows = rebuild_progress(options['classrooms'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Progress rollup rebuilt ({rows} rows)"
+        ))
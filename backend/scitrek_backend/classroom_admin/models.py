@@ -6,6 +6,8 @@ from django.contrib.auth.models import AbstractUser
 class CustomUser(AbstractUser):
     is_student = models.BooleanField(default=False)
     is_teacher = models.BooleanField(default=False)
+    # TEMPLATES_VERSION the inbox was last seeded with (student_activities.tasks)
+    inbox_version = models.CharField(max_length=16, blank=True, default='')
 
 class Classroom(models.Model):
     name        = models.CharField(max_length=100, unique=True)
@@ -88,14 +90,104 @@ class ScheduledMessage(models.Model):
                      )
     subject        = models.CharField(max_length=255)
     body           = models.TextField()
-    attachment     = models.FileField(
-                         upload_to='teacher_messages/',
-                         blank=True, null=True
+    # stored as a content-addressed blob when the message is created;
+    # convert_inbox_messages moves files uploaded before that into blobs
+    attachment     = models.ForeignKey(
+                         'student_activities.Attachment',
+                         on_delete=models.PROTECT,
+                         null=True, blank=True,
+                         related_name='+'
                      )
+    attachment_name = models.CharField(max_length=255, blank=True)
     scheduled_time = models.DateTimeField()
+    # inbox content shared by every recipient; created on first send
+    content        = models.ForeignKey(
+                         'student_activities.MessageContent',
+                         on_delete=models.SET_NULL,
+                         null=True, blank=True,
+                         related_name='+'
+                     )
     sent           = models.BooleanField(default=False)
     sent_at        = models.DateTimeField(null=True, blank=True)
+    # failed dispatch attempts; the dispatcher gives up at MAX_DISPATCH_FAILURES
+    failures       = models.PositiveSmallIntegerField(default=0)
+    last_error     = models.TextField(blank=True)
     created_at     = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # the dispatcher's "unsent and due" scan
+            models.Index(fields=['sent', 'scheduled_time']),
+        ]
+
     def __str__(self):
         return f"{self.classroom}: {self.subject} at {self.scheduled_time}"
+
+class ClassroomDayProgress(models.Model):
+    """
+    Rollup of StudentResponse rows per classroom and module day.
+    Kept current by classroom_admin.progress; repair with `rebuild_progress`.
+    """
+    classroom  = models.ForeignKey(
+                     Classroom,
+                     on_delete=models.CASCADE,
+                     related_name='day_progress'
+                 )
+    day        = models.PositiveSmallIntegerField()
+    completed  = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["classroom", "day"],
+                name="uniq_classroom_day_progress",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.classroom} – Day {self.day}: {self.completed}"
+
+class ExportJob(models.Model):
+    CLASSROOMS = 'classrooms'
+    RESPONSES  = 'responses'
+    RESEARCH   = 'research'
+    KIND_CHOICES = [
+        (CLASSROOMS, 'All classrooms (roster, progress, quizzes)'),
+        (RESPONSES,  'All student responses'),
+        (RESEARCH,   'Flattened responses & quiz attempts (Parquet/NDJSON)'),
+    ]
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE    = 'done'
+    FAILED  = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE,    'Done'),
+        (FAILED,  'Failed'),
+    ]
+
+    owner        = models.ForeignKey(
+                       settings.AUTH_USER_MODEL,
+                       on_delete=models.CASCADE,
+                       related_name='export_jobs'
+                   )
+    kind         = models.CharField(max_length=20, choices=KIND_CHOICES)
+    # hash of (kind, owner, data version); identical requests share an artifact
+    cache_key    = models.CharField(max_length=64)
+    status       = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    artifact     = models.FileField(upload_to='exports/', blank=True, null=True)
+    error        = models.TextField(blank=True)
+    created_at   = models.DateTimeField(auto_now_add=True)
+    started_at   = models.DateTimeField(null=True, blank=True)
+    finished_at  = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "kind", "cache_key"]),
+        ]
+
+    def __str__(self):
+        return f"{self.owner} – {self.kind} ({self.status})"
@@ -0,0 +1,120 @@
+# classroom_admin/progress.py
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from .models import Classroom, ClassroomDayProgress
+
+DAYS = range(1, 6)
+
+
+def _bump(classroom_id, day, delta):
+    """
+    Add `delta` to one (classroom, day) counter, creating the row on first use.
+    The common case is a single UPDATE.
+    """
+    qs = ClassroomDayProgress.objects.filter(classroom_id=classroom_id, day=day)
+    changes = {
+        'completed':  Greatest(F('completed') + delta, Value(0)),
+        'updated_at': timezone.now(),
+    }
+    if qs.update(**changes):
+        return
+    ClassroomDayProgress.objects.bulk_create(
+        [ClassroomDayProgress(classroom_id=classroom_id, day=day, completed=0)],
+        ignore_conflicts=True,
+    )
+    qs.update(**changes)
+
+
+def record_response_created(classroom_id, day):
+    """
+    Count a newly created StudentResponse.
+    Call inside the same transaction as the write.
+    """
+    if classroom_id is None:
+        return
+    _bump(classroom_id, day, 1)
+
+
+def record_response_deleted(classroom_id, day):
+    """
+    Uncount a deleted StudentResponse.
+    Call inside the same transaction as the delete.
+    """
+    if classroom_id is None:
+        return
+    _bump(classroom_id, day, -1)
+
+
+def move_student(user_id, old_classroom_id, new_classroom_id):
+    """
+    Shift a student's existing responses from one classroom's rollup to another.
+    Either side may be None (joining or leaving a roster).
+    """
+    from student_activities.models import StudentResponse
+
+    if old_classroom_id == new_classroom_id:
+        return
+    days = Counter(
+        StudentResponse.objects.filter(student_id=user_id).values_list('module__day', flat=True)
+    )
+    for day, n in days.items():
+        if old_classroom_id is not None:
+            _bump(old_classroom_id, day, -n)
+        if new_classroom_id is not None:
+            _bump(new_classroom_id, day, n)
+
+
+def progress_by_day(classroom_id, total_students):
+    """
+    Per-day completion for one classroom, read from the rollup in one query.
+    """
+    counts = dict(
+        ClassroomDayProgress.objects.filter(classroom_id=classroom_id)
+        .values_list('day', 'completed')
+    )
+    data = []
+    for day in DAYS:
+        completed = counts.get(day, 0)
+        percent = (completed / total_students * 100) if total_students else 0
+        data.append({'day': day, 'completed': completed, 'percent': percent})
+    return data
+
+
+def rebuild_progress(classroom_ids=None):
+    """
+    Recompute the rollup from StudentResponse with one GROUP BY query.
+    Rebuilds every classroom when `classroom_ids` is None.
+    Returns the number of rollup rows written.
+    """
+    from student_activities.models import StudentResponse
+
+    responses = StudentResponse.objects.filter(student__student_profile__classroom__isnull=False)
+    if classroom_ids is None:
+        classroom_ids = list(Classroom.objects.values_list('id', flat=True))
+    else:
+        classroom_ids = list(classroom_ids)
+        responses = responses.filter(student__student_profile__classroom__in=classroom_ids)
+
+    rows = (
+        responses
+        .values('student__student_profile__classroom', 'module__day')
+        .annotate(n=Count('id'))
+        .order_by()
+    )
+    objs = [
+        ClassroomDayProgress(
+            classroom_id=row['student__student_profile__classroom'],
+            day=row['module__day'],
+            completed=row['n'],
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        ClassroomDayProgress.objects.filter(classroom_id__in=classroom_ids).delete()
+        ClassroomDayProgress.objects.bulk_create(objs)
+    return len(objs)
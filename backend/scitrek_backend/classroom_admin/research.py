@@ -0,0 +1,260 @@
+# classroom_admin/research.py
+"""
+Research export of StudentResponse.answers and QuizAttempt.attempt_data.
+
+The JSON blobs are flattened into typed columns (dotted key paths) and
+written one file per partition: one per module day for responses and one
+per quiz type for attempts. Two streaming passes keep memory bounded: the
+first collects each partition's column types, the second writes rows in
+chunks. Parquet is used when pyarrow is installed, otherwise gzip NDJSON.
+"""
+import gzip
+import json
+import os
+import tempfile
+import zipfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+from django.db import connection, transaction
+
+from student_activities.models import StudentResponse, QuizAttempt
+
+CHUNK_SIZE = 1000
+PARQUET = 'parquet'
+NDJSON  = 'ndjson'
+
+
+def default_format():
+    return PARQUET if pa is not None else NDJSON
+
+
+# — Flattening & typing —
+def flatten(value, prefix):
+    """
+    Flatten nested dicts into {'prefix.a.b': scalar}; lists are kept as JSON text.
+    """
+    if isinstance(value, dict):
+        out = {}
+        for key, item in value.items():
+            out.update(flatten(item, f"{prefix}.{key}"))
+        return out
+    if isinstance(value, list):
+        return {prefix: json.dumps(value)}
+    return {prefix: value}
+
+
+def _kind(value):
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    return 'string'
+
+
+def _merge(a, b):
+    if a is None or a == b:
+        return b
+    if b is None:
+        return a
+    if {a, b} == {'int', 'float'}:
+        return 'float'
+    return 'string'
+
+
+def _coerce(value, kind):
+    if value is None:
+        return None
+    if kind == 'string' and not isinstance(value, str):
+        return json.dumps(value)
+    if kind == 'float':
+        return float(value)
+    return value
+
+
+# — Sources —
+class Source:
+    """
+    One model to export: its fixed columns, the JSON field to flatten and
+    the field that splits rows into partitions.
+    """
+    def __init__(self, name, model, base_columns, partition_field, json_field, prefix, classroom_field):
+        self.name            = name
+        self.model           = model
+        self.base_columns    = base_columns   # [(column, field, kind), ...]
+        self.partition_field = partition_field
+        self.json_field      = json_field
+        self.prefix          = prefix
+        self.classroom_field = classroom_field
+
+    def queryset(self, classroom_ids):
+        qs = self.model.objects.filter(**{f"{self.classroom_field}__isnull": False})
+        if classroom_ids is not None:
+            qs = qs.filter(**{f"{self.classroom_field}__in": classroom_ids})
+        return qs.order_by(self.partition_field, 'id')
+
+    def partition_name(self, value):
+        return f"{self.name}_{value}"
+
+
+SOURCES = [
+    Source(
+        'responses_day', StudentResponse,
+        [
+            ('response_id',  'id',                                     'int'),
+            ('student_id',   'student_id',                             'int'),
+            ('classroom_id', 'student__student_profile__classroom_id', 'int'),
+            ('day',          'module__day',                            'int'),
+            ('completed_at', 'completed_at',                           'timestamp'),
+        ],
+        partition_field='module__day', json_field='answers', prefix='answers',
+        classroom_field='student__student_profile__classroom',
+    ),
+    Source(
+        'quiz', QuizAttempt,
+        [
+            ('attempt_id',   'id',                                     'int'),
+            ('student_id',   'student_id',                             'int'),
+            ('classroom_id', 'student__student_profile__classroom_id', 'int'),
+            ('quiz_type',    'quiz_type',                              'string'),
+            ('score',        'score',                                  'float'),
+            ('timestamp',    'timestamp',                              'timestamp'),
+        ],
+        partition_field='quiz_type', json_field='attempt_data', prefix='attempt',
+        classroom_field='student__student_profile__classroom',
+    ),
+]
+
+
+# — Writers —
+class NdjsonPartWriter:
+    extension = 'ndjson.gz'
+
+    def __init__(self, path, columns):
+        self.columns = columns
+        self.fh = gzip.open(path, 'wt', encoding='utf-8')
+
+    def write(self, records):
+        self.fh.writelines(json.dumps(r, default=str) + '\n' for r in records)
+
+    def close(self):
+        self.fh.close()
+
+
+class ParquetPartWriter:
+    extension = 'parquet'
+
+    def __init__(self, path, columns):
+        arrow_types = {
+            'bool':      pa.bool_(),
+            'int':       pa.int64(),
+            'float':     pa.float64(),
+            'string':    pa.string(),
+            'timestamp': pa.timestamp('us', tz='UTC'),
+        }
+        self.schema = pa.schema([(name, arrow_types[kind]) for name, kind in columns.items()])
+        self.writer = pq.ParquetWriter(path, self.schema, compression='zstd')
+
+    def write(self, records):
+        self.writer.write_table(pa.Table.from_pylist(records, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+
+
+WRITER_CLASSES = {PARQUET: ParquetPartWriter, NDJSON: NdjsonPartWriter}
+
+
+# — Export —
+def scan_schema(source, classroom_ids, chunk_size=CHUNK_SIZE):
+    """
+    First pass: {partition value: {column: kind}} for one source.
+    Memory is bounded by the number of distinct keys, not rows.
+    """
+    schemas = {}
+    rows = source.queryset(classroom_ids).values_list(source.partition_field, source.json_field)
+    for part, blob in rows.iterator(chunk_size=chunk_size):
+        columns = schemas.setdefault(part, {})
+        for key, value in flatten(blob, source.prefix).items():
+            columns[key] = _merge(columns.get(key), _kind(value))
+    return {
+        part: {
+            **{name: kind for name, _, kind in source.base_columns},
+            **{key: kind or 'string' for key, kind in sorted(columns.items())},
+        }
+        for part, columns in schemas.items()
+    }
+
+
+def _write_source(archive, source, schemas, classroom_ids, fmt, chunk_size, workdir):
+    writer_class = WRITER_CLASSES[fmt]
+    fields = [field for _, field, _ in source.base_columns]
+    names  = [name for name, _, _ in source.base_columns]
+    part_index = fields.index(source.partition_field)
+    rows = source.queryset(classroom_ids).values_list(*fields, source.json_field)
+
+    state = {'part': None, 'writer': None, 'path': None, 'columns': None}
+    batch = []
+
+    def finish():
+        if state['writer'] is None:
+            return
+        if batch:
+            state['writer'].write(batch)
+            batch.clear()
+        state['writer'].close()
+        arcname = f"{source.partition_name(state['part'])}.{writer_class.extension}"
+        archive.write(state['path'], arcname, compress_type=zipfile.ZIP_STORED)
+        os.remove(state['path'])
+        state['writer'] = None
+
+    for row in rows.iterator(chunk_size=chunk_size):
+        if state['writer'] is None or row[part_index] != state['part']:
+            finish()
+            state['part'] = row[part_index]
+            state['columns'] = schemas[state['part']]
+            state['path'] = os.path.join(workdir, f"{source.partition_name(state['part'])}.{writer_class.extension}")
+            state['writer'] = writer_class(state['path'], state['columns'])
+
+        record = dict(zip(names, row[:-1]))
+        record.update(flatten(row[-1], source.prefix))
+        batch.append({name: _coerce(record.get(name), kind) for name, kind in state['columns'].items()})
+        if len(batch) >= chunk_size:
+            state['writer'].write(batch)
+            batch.clear()
+    finish()
+
+
+def write_research_archive(archive, classroom_ids=None, fmt=None, chunk_size=CHUNK_SIZE):
+    """
+    Write every partition plus a schema.json manifest into an open ZipFile.
+    Exports all classrooms when `classroom_ids` is None. Returns the manifest.
+    """
+    fmt = fmt or default_format()
+    if fmt == PARQUET and pa is None:
+        raise ValueError("Parquet output requires pyarrow; use the ndjson format instead.")
+
+    manifest = {'format': fmt, 'partitions': {}}
+    snapshot = connection.vendor == 'postgresql' and not connection.in_atomic_block
+    with tempfile.TemporaryDirectory() as workdir, transaction.atomic():
+        if snapshot:
+            # Both passes must see the same rows, or pass two could meet
+            # partitions and columns that pass one never typed.
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        for source in SOURCES:
+            schemas = scan_schema(source, classroom_ids, chunk_size)
+            _write_source(archive, source, schemas, classroom_ids, fmt, chunk_size, workdir)
+            for part, columns in schemas.items():
+                manifest['partitions'][source.partition_name(part)] = columns
+    archive.writestr('schema.json', json.dumps(manifest, indent=2))
+    return manifest
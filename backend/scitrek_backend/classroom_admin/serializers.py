@@ -2,11 +2,13 @@ from rest_framework import serializers
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 from django.utils import timezone
+from django.urls import reverse
 from rest_framework.exceptions import ValidationError
 
+from student_activities.attachments import atomic_with_blobs, attachment_name, store_attachment
 from .models import (
     Classroom, Student,
-    ModuleAssignment, QuizAssignment, ScheduledMessage
+    ModuleAssignment, QuizAssignment, ScheduledMessage, ExportJob
 )
 
 User = get_user_model()
@@ -71,12 +73,33 @@ class QuizAssignmentSerializer(serializers.ModelSerializer):
 
 
 class ScheduledMessageSerializer(serializers.ModelSerializer):
+    # uploaded file in, stored once as a content-addressed blob
+    attachment = serializers.FileField(write_only=True, required=False, allow_null=True)
+
     class Meta:
         model  = ScheduledMessage
         fields = [
-            'id', 'subject', 'body', 'attachment',
-            'scheduled_time', 'sent', 'sent_at', 'created_at'
+            'id', 'subject', 'body', 'attachment', 'attachment_name',
+            'scheduled_time', 'sent', 'sent_at', 'failures', 'last_error', 'created_at'
         ]
+        read_only_fields = ['attachment_name', 'failures', 'last_error']
+
+    def _store_upload(self, validated_data):
+        if 'attachment' not in validated_data:
+            return
+        upload = validated_data.pop('attachment')
+        validated_data['attachment']      = store_attachment(upload)
+        validated_data['attachment_name'] = attachment_name(upload)
+
+    def create(self, validated_data):
+        with atomic_with_blobs():
+            self._store_upload(validated_data)
+            return super().create(validated_data)
+
+    def update(self, instance, validated_data):
+        with atomic_with_blobs():
+            self._store_upload(validated_data)
+            return super().update(instance, validated_data)
 
     def validate_scheduled_time(self, value):
         if value < timezone.now():
@@ -84,6 +107,32 @@ class ScheduledMessageSerializer(serializers.ModelSerializer):
         return value
 
 
+class ExportJobSerializer(serializers.ModelSerializer):
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model  = ExportJob
+        fields = ['id', 'kind', 'status', 'error', 'created_at', 'started_at', 'finished_at', 'download_url']
+        read_only_fields = ['status', 'error', 'created_at', 'started_at', 'finished_at']
+
+    def get_download_url(self, obj):
+        if obj.status != ExportJob.DONE:
+            return None
+        url = reverse('teacher-export-job-download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class AnalyticsRangeSerializer(serializers.Serializer):
+    since = serializers.DateTimeField(required=False, input_formats=['iso-8601', '%Y-%m-%d'])
+    until = serializers.DateTimeField(required=False, input_formats=['iso-8601', '%Y-%m-%d'])
+
+    def validate(self, attrs):
+        if attrs.get('since') and attrs.get('until') and attrs['since'] >= attrs['until']:
+            raise ValidationError("since must be earlier than until.")
+        return attrs
+
+
 class CustomStudentSignupSerializer(serializers.ModelSerializer):
     # now require the classroom PK instead of name
     classroom = serializers.PrimaryKeyRelatedField(
@@ -0,0 +1,45 @@
+# classroom_admin/signals.py
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from scitrek_backend.cache_versions import bump_version_on_commit
+from .models import Student, QuizAssignment
+from .progress import move_student
+
+
+def _bump_attempt_versions(*classroom_ids):
+    for classroom_id in classroom_ids:
+        if classroom_id is not None:
+            for quiz_type in (QuizAssignment.PRE, QuizAssignment.POST):
+                bump_version_on_commit('quiz-attempts', classroom_id, quiz_type)
+
+
+@receiver(pre_save, sender=Student)
+def remember_previous_classroom(sender, instance, **kwargs):
+    """
+    Stash the stored classroom so post_save can tell whether it changed.
+    """
+    if instance.pk is None:
+        instance._previous_classroom_id = None
+        return
+    instance._previous_classroom_id = (
+        Student.objects.filter(pk=instance.pk).values_list('classroom_id', flat=True).first()
+    )
+
+
+@receiver(post_save, sender=Student)
+def move_progress_on_roster_change(sender, instance, **kwargs):
+    """
+    Keep the classroom progress rollup in step with roster moves.
+    """
+    previous = getattr(instance, '_previous_classroom_id', None)
+    if previous != instance.classroom_id:
+        move_student(instance.user_id, previous, instance.classroom_id)
+        _bump_attempt_versions(previous, instance.classroom_id)
+
+
+@receiver(post_delete, sender=Student)
+def drop_progress_on_student_delete(sender, instance, **kwargs):
+    if instance.classroom_id is not None:
+        move_student(instance.user_id, instance.classroom_id, None)
+        _bump_attempt_versions(instance.classroom_id)
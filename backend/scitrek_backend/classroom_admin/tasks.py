@@ -1,30 +1,126 @@
 #classroom_admin/tasks.py
+import logging
+
 from celery import shared_task
 from classroom_admin.models import ScheduledMessage
-from student_activities.models import Message
+from student_activities.models import Message, MessageContent
+from student_activities.push import notify_inbox
+from django.db import transaction
 from django.utils import timezone
 
-@shared_task
-def schedule_message_task(msg_id):
+# Recipients per INSERT when fanning a scheduled message out to a roster
+FANOUT_CHUNK_SIZE = 500
+
+# Due messages claimed per dispatcher transaction
+DISPATCH_BATCH_SIZE = 50
+
+# Failed sends before the dispatcher stops picking a message up
+MAX_DISPATCH_FAILURES = 3
+
+logger = logging.getLogger(__name__)
+
+def _deliver(msg):
     """
-    Task scheduled by the API on creation of ScheduledMessage.
-    Once run, it sends the message and marks it as sent.
-    """
-    msg = ScheduledMessage.objects.get(id=msg_id)
-    # Create a real inbox Message for each student in the classroom
-    from classroom_admin.models import Student
-    students = msg.classroom.students.all()
-    for profile in students:
-        Message.objects.create(
-            sender=msg.classroom.teacher,
-            recipient=profile.user,
+    Fan a locked, unsent ScheduledMessage out to its classroom roster.
+    The subject/body are stored once as a MessageContent sharing the blob
+    stored at upload time; each student gets a thin delivery row, inserted in chunks, skipping any that
+    already exist. Returns the number of delivery rows attempted.
+    """
+    sender_id = msg.classroom.teacher_id
+    if msg.content_id is None:
+        msg.content = MessageContent.objects.create(
+            sender_id=sender_id,
             subject=msg.subject,
             body=msg.body,
-            # copy attachment if needed
+            attachment_id=msg.attachment_id,
+            attachment_name=msg.attachment_name,
         )
-    msg.sent   = True
+        msg.save(update_fields=['content'])
+
+    recipients = msg.classroom.students.order_by('user_id').values_list('user_id', flat=True)
+    batch = []
+    delivered = 0
+    notified = []
+    for user_id in recipients.iterator(chunk_size=FANOUT_CHUNK_SIZE):
+        notified.append(user_id)
+        batch.append(Message(
+            content_id=msg.content_id,
+            sender_id=sender_id,
+            recipient_id=user_id,
+        ))
+        if len(batch) >= FANOUT_CHUNK_SIZE:
+            Message.objects.bulk_create(batch, ignore_conflicts=True)
+            delivered += len(batch)
+            batch = []
+    if batch:
+        Message.objects.bulk_create(batch, ignore_conflicts=True)
+        delivered += len(batch)
+
+    msg.sent    = True
     msg.sent_at = timezone.now()
-    msg.save()
+    msg.save(update_fields=['sent', 'sent_at'])
+    transaction.on_commit(lambda: notify_inbox(notified))
+    return delivered
+
+@shared_task
+def schedule_message_task(msg_id):
+    """
+    Send one ScheduledMessage now, whatever its scheduled_time.
+
+    Idempotent: the ScheduledMessage row is locked and its `sent` flag is
+    the marker, so a retry or duplicate delivery of this task is a no-op.
+    """
+    with transaction.atomic():
+        msg = (
+            ScheduledMessage.objects.select_for_update()
+            .select_related('classroom')
+            .get(id=msg_id)
+        )
+        if msg.sent:
+            return 0
+        return _deliver(msg)
+
+@shared_task
+def dispatch_due_messages(batch_size=DISPATCH_BATCH_SIZE):
+    """
+    Run by celery beat. Claims unsent messages whose scheduled_time has
+    passed, a batch per transaction, and fans each one out.
+
+    Rows are claimed with SKIP LOCKED, so several workers can dispatch at
+    once without double-sending, and future messages cost nothing until
+    they fall due. Each message is sent in its own savepoint: one that
+    fails is rolled back, counted in `failures` and retried on later runs
+    until MAX_DISPATCH_FAILURES, without holding up the rest.
+    Returns the number of messages sent.
+    """
+    sent = 0
+    failed = set()
+    while True:
+        with transaction.atomic():
+            batch = list(
+                ScheduledMessage.objects.select_for_update(skip_locked=True, of=('self',))
+                .select_related('classroom')
+                .filter(
+                    sent=False,
+                    scheduled_time__lte=timezone.now(),
+                    failures__lt=MAX_DISPATCH_FAILURES,
+                )
+                .exclude(pk__in=failed)
+                .order_by('scheduled_time')[:batch_size]
+            )
+            for msg in batch:
+                try:
+                    with transaction.atomic():
+                        _deliver(msg)
+                    sent += 1
+                except Exception as exc:
+                    logger.exception("Dispatch of scheduled message %s failed", msg.pk)
+                    failed.add(msg.pk)
+                    ScheduledMessage.objects.filter(pk=msg.pk).update(
+                        failures=msg.failures + 1, last_error=repr(exc)
+                    )
+        if len(batch) < batch_size:
+            return sent
 
 @shared_task
 def send_scheduled_message_task(msg_id):
@@ -32,3 +128,23 @@ def send_scheduled_message_task(msg_id):
     Immediate send (triggered by PATCH send-now).
     """
     return schedule_message_task(msg_id)
+
+# a job in flight for longer is presumed dead and gets replaced
+EXPORT_TIME_LIMIT = 30 * 60
+
+@shared_task(time_limit=EXPORT_TIME_LIMIT)
+def run_export_job(job_id):
+    """
+    Build the compressed artifact for an ExportJob outside the request cycle.
+    Only the worker that moves the job from pending to running builds it; a
+    redelivered task for a job already taken leaves it alone.
+    """
+    from classroom_admin.export_jobs import build_artifact
+    from classroom_admin.models import ExportJob
+    claimed = ExportJob.objects.filter(id=job_id, status=ExportJob.PENDING).update(
+        status=ExportJob.RUNNING, started_at=timezone.now()
+    )
+    job = ExportJob.objects.select_related('owner').get(id=job_id)
+    if not claimed:
+        return job.artifact.name or None
+    return build_artifact(job).artifact.name
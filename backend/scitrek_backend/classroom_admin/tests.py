@@ -1,3 +1,544 @@
-from django.test import TestCase
+# classroom_admin/tests.py
+import gzip
+import io
+import json
+import tempfile
+import zipfile
+from datetime import timedelta
+from unittest import mock, skipIf
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APITestCase
+
+from classroom_admin import research, tasks
+from classroom_admin.models import (
+    CustomUser, Classroom, Student, ClassroomDayProgress, ExportJob, ScheduledMessage,
+)
+from classroom_admin.export_jobs import data_version
+from classroom_admin.progress import rebuild_progress
+from classroom_admin.tasks import (
+    MAX_DISPATCH_FAILURES, dispatch_due_messages, run_export_job, schedule_message_task,
+)
+from scitrek_backend.testing import ScitrekAPITestCase
+from student_activities.models import Message, MessageContent, Module, QuizAttempt, QuizQuestion, StudentResponse
+
+
+class ClassroomProgressRollupTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=self.teacher)
+        self.other = Classroom.objects.create(name="Bio 2", teacher=self.teacher)
+        self.module = Module.objects.create(day=1, title="Day 1", content="C1", classroom=self.classroom)
+        self.students = []
+        for i in range(3):
+            user = CustomUser.objects.create_user(username=f"stu{i}", is_student=True)
+            Student.objects.create(user=user, classroom=self.classroom)
+            self.students.append(user)
+
+    def _submit(self, user):
+        self.client.force_authenticate(user=user)
+        resp = self.client.post(
+            reverse('api-module-response', args=[1]), {"answers": {"q1": "a"}}, format='json'
+        )
+        self.client.force_authenticate(user=None)
+        return resp
+
+    def _progress(self, classroom):
+        self.client.force_authenticate(user=self.teacher)
+        return self.client.get(reverse('teacher-classroom-progress', args=[classroom.pk])).data
+
+    def test_upsert_updates_rollup_once_per_student(self):
+        self.assertEqual(self._submit(self.students[0]).status_code, 201)
+        self.assertEqual(self._submit(self.students[0]).status_code, 200)
+        self._submit(self.students[1])
+
+        data = self._progress(self.classroom)
+        self.assertEqual(data['total_students'], 3)
+        self.assertEqual(data['by_day'][0]['completed'], 2)
+        self.assertAlmostEqual(data['by_day'][0]['percent'], 200 / 3)
+        self.assertEqual(data['by_day'][1]['completed'], 0)
+
+    def test_progress_is_constant_query_read(self):
+        for user in self.students:
+            self._submit(user)
+        self.client.force_authenticate(user=self.teacher)
+        with self.assertNumQueries(2):
+            self.client.get(reverse('teacher-classroom-progress', args=[self.classroom.pk]))
+
+    def test_roster_move_shifts_counts(self):
+        self._submit(self.students[0])
+        profile = self.students[0].student_profile
+        profile.classroom = self.other
+        profile.save()
+
+        self.assertEqual(self._progress(self.classroom)['by_day'][0]['completed'], 0)
+        self.assertEqual(self._progress(self.other)['by_day'][0]['completed'], 1)
+
+    def test_deletes_decrement_counts(self):
+        for user in self.students:
+            self._submit(user)
+        StudentResponse.objects.filter(student=self.students[0]).delete()
+        self.assertEqual(self._progress(self.classroom)['by_day'][0]['completed'], 2)
+
+        self.module.delete()
+        self.assertEqual(self._progress(self.classroom)['by_day'][0]['completed'], 0)
+
+    def test_rebuild_command_repairs_drift(self):
+        for user in self.students:
+            self._submit(user)
+        ClassroomDayProgress.objects.update(completed=99)
+
+        call_command('rebuild_progress', stdout=io.StringIO())
+
+        self.assertEqual(self._progress(self.classroom)['by_day'][0]['completed'], 3)
+
+
+class ClassroomQuizOverviewTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=self.teacher)
+        pairs = [(0.2, 0.6), (0.5, 1.0), (1.0, 1.0), (0.4, None)]
+        for i, (pre, post) in enumerate(pairs):
+            user = CustomUser.objects.create_user(username=f"stu{i}", is_student=True)
+            Student.objects.create(user=user, classroom=self.classroom)
+            QuizAttempt.objects.create(student=user, quiz_type=QuizAttempt.PRE, score=pre, attempt_data={})
+            if post is not None:
+                QuizAttempt.objects.create(student=user, quiz_type=QuizAttempt.POST, score=post, attempt_data={})
+        self.client.force_authenticate(user=self.teacher)
+        self.url = reverse('teacher-classroom-quizzes', args=[self.classroom.pk])
+
+    def test_summary_and_gain(self):
+        with self.assertNumQueries(2):
+            data = self.client.get(self.url).data
+
+        self.assertEqual(data['pre']['count'], 4)
+        self.assertAlmostEqual(data['pre']['average'], 0.525)
+        self.assertAlmostEqual(data['pre']['median'], 0.45)
+        self.assertEqual(sum(data['pre']['histogram']['counts']), 4)
+        self.assertNotIn('scores', data)
+
+        gain = data['gain']
+        self.assertEqual(gain['pairs'], 3)
+        # (0.6-0.2)/0.8 = 0.5 and (1.0-0.5)/0.5 = 1.0; the perfect pre score is excluded
+        self.assertAlmostEqual(gain['average_gain'], 0.75)
+
+    def test_raw_scores_are_paginated(self):
+        data = self.client.get(self.url, {'scores': 'post'}).data
+        self.assertEqual(data['scores']['count'], 3)
+        self.assertEqual(len(data['scores']['results']), 3)
+
+
+class ClassroomCsvExportTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=self.teacher)
+        self.client.force_authenticate(user=self.teacher)
+
+    def _add_students(self, n, start=0):
+        for i in range(start, start + n):
+            user = CustomUser.objects.create_user(username=f"stu{i}", is_student=True)
+            Student.objects.create(user=user, classroom=self.classroom, first_name="F", last_name=f"L{i}")
+            QuizAttempt.objects.create(student=user, quiz_type=QuizAttempt.PRE, score=0.5, attempt_data={})
+
+    def _download(self, name, queries):
+        url = reverse(f'teacher-export-{name}', args=[self.classroom.pk])
+        with self.assertNumQueries(queries):
+            resp = self.client.get(url)
+            body = b''.join(resp.streaming_content).decode()
+        return body.splitlines()
+
+    def test_query_count_does_not_grow_with_roster(self):
+        self._add_students(2)
+        small = (len(self._download('roster', 2)), len(self._download('quizzes', 2)))
+        self._add_students(20, start=2)
+        large = (len(self._download('roster', 2)), len(self._download('quizzes', 2)))
+        self.assertEqual(small, (3, 3))
+        self.assertEqual(large, (23, 23))
+
+    def test_csv_content(self):
+        self._add_students(1)
+        user = CustomUser.objects.get(username="stu0")
+        self.assertEqual(self._download('roster', 2), [
+            'id,username,first_name,last_name',
+            f'{user.id},stu0,F,L0',
+        ])
+        self.assertEqual(self._download('progress', 2)[:2], ['day,completed,percent', '1,0,0.0'])
+
+
+class ExportJobTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+        # Run export jobs inline instead of through the broker
+        patcher = mock.patch('classroom_admin.tasks.run_export_job.delay', side_effect=run_export_job)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        self.teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=self.teacher)
+        self.module = Module.objects.create(day=1, title="Day 1", content="C1", classroom=self.classroom)
+        self.student = CustomUser.objects.create_user(username="stu0", is_student=True)
+        Student.objects.create(user=self.student, classroom=self.classroom)
+        StudentResponse.objects.create(student=self.student, module=self.module, answers={"q1": "a"})
+        self.client.force_authenticate(user=self.teacher)
+
+    def _start(self, kind):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(reverse('teacher-export-job-create'), {'kind': kind}, format='json')
+
+    def test_job_builds_artifact_and_is_reused_until_data_changes(self):
+        first = self._start(ExportJob.RESPONSES)
+        self.assertEqual(first.status_code, 202)
+
+        job = self.client.get(reverse('teacher-export-job-detail', args=[first.data['id']])).data
+        self.assertEqual(job['status'], ExportJob.DONE)
+
+        resp = self.client.get(reverse('teacher-export-job-download', args=[job['id']]))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(resp.streaming_content)))
+        lines = archive.read('responses.csv').decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertIn('"{""q1"": ""a""}"', lines[1])
+
+        again = self._start(ExportJob.RESPONSES)
+        self.assertEqual(again.status_code, 200)
+        self.assertEqual(again.data['id'], job['id'])
+
+        StudentResponse.objects.filter(student=self.student).update(answers={"q1": "b"}, completed_at=timezone.now())
+        changed = self._start(ExportJob.RESPONSES)
+        self.assertEqual(changed.status_code, 202)
+        self.assertNotEqual(changed.data['id'], job['id'])
+        self.assertFalse(ExportJob.objects.filter(pk=job['id']).exists())
+
+        CustomUser.objects.filter(pk=self.student.pk).update(username="stu0-renamed")
+        renamed = self._start(ExportJob.RESPONSES)
+        self.assertEqual(renamed.status_code, 202)
+        self.assertNotEqual(renamed.data['id'], changed.data['id'])
+
+    def test_research_export_rebuilt_when_attempt_answers_change(self):
+        attempt = QuizAttempt.objects.create(
+            student=self.student, quiz_type=QuizAttempt.PRE, score=0.0, attempt_data={"1": "A"}
+        )
+        first = self._start(ExportJob.RESEARCH).data['id']
+        self.assertEqual(self._start(ExportJob.RESEARCH).data['id'], first)
+
+        # same score, different answers
+        attempt.attempt_data = {"1": "B"}
+        attempt.save()
+        resubmitted = self._start(ExportJob.RESEARCH)
+        self.assertEqual(resubmitted.status_code, 202)
+        self.assertNotEqual(resubmitted.data['id'], first)
+
+    def test_stale_in_flight_job_is_replaced(self):
+        key = data_version(ExportJob.RESPONSES, self.teacher)
+        stuck = ExportJob.objects.create(owner=self.teacher, kind=ExportJob.RESPONSES, cache_key=key)
+        with mock.patch('classroom_admin.tasks.run_export_job.delay'):
+            shared = self._start(ExportJob.RESPONSES)
+        self.assertEqual(shared.data['id'], stuck.pk)
+
+        ExportJob.objects.filter(pk=stuck.pk).update(
+            status=ExportJob.RUNNING, started_at=timezone.now() - timedelta(hours=1)
+        )
+        fresh = self._start(ExportJob.RESPONSES)
+        self.assertNotEqual(fresh.data['id'], stuck.pk)
+        self.assertEqual(ExportJob.objects.get(pk=fresh.data['id']).status, ExportJob.DONE)
+        self.assertEqual(ExportJob.objects.get(pk=stuck.pk).status, ExportJob.FAILED)
+
+    def test_job_taken_by_another_worker_is_not_rebuilt(self):
+        job = ExportJob.objects.create(
+            owner=self.teacher, kind=ExportJob.RESPONSES, cache_key="k", status=ExportJob.RUNNING
+        )
+        self.assertIsNone(run_export_job(job.pk))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.RUNNING)
+        self.assertFalse(job.artifact)
+
+    def test_classrooms_export_contains_each_classroom(self):
+        job_id = self._start(ExportJob.CLASSROOMS).data['id']
+        resp = self.client.get(reverse('teacher-export-job-download', args=[job_id]))
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(resp.streaming_content)))
+        folder = f"{self.classroom.pk}_{self.classroom.name}"
+        self.assertEqual(
+            sorted(archive.namelist()),
+            [f"{folder}/progress.csv", f"{folder}/quizzes.csv", f"{folder}/roster.csv"],
+        )
+
+
+class ResearchExportTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+        teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=teacher)
+        day1 = Module.objects.create(day=1, title="Day 1", content="C1", classroom=self.classroom)
+        for i, answers in enumerate([{"q1": 1, "gene": {"on": True}}, {"q1": 2.5, "order": ["a", "b"]}]):
+            user = CustomUser.objects.create_user(username=f"stu{i}", is_student=True)
+            Student.objects.create(user=user, classroom=self.classroom)
+            StudentResponse.objects.create(student=user, module=day1, answers=answers)
+            QuizAttempt.objects.create(student=user, quiz_type=QuizAttempt.PRE, score=0.5, attempt_data={"1": "A"})
+
+    def _export(self, fmt):
+        output = f"{self.tmp.name}/research.zip"
+        call_command('export_research', output=output, format=fmt, chunk_size=1, stdout=io.StringIO())
+        return zipfile.ZipFile(output)
+
+    def test_ndjson_partitions_and_types(self):
+        archive = self._export('ndjson')
+        manifest = json.loads(archive.read('schema.json'))
+        day1 = manifest['partitions']['responses_day_1']
+        self.assertEqual(day1['answers.q1'], 'float')
+        self.assertEqual(day1['answers.gene.on'], 'bool')
+        self.assertEqual(day1['answers.order'], 'string')
+        self.assertIn('quiz_pre', manifest['partitions'])
+
+        rows = [json.loads(line) for line in gzip.decompress(archive.read('responses_day_1.ndjson.gz')).splitlines()]
+        self.assertEqual([r['answers.q1'] for r in rows], [1.0, 2.5])
+        self.assertEqual(rows[1]['answers.order'], '["a", "b"]')
+        self.assertIsNone(rows[1]['answers.gene.on'])
+
+    @skipIf(research.pa is None, "pyarrow not installed")
+    def test_parquet_output(self):
+        archive = self._export('parquet')
+        table = research.pq.read_table(io.BytesIO(archive.read('responses_day_1.parquet')))
+        self.assertEqual(table.num_rows, 2)
+        self.assertEqual(str(table.schema.field('answers.q1').type), 'double')
+        self.assertEqual(table.column('classroom_id').to_pylist(), [self.classroom.pk] * 2)
+
+
+class ClassroomDashboardTests(APITestCase):
+    ROSTER_SIZE = 300
+
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=self.teacher)
+        module = Module.objects.create(day=1, title="Day 1", content="C1", classroom=self.classroom)
+        # bulk_create skips the per-student signals, which is all this test needs
+        users = CustomUser.objects.bulk_create(
+            CustomUser(username=f"stu{i}", is_student=True) for i in range(self.ROSTER_SIZE)
+        )
+        Student.objects.bulk_create(Student(user=u, classroom=self.classroom) for u in users)
+        StudentResponse.objects.bulk_create(StudentResponse(student=u, module=module, answers={}) for u in users)
+        QuizAttempt.objects.bulk_create(
+            QuizAttempt(student=u, quiz_type=QuizAttempt.PRE, score=0.5, attempt_data={}) for u in users
+        )
+        rebuild_progress([self.classroom.pk])
+        ScheduledMessage.objects.create(
+            classroom=self.classroom, subject="Hi", body="...", scheduled_time=timezone.now()
+        )
+        self.client.force_authenticate(user=self.teacher)
+
+    def test_dashboard_uses_fixed_query_budget(self):
+        with self.assertNumQueries(5):
+            resp = self.client.get(reverse('teacher-classroom-dashboard', args=[self.classroom.pk]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['classroom']['name'], "Bio 1")
+        self.assertEqual(len(resp.data['roster']), self.ROSTER_SIZE)
+        self.assertEqual(resp.data['progress']['by_day'][0]['completed'], self.ROSTER_SIZE)
+        self.assertEqual(resp.data['quizzes']['pre']['count'], self.ROSTER_SIZE)
+        self.assertEqual(len(resp.data['scheduled_messages']), 1)
+
+    def test_other_teacher_gets_404(self):
+        other = CustomUser.objects.create_user(username="other", is_teacher=True)
+        self.client.force_authenticate(user=other)
+        resp = self.client.get(reverse('teacher-classroom-dashboard', args=[self.classroom.pk]))
+        self.assertEqual(resp.status_code, 404)
+
+
+class TeacherAnalyticsTests(APITestCase):
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classrooms = [
+            Classroom.objects.create(name=f"Bio {i}", teacher=self.teacher) for i in range(3)
+        ]
+        module = Module.objects.create(day=2, title="Day 2", content="C2", classroom=self.classrooms[0])
+        for i, classroom in enumerate(self.classrooms):
+            users = CustomUser.objects.bulk_create(
+                CustomUser(username=f"stu{i}_{j}", is_student=True) for j in range(i + 1)
+            )
+            Student.objects.bulk_create(Student(user=u, classroom=classroom) for u in users)
+            StudentResponse.objects.bulk_create(StudentResponse(student=u, module=module, answers={}) for u in users)
+            QuizAttempt.objects.bulk_create(
+                QuizAttempt(student=u, quiz_type=QuizAttempt.POST, score=0.2 * (i + 1), attempt_data={}) for u in users
+            )
+        self.client.force_authenticate(user=self.teacher)
+
+    def test_all_classrooms_in_three_queries(self):
+        with self.assertNumQueries(3):
+            data = self.client.get(reverse('teacher-analytics')).data['classrooms']
+        self.assertEqual([c['name'] for c in data], ["Bio 0", "Bio 1", "Bio 2"])
+        self.assertEqual([c['by_day'][1]['completed'] for c in data], [1, 2, 3])
+        self.assertEqual(data[2]['by_day'][1]['percent'], 100)
+        self.assertAlmostEqual(data[1]['quizzes']['post']['average'], 0.4)
+        self.assertEqual(data[0]['quizzes']['pre']['count'], 0)
+
+    def test_date_range_filters(self):
+        QuizAttempt.objects.filter(student__username="stu2_0").update(timestamp=timezone.now() - timedelta(days=30))
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        data = self.client.get(reverse('teacher-analytics'), {'since': since}).data['classrooms']
+        self.assertEqual(data[2]['quizzes']['post']['count'], 2)
+
+        resp = self.client.get(reverse('teacher-analytics'), {'since': since, 'until': since})
+        self.assertEqual(resp.status_code, 400)
+
+
+class QuizItemAnalysisTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=self.teacher)
+        self.q1 = QuizQuestion.objects.create(
+            quiz_type=QuizQuestion.PRE, classroom=self.classroom, question_text="Q1",
+            choices={"A": "x", "B": "y", "C": "z"}, answer="A",
+        )
+        self.q2 = QuizQuestion.objects.create(
+            quiz_type=QuizQuestion.PRE, classroom=self.classroom, question_text="Q2",
+            choices={"A": "x", "B": "y"}, answer="B",
+        )
+        # stu0 and stu1 get both right, stu2 gets only q2, stu3 gets neither
+        answers = [("A", "B"), ("A", "B"), ("C", "B"), ("B", None)]
+        self.users = []
+        for i, (a1, a2) in enumerate(answers):
+            user = CustomUser.objects.create_user(username=f"stu{i}", is_student=True)
+            Student.objects.create(user=user, classroom=self.classroom)
+            data = {str(self.q1.pk): a1}
+            if a2:
+                data[str(self.q2.pk)] = a2
+            QuizAttempt.objects.create(student=user, quiz_type=QuizAttempt.PRE, score=0, attempt_data=data)
+            self.users.append(user)
+        self.client.force_authenticate(user=self.teacher)
+        self.url = reverse('teacher-classroom-quiz-items', args=[self.classroom.pk, 'pre'])
+
+    def test_item_statistics(self):
+        data = self.client.get(self.url).data
+        self.assertEqual(data['students'], 4)
+        q1, q2 = data['items']
+        self.assertEqual(q1['difficulty'], 0.5)
+        self.assertEqual(q2['difficulty'], 0.75)
+        self.assertEqual(q1['discrimination'], 1.0)
+        self.assertEqual(q1['options'], {"A": 2, "B": 1, "C": 1})
+        self.assertEqual(q2['blank'], 1)
+
+    def test_report_is_cached_until_new_attempt(self):
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = CustomUser.objects.create_user(username="late", is_student=True)
+            Student.objects.create(user=user, classroom=self.classroom)
+            QuizAttempt.objects.create(
+                student=user, quiz_type=QuizAttempt.PRE, score=0, attempt_data={str(self.q1.pk): "A"}
+            )
+        self.assertEqual(self.client.get(self.url).data['students'], 5)
+
+    def test_unhashable_choices_count_as_blank(self):
+        QuizAttempt.objects.filter(student=self.users[3]).update(attempt_data={str(self.q1.pk): ["A"]})
+        q1 = self.client.get(self.url).data['items'][0]
+        self.assertEqual(q1['blank'], 1)
+        self.assertEqual(q1['options'], {"A": 2, "B": 0, "C": 1})
+
+
+class ScheduledMessageFanoutTests(APITestCase):
+    def setUp(self):
+        self.teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=self.teacher)
+        users = CustomUser.objects.bulk_create(
+            CustomUser(username=f"stu{i}", is_student=True) for i in range(25)
+        )
+        Student.objects.bulk_create(Student(user=u, classroom=self.classroom) for u in users)
+        self.users = users
+        self.msg = ScheduledMessage.objects.create(
+            classroom=self.classroom, subject="Lab day", body="Bring goggles", scheduled_time=timezone.now()
+        )
+
+    @mock.patch('classroom_admin.tasks.FANOUT_CHUNK_SIZE', 10)
+    def test_fanout_is_chunked(self):
+        with CaptureQueriesContext(connection) as ctx:
+            delivered = schedule_message_task(self.msg.pk)
+        inserts = [q for q in ctx.captured_queries if q['sql'].startswith('INSERT')]
+        # one content row, then three chunks of delivery rows
+        self.assertEqual(len(inserts), 4)
+        self.assertEqual(delivered, 25)
+        self.assertEqual(MessageContent.objects.filter(subject="Lab day").count(), 1)
+        self.assertEqual(Message.objects.filter(content__subject="Lab day").count(), 25)
+        self.msg.refresh_from_db()
+        self.assertTrue(self.msg.sent)
+
+    def test_retry_and_existing_rows_are_safe(self):
+        # Content and a delivery row left behind by an earlier, interrupted run
+        content = MessageContent.objects.create(sender=self.teacher, subject="Lab day", body="Bring goggles")
+        ScheduledMessage.objects.filter(pk=self.msg.pk).update(content=content)
+        Message.objects.create(content=content, sender=self.teacher, recipient=self.users[0])
+        schedule_message_task(self.msg.pk)
+        self.assertEqual(schedule_message_task(self.msg.pk), 0)
+        self.assertEqual(MessageContent.objects.count(), 1)
+        self.assertEqual(Message.objects.filter(content=content).count(), 25)
+
+    def test_dispatcher_sends_only_due_messages(self):
+        later = ScheduledMessage.objects.create(
+            classroom=self.classroom, subject="Field trip", body="...",
+            scheduled_time=timezone.now() + timedelta(days=1),
+        )
+        self.assertEqual(dispatch_due_messages(batch_size=1), 1)
+        self.assertEqual(dispatch_due_messages(), 0)
+        self.msg.refresh_from_db()
+        later.refresh_from_db()
+        self.assertTrue(self.msg.sent)
+        self.assertFalse(later.sent)
+        self.assertEqual(Message.objects.filter(content__subject="Field trip").count(), 0)
+
+    def test_dispatcher_isolates_a_failing_message(self):
+        broken = ScheduledMessage.objects.create(
+            classroom=self.classroom, subject="Broken", body="...",
+            scheduled_time=timezone.now() - timedelta(hours=1),
+        )
+        deliver = tasks._deliver
+
+        def flaky(msg):
+            if msg.pk == broken.pk:
+                raise OSError("attachment missing")
+            return deliver(msg)
+
+        with mock.patch('classroom_admin.tasks._deliver', side_effect=flaky), \
+                self.assertLogs('classroom_admin.tasks', 'ERROR'):
+            # the broken message is due first and shares the batch
+            self.assertEqual(dispatch_due_messages(), 1)
+            broken.refresh_from_db()
+            self.assertEqual((broken.sent, broken.failures), (False, 1))
+            self.assertIn("attachment missing", broken.last_error)
+            self.assertFalse(MessageContent.objects.filter(subject="Broken").exists())
+            self.msg.refresh_from_db()
+            self.assertTrue(self.msg.sent)
+
+            for _ in range(MAX_DISPATCH_FAILURES):
+                dispatch_due_messages()
+            broken.refresh_from_db()
+            self.assertEqual(broken.failures, MAX_DISPATCH_FAILURES)
+
+    def test_create_no_longer_enqueues_eta_task(self):
+        self.client.force_authenticate(user=self.teacher)
+        url = reverse('teacher-schedule-messages', args=[self.classroom.pk])
+        with mock.patch('classroom_admin.api_views.send_scheduled_message_task.delay') as delay:
+            resp = self.client.post(url, {
+                'subject': "Later", 'body': "...",
+                'scheduled_time': (timezone.now() + timedelta(hours=1)).isoformat(),
+            })
+        self.assertEqual(resp.status_code, 201)
+        delay.assert_not_called()
@@ -13,4 +13,16 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "scitrek_backend.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Imported after setup: needs settings and the app registry
+from student_activities.push import INBOX_STREAM_PATH, inbox_stream  # noqa: E402
+
+
+async def application(scope, receive, send):
+    # Everything in one process, for the dev server. Production serves
+    # Django on WSGI and the stream from scitrek_backend/stream_asgi.py,
+    # since Django under ASGI buffers streamed and file responses.
+    if scope['type'] == 'http' and scope['path'] == INBOX_STREAM_PATH:
+        return await inbox_stream(scope, receive, send)
+    return await django_application(scope, receive, send)
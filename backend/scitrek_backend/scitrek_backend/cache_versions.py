@@ -0,0 +1,35 @@
+# scitrek_backend/cache_versions.py
+"""
+Version tokens for cached, derived data.
+
+Cached payloads embed the current token of every input they were built
+from; writers bump the token instead of hunting down dependent keys. A
+token that has been evicted is simply re-minted, which can only cause a
+cache miss, never a stale hit.
+
+Writers inside a transaction must bump on commit: a bump before commit
+lets a concurrent reader rebuild from the old rows under the new token.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _key(namespace, parts):
+    return ":".join(["version", namespace, *map(str, parts)])
+
+
+def get_version(namespace, *parts):
+    return cache.get_or_set(_key(namespace, parts), lambda: uuid.uuid4().hex[:12], timeout=None)
+
+
+def bump_version(namespace, *parts):
+    cache.set(_key(namespace, parts), uuid.uuid4().hex[:12], timeout=None)
+
+
+def bump_version_on_commit(namespace, *parts):
+    """
+    bump_version once the current transaction commits (immediately outside one).
+    """
+    transaction.on_commit(lambda: bump_version(namespace, *parts))
@@ -94,6 +94,7 @@ REST_FRAMEWORK = {
         'anon':     '100/day',
         'response': '30/minute',   # scoped to ResponseUpsert
         'quiz':     '20/minute',   # scoped to QuizAttemptUpsert
+        'batch':    '30/minute',   # scoped to StudentBatchAPIView
     },
 
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
@@ -134,11 +135,37 @@ STATICFILES_DIRS = [
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 MEDIA_URL = "media/"
+# Celery workers write export artifacts and inbox attachments that the web
+# process serves, so every service must mount the same MEDIA_ROOT (the
+# `media` volume in the compose files) or use a shared storage backend.
 MEDIA_ROOT = BASE_DIR / "media"
 
 # Default primary key field type
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Shared cache (Redis under docker-compose); per-process memory otherwise
+CACHE_URL = os.getenv('CACHE_URL')
+if CACHE_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# Redis pub/sub for inbox push (student_activities.push); in-process when unset
+INBOX_PUSH_URL = os.getenv('INBOX_PUSH_URL', '')
+
+# Redis write-behind buffer for response autosaves (student_activities.response_buffer);
+# autosaves write straight to the database when unset
+RESPONSE_BUFFER_URL = os.getenv('RESPONSE_BUFFER_URL', '')
+
 # Broker & result backend (e.g. Redis)
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://redis:6379/0')
 CELERY_RESULT_BACKEND = CELERY_BROKER_URL
@@ -148,4 +175,16 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 
+# Periodic tasks (run by `celery -A scitrek_backend beat`)
+CELERY_BEAT_SCHEDULE = {
+    'dispatch-scheduled-messages': {
+        'task':     'classroom_admin.tasks.dispatch_due_messages',
+        'schedule': float(os.getenv('MESSAGE_DISPATCH_INTERVAL', 30)),
+    },
+    'flush-response-buffer': {
+        'task':     'student_activities.tasks.flush_response_buffer',
+        'schedule': float(os.getenv('RESPONSE_FLUSH_INTERVAL', 10)),
+    },
+}
+
 print("🧠 Loaded settings:", os.environ.get("DJANGO_SETTINGS_MODULE"))
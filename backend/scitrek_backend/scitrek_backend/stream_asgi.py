@@ -0,0 +1,42 @@
+"""
+ASGI app serving only the inbox event stream (student_activities.push).
+
+Production runs Django on WSGI, where streamed and file responses (CSV
+exports, export artifacts, inbox attachments) go out chunk by chunk; under
+ASGI Django reads a sync iterator into memory before sending it. The
+long-lived stream therefore runs as its own small service, and nginx
+routes INBOX_STREAM_PATH to it.
+"""
+
+import os
+
+import django
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "scitrek_backend.settings")
+django.setup()
+
+# Imported after setup: needs settings and the app registry
+from student_activities.push import INBOX_STREAM_PATH, inbox_stream  # noqa: E402
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await _lifespan(receive, send)
+    if scope['type'] == 'http' and scope['path'] == INBOX_STREAM_PATH:
+        return await inbox_stream(scope, receive, send)
+    await send({
+        'type': 'http.response.start',
+        'status': 404,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+    })
+    await send({'type': 'http.response.body', 'body': b"Not found"})
@@ -0,0 +1,25 @@
+# scitrek_backend/testing.py
+"""
+Shared base classes for the apps' tests.
+"""
+from unittest import mock
+
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+
+class ScitrekTestMixin:
+    """
+    Stubs the inbox seeding task that Student creation enqueues (there is
+    no broker in tests) and starts every test from an empty cache.
+    """
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('student_activities.signals.seed_inbox_for_user.delay')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+
+
+class ScitrekAPITestCase(ScitrekTestMixin, APITestCase):
+    pass
@@ -2,18 +2,31 @@
 
 from django.contrib import admin
 from .models import (
+    Attachment,
     Message,
+    MessageContent,
     Module,
     StudentResponse,
     QuizAttempt,
     QuizQuestion,       # if you want to manage questions via admin
 )
 
+@admin.register(Attachment)
+class AttachmentAdmin(admin.ModelAdmin):
+    list_display  = ('sha256', 'content_type', 'size', 'created_at')
+    search_fields = ('sha256',)
+
+@admin.register(MessageContent)
+class MessageContentAdmin(admin.ModelAdmin):
+    list_display  = ('subject', 'sender', 'created_at')
+    search_fields = ('subject',)
+
 @admin.register(Message)
 class MessageAdmin(admin.ModelAdmin):
-    list_display  = ('subject', 'sender', 'recipient', 'timestamp', 'is_read')
+    list_display  = ('content', 'sender', 'recipient', 'timestamp', 'is_read')
     list_filter   = ('is_read',)
-    search_fields = ('subject',)
+    list_select_related = ('content', 'sender', 'recipient')
+    search_fields = ('content__subject',)
 
 @admin.register(Module)
 class ModuleAdmin(admin.ModelAdmin):
@@ -12,7 +12,12 @@ from .api_views import (
     QuizAttemptUpsert,
     ProgressView,
     InboxListView,
+    InboxUnreadCountAPIView,
+    InboxStreamTicketAPIView,
     InboxReadToggleAPIView,
+    InboxBulkReadAPIView,
+    InboxAttachmentAPIView,
+    StudentBatchAPIView,
 )
 
 urlpatterns = [
@@ -42,5 +47,12 @@ urlpatterns = [
 
     # 8. Inbox
     path('inbox/',              InboxListView.as_view(),       name='api-inbox'),
+    path('inbox/unread-count/', InboxUnreadCountAPIView.as_view(), name='api-inbox-unread-count'),
+    path('inbox/stream/ticket/', InboxStreamTicketAPIView.as_view(), name='api-inbox-stream-ticket'),
     path('inbox/<int:pk>/read/', InboxReadToggleAPIView.as_view(), name='api-inbox-read'),
+    path('inbox/read/',          InboxBulkReadAPIView.as_view(),   name='api-inbox-bulk-read'),
+    path('inbox/<int:pk>/attachment/', InboxAttachmentAPIView.as_view(), name='api-inbox-attachment'),
+
+    # 9. Batch
+    path('batch/', StudentBatchAPIView.as_view(), name='api-student-batch'),
 ]
@@ -5,12 +5,29 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
-from rest_framework.throttling import ScopedRateThrottle
+from rest_framework.throttling import ScopedRateThrottle, UserRateThrottle
 from rest_framework.generics import RetrieveAPIView
+from rest_framework.pagination import Cursor, CursorPagination
+from rest_framework.exceptions import APIException, NotFound, Throttled, ValidationError
 from django.shortcuts import get_object_or_404
+from django.db import transaction
+from django.db.models import Q, Subquery
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils.cache import patch_cache_control
+from django.utils.dateparse import parse_datetime
 
 from classroom_admin.models import Student as StudentProfile
+from classroom_admin.progress import record_response_created
+from . import response_buffer
+from .autosave import apply_answers_patch, merge_patch
+from .classroom_lookup import student_classroom_id
+from .content_cache import (
+    cached_modules, cached_questions, conditional_response, modules_version, questions_version,
+)
 from .models import Module, StudentResponse, QuizAttempt, Message, QuizQuestion
+from .progress_summary import build_progress, forget_progress, progress_summary
+from .push import issue_stream_ticket
+from .tasks import virtual_scientist_id
 from .serializers import (
     CustomStudentSignupSerializer,
     StudentProfileSerializer,
@@ -19,8 +36,11 @@ from .serializers import (
     StudentResponseSerializer,
     QuizAttemptSerializer,
     ReadOnlyMessageSerializer,
-    QuizQuestionSerializer
+    InboxBulkReadSerializer,
+    QuizQuestionSerializer,
+    BatchSerializer
 )
+from .grading import answer_key, grade
 
 # ── 1. Signup ──────────────────────────────────────────────────────────────────────
 class CustomStudentSignupAPIView(generics.CreateAPIView):
@@ -45,43 +65,157 @@ class ModuleListAPIView(generics.ListAPIView):
     serializer_class   = ModuleSerializer
 
     def get_queryset(self):
-        classroom = get_object_or_404(StudentProfile, user=self.request.user).classroom
-        return Module.objects.filter(classroom=classroom).order_by('day')
+        classroom_id = student_classroom_id(self.request)
+        return Module.objects.filter(classroom_id=classroom_id).order_by('day')
+
+    def list(self, request, *args, **kwargs):
+        # Served from the classroom's cached payload; see content_cache
+        classroom_id = student_classroom_id(request)
+        version = modules_version(classroom_id)
+
+        def build():
+            modules = cached_modules(classroom_id, version)
+            page = self.paginate_queryset(modules)
+            if page is not None:
+                return self.get_paginated_response(page)
+            return Response(modules)
+
+        etag = f"modules-{classroom_id}-{version}-{request.GET.urlencode()}"
+        return conditional_response(request, etag, build)
 
 class ModuleDetailAPIView(generics.RetrieveAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class   = ModuleSerializer
 
     def get_object(self):
-        classroom = get_object_or_404(StudentProfile, user=self.request.user).classroom
-        return get_object_or_404(Module, pk=self.kwargs['pk'], classroom=classroom)
+        classroom_id = student_classroom_id(self.request)
+        return get_object_or_404(Module, pk=self.kwargs['pk'], classroom_id=classroom_id)
+
+    def retrieve(self, request, *args, **kwargs):
+        classroom_id = student_classroom_id(request)
+        version = modules_version(classroom_id)
+
+        def build():
+            for module in cached_modules(classroom_id, version):
+                if module['id'] == self.kwargs['pk']:
+                    return Response(module)
+            raise Http404("No such module in this classroom.")
+
+        etag = f"module-{self.kwargs['pk']}-{classroom_id}-{version}"
+        return conditional_response(request, etag, build)
 
 # ── 4. Responses ───────────────────────────────────────────────────────────────────
+class MergePatchParser(JSONParser):
+    media_type = 'application/merge-patch+json'
+
+def _save_response(user, module, defaults):
+    """
+    Full save of a student's response, superseding any buffered autosave
+    draft. Returns (obj, created).
+    """
+    buffered, _ = response_buffer.read(user.id, module.id)
+
+    # The progress rollup is bumped in the same transaction as the write
+    with transaction.atomic():
+        obj, created = StudentResponse.objects.update_or_create(
+            student=user,
+            module=module,
+            defaults=defaults
+        )
+        if created:
+            record_response_created(module.classroom_id, module.day)
+    # deferred so a batch's cached state is only dropped once it commits
+    transaction.on_commit(lambda: response_buffer.release(user.id, module.id, buffered))
+    if created:
+        transaction.on_commit(lambda: forget_progress(user.id))
+    return obj, created
+
+def _response_or_draft(user, module):
+    """
+    The student's response for a module, read through the write-behind
+    buffer: a newer draft wins. 404 if there is neither.
+    """
+    _, draft = response_buffer.read(user.id, module.id)
+    if draft is None:
+        return get_object_or_404(StudentResponse, student=user, module=module)
+    obj = (
+        StudentResponse.objects.filter(student=user, module=module).first()
+        or StudentResponse(student=user, module=module)
+    )
+    obj.answers      = draft['answers']
+    obj.completed_at = parse_datetime(draft['saved_at'])
+    return obj
+
 class ResponseUpsert(generics.CreateAPIView):
     permission_classes = [IsAuthenticated]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, JSONParser, MergePatchParser]
     throttle_classes = [ScopedRateThrottle]
     throttle_scope = 'response'
     serializer_class = StudentResponseSerializer
 
     def post(self, request, day):
         # Ensure module belongs to this student's classroom by day
-        classroom = get_object_or_404(StudentProfile, user=request.user).classroom
-        module = get_object_or_404(Module, day=day, classroom=classroom)
+        classroom_id = student_classroom_id(request)
+        module = get_object_or_404(Module, day=day, classroom_id=classroom_id)
 
         # Only include relevant response fields (answers and optional file_upload)
         allowed_fields = ['answers', 'file_upload']
         defaults = {field: request.data[field] for field in allowed_fields if field in request.data}
-
-        obj, created = StudentResponse.objects.update_or_create(
-            student=request.user,
-            module=module,
-            defaults=defaults
-        )
+        obj, created = _save_response(request.user, module, defaults)
 
         code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
         return Response(self.get_serializer(obj).data, status=code)
 
+    def patch(self, request, day):
+        """
+        Autosave: {"answers": <JSON merge-patch of the changed answers>}.
+        Only the patch travels and is written; see student_activities.autosave.
+
+        With the write-behind buffer on, autosaves are staged and answered
+        with 202; pass "final": true to write through now.
+        """
+        classroom_id = student_classroom_id(request)
+        module = get_object_or_404(Module, day=day, classroom_id=classroom_id)
+        patch = request.data.get('answers')
+        if not isinstance(patch, dict):
+            return Response(
+                {'answers': ["Expected a JSON merge-patch object."]},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        final = bool(request.data.get('final'))
+
+        buffered, draft = response_buffer.read(request.user.id, module.id)
+        if response_buffer.get_buffer() is not None and not final:
+            if draft is not None:
+                current = draft['answers']
+            else:
+                current = StudentResponse.objects.filter(
+                    student=request.user, module=module
+                ).values_list('answers', flat=True).first() or {}
+            response_buffer.stage(
+                request.user.id, module.id, classroom_id, module.day, merge_patch(current, patch)
+            )
+            return Response({'module': module.id, 'buffered': True}, status=status.HTTP_202_ACCEPTED)
+
+        with transaction.atomic():
+            if draft is not None:
+                # the draft holds the full latest answers; write them out whole
+                obj, created = StudentResponse.objects.update_or_create(
+                    student=request.user, module=module,
+                    defaults={'answers': merge_patch(draft['answers'], patch)}
+                )
+                completed_at = obj.completed_at
+            else:
+                created, completed_at = apply_answers_patch(request.user.id, module.id, patch)
+            if created:
+                record_response_created(classroom_id, module.day)
+        response_buffer.release(request.user.id, module.id, buffered)
+        if created:
+            forget_progress(request.user.id)
+
+        code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        return Response({'module': module.id, 'completed_at': completed_at}, status=code)
+
 
 class ResponseDetailAPIView(RetrieveAPIView):
     """
@@ -93,9 +227,9 @@ class ResponseDetailAPIView(RetrieveAPIView):
     serializer_class = StudentResponseSerializer
 
     def get_object(self):
-        classroom = get_object_or_404(StudentProfile, user=self.request.user).classroom
-        module = get_object_or_404(Module, day=self.kwargs['day'], classroom=classroom)
-        return get_object_or_404(StudentResponse, student=self.request.user, module=module)
+        classroom_id = student_classroom_id(self.request)
+        module = get_object_or_404(Module, day=self.kwargs['day'], classroom_id=classroom_id)
+        return _response_or_draft(self.request.user, module)
 
 
 # ── 5. Quiz attempts ────────────────────────────────────────────────────────────────
@@ -106,76 +240,322 @@ class QuizAttemptUpsert(generics.CreateAPIView):
     serializer_class   = QuizAttemptSerializer
 
     def post(self, request):
-        qt        = request.data.get('quiz_type')
-        classroom = get_object_or_404(StudentProfile, user=request.user).classroom
-        get_object_or_404(QuizQuestion, quiz_type=qt, classroom=classroom)
-
+        # validate first so a bad quiz_type is a 400, not a missing answer key
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+
+        qt           = serializer.validated_data['quiz_type']
+        classroom_id = student_classroom_id(request)
+        answers      = answer_key(classroom_id, qt) if classroom_id else {}
+        if not answers:
+            raise Http404("No quiz questions for this classroom.")
+
+        # Graded here from the answer key; any client-sent score is ignored
+        score = grade(serializer.validated_data['attempt_data'], answers)
         obj, created = QuizAttempt.objects.update_or_create(
             student=request.user,
             quiz_type=serializer.validated_data['quiz_type'],
-            defaults=serializer.validated_data
+            defaults={**serializer.validated_data, 'score': score}
         )
+        forget_progress(request.user.id)
         code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
         return Response(self.get_serializer(obj).data, status=code)
 
 # ── 6. Quiz questions ─────────────────────────────────────────────────────────────
-class QuizPreQuestionListAPIView(generics.ListAPIView):
+class QuizQuestionListAPIView(generics.ListAPIView):
+    """
+    One quiz's questions, without answers, from the classroom's cached
+    payload; see content_cache.
+    """
     permission_classes = [IsAuthenticated]
     serializer_class   = QuizQuestionSerializer
+    quiz_type          = None
 
     def get_queryset(self):
-        classroom = get_object_or_404(StudentProfile, user=self.request.user).classroom
-        return QuizQuestion.objects.filter(quiz_type=QuizQuestion.PRE, classroom=classroom)
+        classroom_id = student_classroom_id(self.request)
+        return QuizQuestion.objects.filter(quiz_type=self.quiz_type, classroom_id=classroom_id)
 
-class QuizPostQuestionListAPIView(generics.ListAPIView):
-    permission_classes = [IsAuthenticated]
-    serializer_class   = QuizQuestionSerializer
+    def list(self, request, *args, **kwargs):
+        classroom_id = student_classroom_id(request)
+        version = questions_version(classroom_id, self.quiz_type)
 
-    def get_queryset(self):
-        classroom = get_object_or_404(StudentProfile, user=self.request.user).classroom
-        return QuizQuestion.objects.filter(quiz_type=QuizQuestion.POST, classroom=classroom)
+        def build():
+            questions = cached_questions(classroom_id, self.quiz_type, version)
+            page = self.paginate_queryset(questions)
+            if page is not None:
+                return self.get_paginated_response(page)
+            return Response(questions)
+
+        etag = f"quiz-{self.quiz_type}-{classroom_id}-{version}-{request.GET.urlencode()}"
+        return conditional_response(request, etag, build)
+
+class QuizPreQuestionListAPIView(QuizQuestionListAPIView):
+    quiz_type = QuizQuestion.PRE
+
+class QuizPostQuestionListAPIView(QuizQuestionListAPIView):
+    quiz_type = QuizQuestion.POST
 
 # ── 7. Progress ────────────────────────────────────────────────────────────────────
 class ProgressView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        completed = StudentResponse.objects.filter(
-            student=request.user
-        ).values_list('module__day', flat=True)
-        pre  = QuizAttempt.objects.filter(student=request.user, quiz_type=QuizAttempt.PRE).first()
-        post = QuizAttempt.objects.filter(student=request.user, quiz_type=QuizAttempt.POST).first()
-        return Response({
-            'completed_days': sorted(completed),
-            'pre_score':      pre.score  if pre  else None,
-            'post_score':     post.score if post else None,
-        })
+        # cached per student; see student_activities.progress_summary
+        return Response(progress_summary(request.user.id))
 
 # ── 8. Inbox ───────────────────────────────────────────────────────────────────────
+class InboxCursorPagination(CursorPagination):
+    """
+    Keyset pagination on (timestamp, id), newest first. DRF's cursor only
+    positions on the first ordering field and steps over ties with an
+    OFFSET, and seeded messages share a timestamp; this cursor carries both
+    columns, so every page is a range scan of message_inbox_keyset_idx.
+    """
+    ordering = ('-timestamp', '-id')
+
+    def _position(self, message):
+        return f"{message.timestamp.isoformat()}|{message.pk}"
+
+    def _parse_position(self, position):
+        timestamp, _, pk = (position or '').rpartition('|')
+        try:
+            timestamp, pk = parse_datetime(timestamp), int(pk)
+        except ValueError:
+            timestamp = None
+        if timestamp is None:
+            raise NotFound(self.invalid_cursor_message)
+        return timestamp, pk
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request   = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.cursor   = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+
+        if self.cursor is None:
+            queryset = queryset.order_by('-timestamp', '-id')
+        else:
+            timestamp, pk = self._parse_position(self.cursor.position)
+            if reverse:
+                queryset = queryset.filter(
+                    Q(timestamp__gt=timestamp) | Q(timestamp=timestamp, id__gt=pk)
+                ).order_by('timestamp', 'id')
+            else:
+                queryset = queryset.filter(
+                    Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk)
+                ).order_by('-timestamp', '-id')
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        self.page = rows[:self.page_size]
+        if reverse:
+            self.page.reverse()
+        self.has_next     = self.cursor is not None if reverse else has_more
+        self.has_previous = has_more if reverse else self.cursor is not None
+        return self.page
+
+    def get_next_link(self):
+        if not (self.has_next and self.page):
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=self._position(self.page[-1])))
+
+    def get_previous_link(self):
+        if not (self.has_previous and self.page):
+            return None
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=self._position(self.page[0])))
+
 class InboxListView(generics.ListAPIView):
     permission_classes = [IsAuthenticated]
     serializer_class   = ReadOnlyMessageSerializer
+    pagination_class   = InboxCursorPagination
 
     def get_queryset(self):
-        classroom = get_object_or_404(StudentProfile, user=self.request.user).classroom
         return Message.objects.filter(
-            sender__username='virtual_scientist',
+            sender_id=virtual_scientist_id(),
             recipient=self.request.user
-        ).order_by('-timestamp')
+        ).select_related('content')
+
+class InboxUnreadCountAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        unread = Message.objects.filter(
+            recipient=request.user,
+            sender_id=virtual_scientist_id(),
+            is_read=False,
+        ).count()
+        return Response({'unread': unread})
+
+class InboxStreamTicketAPIView(APIView):
+    """
+    POST -> {'ticket'}: a single-use ticket for opening the inbox event
+    stream, valid for push.TICKET_TTL seconds.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        return Response({'ticket': issue_stream_ticket(request.user.id)}, status=status.HTTP_201_CREATED)
 
 class InboxReadToggleAPIView(APIView):
     permission_classes = [IsAuthenticated]
 
     def patch(self, request, pk):
-        classroom = get_object_or_404(StudentProfile, user=request.user).classroom
         msg = get_object_or_404(
-            Message,
+            Message.objects.select_related('content'),
             pk=pk,
             recipient=request.user,
-            sender__username='virtual_scientist'
+            sender_id=virtual_scientist_id()
         )
         msg.is_read = request.data.get('is_read', True)
-        msg.save()
+        msg.save(update_fields=['is_read'])
         return Response(ReadOnlyMessageSerializer(msg).data)
+
+class InboxBulkReadAPIView(APIView):
+    """
+    Mark many messages read or unread with one UPDATE; returns how many
+    rows changed and the new unread count.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        serializer = InboxBulkReadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data    = serializer.validated_data
+        is_read = data['is_read']
+
+        inbox  = Message.objects.filter(recipient=request.user, sender_id=virtual_scientist_id())
+        target = inbox.exclude(is_read=is_read)
+        if 'ids' in data:
+            target = target.filter(id__in=data['ids'])
+        elif 'through' in data:
+            anchor = Subquery(inbox.filter(pk=data['through']).values('timestamp')[:1])
+            target = target.filter(
+                Q(timestamp__lt=anchor) | Q(timestamp=anchor, id__lte=data['through'])
+            )
+        updated = target.update(is_read=is_read)
+        return Response({'updated': updated, 'unread': inbox.filter(is_read=False).count()})
+
+class InboxAttachmentAPIView(APIView):
+    """
+    Stream a message's attachment. Blobs are content-addressed and never
+    change, so the hash doubles as a strong ETag and clients may cache
+    the file for as long as they like.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request, pk):
+        msg = get_object_or_404(
+            Message.objects.select_related('content__attachment'),
+            pk=pk,
+            recipient=request.user,
+            content__attachment__isnull=False,
+        )
+        blob = msg.content.attachment
+        etag = f'"{blob.sha256}"'
+        if etag in request.headers.get('If-None-Match', ''):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(
+                blob.file.open('rb'),
+                as_attachment=True,
+                filename=msg.content.attachment_name or blob.sha256,
+                content_type=blob.content_type or None,
+            )
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, max_age=60 * 60 * 24 * 365, immutable=True)
+        return response
+
+# ── 9. Batch ───────────────────────────────────────────────────────────────────────
+class SaveResponseThrottle(UserRateThrottle):
+    """
+    The 'response' bucket ResponseUpsert is throttled on (same cache key),
+    charged once per save_response op so a batch cannot widen it.
+    """
+    scope = 'response'
+
+class StudentBatchAPIView(APIView):
+    """
+    POST {"operations": [{"op": "profile"}, {"op": "save_response", "day": 2,
+    "answers": {...}}, ...]} -> {"results": [{"op", "status", "data"}, ...]}.
+
+    Runs everything in one transaction with the classroom resolved once.
+    Each operation gets its own savepoint and status, so a failed one is
+    rolled back and reported without undoing the others.
+
+    The batch itself counts against the 'batch' scope; every save_response
+    also counts against 'response', and past that limit is reported 429.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_classes   = [ScopedRateThrottle]
+    throttle_scope     = 'batch'
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        self._modules = None
+        self._wrote   = False
+
+        results = []
+        with transaction.atomic():
+            for op in serializer.validated_data['operations']:
+                try:
+                    with transaction.atomic():
+                        code, data = getattr(self, f"op_{op['op']}")(request, op)
+                except Http404 as exc:
+                    code, data = status.HTTP_404_NOT_FOUND, {'detail': str(exc)}
+                except ValidationError as exc:
+                    code, data = exc.status_code, exc.detail
+                except APIException as exc:
+                    code, data = exc.status_code, {'detail': exc.detail}
+                results.append({'op': op['op'], 'status': code, 'data': data})
+        return Response({'results': results})
+
+    def _module(self, request, day):
+        # every module of the classroom in one query, keyed by day
+        if self._modules is None:
+            self._modules = Module.objects.filter(
+                classroom_id=student_classroom_id(request)
+            ).in_bulk(field_name='day')
+        module = self._modules.get(day)
+        if module is None:
+            raise Http404("No module for this day in your classroom.")
+        return module
+
+    def op_profile(self, request, op):
+        profile = get_object_or_404(
+            StudentProfile.objects.select_related('user', 'classroom'), user=request.user
+        )
+        return status.HTTP_200_OK, StudentProfileSerializer(profile).data
+
+    def op_modules(self, request, op):
+        classroom_id = student_classroom_id(request)
+        return status.HTTP_200_OK, cached_modules(classroom_id, modules_version(classroom_id))
+
+    def op_module(self, request, op):
+        classroom_id = student_classroom_id(request)
+        for module in cached_modules(classroom_id, modules_version(classroom_id)):
+            if module['id'] == op['id']:
+                return status.HTTP_200_OK, module
+        raise Http404("No such module in this classroom.")
+
+    def op_progress(self, request, op):
+        # after a write in this batch the cached summary is stale until commit
+        if self._wrote:
+            return status.HTTP_200_OK, build_progress(request.user.id)
+        return status.HTTP_200_OK, progress_summary(request.user.id)
+
+    def op_response(self, request, op):
+        obj = _response_or_draft(request.user, self._module(request, op['day']))
+        return status.HTTP_200_OK, StudentResponseSerializer(obj, context={'request': request}).data
+
+    def op_save_response(self, request, op):
+        throttle = SaveResponseThrottle()
+        if not throttle.allow_request(request, self):
+            raise Throttled(throttle.wait())
+        obj, created = _save_response(request.user, self._module(request, op['day']), {'answers': op['answers']})
+        self._wrote = True
+        code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        return code, StudentResponseSerializer(obj, context={'request': request}).data
@@ -0,0 +1,88 @@
+# student_activities/attachments.py
+"""
+Content-addressed storage for message attachments.
+
+A file is hashed in chunks and stored once under its SHA-256; sending the
+same file again, to one student or a thousand, reuses the existing blob.
+Blobs are stored when a message is created, on the web side, so workers
+only ever copy the foreign key.
+"""
+import hashlib
+import mimetypes
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.core.files import File
+from django.db import IntegrityError, transaction
+
+from .models import Attachment
+
+CHUNK_SIZE = 64 * 1024
+
+# files written by store_attachment inside the innermost atomic_with_blobs
+_new_files = ContextVar('new_attachment_files', default=None)
+
+
+def content_hash(fh):
+    digest = hashlib.sha256()
+    for chunk in File(fh).chunks(CHUNK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_attachment(fieldfile):
+    """
+    Return the Attachment blob holding `fieldfile`'s bytes, creating it on
+    first sight. Returns None for an empty field.
+    """
+    if not fieldfile:
+        return None
+    with fieldfile.open('rb') as fh:
+        sha256 = content_hash(fh)
+        blob = Attachment.objects.filter(sha256=sha256).first()
+        if blob is not None:
+            return blob
+
+        fh.seek(0)
+        blob = Attachment(
+            sha256=sha256,
+            size=fieldfile.size,
+            content_type=mimetypes.guess_type(fieldfile.name)[0] or '',
+        )
+        blob.file.save(sha256, File(fh), save=False)
+    try:
+        with transaction.atomic():
+            blob.save()
+    except IntegrityError:
+        # Another sender stored the same bytes first; keep theirs
+        blob.file.delete(save=False)
+        return Attachment.objects.get(sha256=sha256)
+    written = _new_files.get()
+    if written is not None:
+        written.append(blob.file)
+    return blob
+
+
+@contextmanager
+def atomic_with_blobs():
+    """
+    transaction.atomic() for code that stores attachments: if the block
+    fails, the files of blobs created inside it are deleted along with the
+    rolled-back rows.
+    """
+    written = []
+    token = _new_files.set(written)
+    try:
+        with transaction.atomic():
+            yield
+    except BaseException:
+        for fieldfile in written:
+            fieldfile.storage.delete(fieldfile.name)
+        raise
+    finally:
+        _new_files.reset(token)
+
+
+def attachment_name(fieldfile):
+    return os.path.basename(fieldfile.name) if fieldfile else ''
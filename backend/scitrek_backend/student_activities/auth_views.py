@@ -4,7 +4,7 @@ from rest_framework import status
 from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 
-from student_activities.tasks import seed_inbox_for_user
+from student_activities.tasks import inbox_is_current, seed_inbox_for_user
 
 class MyTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
@@ -27,8 +27,9 @@ class MyTokenObtainPairView(TokenObtainPairView):
         tokens = serializer.validated_data
         user = getattr(serializer, "_authed_user", None)
 
-        # Enqueue seeding for active students (idempotent: safe every login)
-        if user and getattr(user, "is_active", False) and getattr(user, "is_student", False):
+        # Enqueue seeding for active students whose inbox predates the current templates
+        if (user and getattr(user, "is_active", False) and getattr(user, "is_student", False)
+                and not inbox_is_current(user)):
             seed_inbox_for_user.delay(user.id)
 
         return Response(tokens, status=status.HTTP_200_OK)
@@ -0,0 +1,89 @@
+# student_activities/autosave.py
+"""
+Incremental autosave of StudentResponse.answers.
+
+Clients send an RFC 7386 JSON merge-patch of the answers they changed:
+keys set a value, `null` removes a key, nested objects merge
+recursively. On PostgreSQL a patch without nested objects is applied by
+a single INSERT ... ON CONFLICT DO UPDATE using jsonb `||` and `-`;
+anything else takes the portable path, a locked read-modify-write of
+the one row.
+"""
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+
+from .models import StudentResponse
+
+
+def merge_patch(target, patch):
+    """
+    RFC 7386: apply `patch` to `target` and return the result.
+    """
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        if value is None:
+            result.pop(key, None)
+        else:
+            result[key] = merge_patch(result.get(key), value)
+    return result
+
+
+def _is_flat(patch):
+    return not any(isinstance(value, dict) for value in patch.values())
+
+
+def _upsert_sql(student_id, module_id, patch):
+    table = connection.ops.quote_name(StudentResponse._meta.db_table)
+    sets = {key: value for key, value in patch.items() if value is not None}
+    removed = [key for key, value in patch.items() if value is None]
+    field = StudentResponse._meta.get_field('answers')
+    sql = f"""
+        INSERT INTO {table} (student_id, module_id, answers, completed_at)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (student_id, module_id) DO UPDATE SET
+            answers = CASE
+                WHEN jsonb_typeof({table}.answers) = 'object'
+                THEN ({table}.answers || EXCLUDED.answers) - %s::text[]
+                ELSE EXCLUDED.answers
+            END,
+            completed_at = EXCLUDED.completed_at
+        RETURNING completed_at, (xmax = 0) AS inserted
+    """
+    params = [
+        student_id, module_id, field.get_db_prep_value(sets, connection),
+        timezone.now(), removed,
+    ]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        completed_at, inserted = cursor.fetchone()
+    return inserted, completed_at
+
+
+def _upsert_locked(student_id, module_id, patch):
+    rows = StudentResponse.objects.select_for_update().filter(student_id=student_id, module_id=module_id)
+    obj = rows.first()
+    if obj is None:
+        try:
+            with transaction.atomic():
+                obj = StudentResponse.objects.create(
+                    student_id=student_id, module_id=module_id, answers=merge_patch({}, patch)
+                )
+            return True, obj.completed_at
+        except IntegrityError:
+            # a concurrent first save won the insert; patch its row instead
+            obj = rows.get()
+    obj.answers = merge_patch(obj.answers, patch)
+    obj.save(update_fields=['answers', 'completed_at'])
+    return False, obj.completed_at
+
+
+def apply_answers_patch(student_id, module_id, patch):
+    """
+    Merge `patch` into the student's answers for a module, creating the
+    response if needed. Call inside a transaction. Returns (created, completed_at).
+    """
+    if connection.vendor == 'postgresql' and _is_flat(patch):
+        return _upsert_sql(student_id, module_id, patch)
+    return _upsert_locked(student_id, module_id, patch)
@@ -0,0 +1,47 @@
+# student_activities/classroom_lookup.py
+"""
+The requesting student's classroom id without a Student query per call.
+
+The id is memoized on the request and cached across requests under the
+user's id. Saving or deleting the Student row drops the cached value
+(see student_activities.signals).
+"""
+from django.core.cache import cache
+from django.http import Http404
+
+from classroom_admin.models import Student as StudentProfile
+
+CACHE_TIMEOUT = 60 * 60
+_MISS = object()
+
+
+def _cache_key(user_id):
+    return f"student-classroom:{user_id}"
+
+
+def student_classroom_id(request):
+    """
+    Classroom id for request.user (None if the profile has no classroom).
+    Raises Http404 when the user has no Student profile.
+    """
+    classroom_id = getattr(request, '_student_classroom_id', _MISS)
+    if classroom_id is not _MISS:
+        return classroom_id
+
+    key = _cache_key(request.user.id)
+    classroom_id = cache.get(key, _MISS)
+    if classroom_id is _MISS:
+        rows = list(
+            StudentProfile.objects.filter(user_id=request.user.id)
+            .values_list('classroom_id', flat=True)[:1]
+        )
+        if not rows:
+            raise Http404("No student profile.")
+        classroom_id = rows[0]
+        cache.set(key, classroom_id, CACHE_TIMEOUT)
+    request._student_classroom_id = classroom_id
+    return classroom_id
+
+
+def forget_student_classroom(user_id):
+    cache.delete(_cache_key(user_id))
@@ -0,0 +1,96 @@
+# student_activities/content_cache.py
+"""
+Cached, versioned payloads for content a whole classroom reads at once.
+
+Payloads are stored already serialized under a key that embeds the
+classroom's version token (see scitrek_backend.cache_versions); edits bump
+the token through signals. The same token is the response ETag, so a
+client revalidating an unchanged payload gets a 304 before anything is
+serialized or queried.
+
+On a miss only one process rebuilds a payload; concurrent requests for
+it (a class opening the same quiz at once) wait briefly for the result
+instead of each running the query.
+"""
+import time
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+
+from scitrek_backend.cache_versions import get_version
+from .models import Module, QuizQuestion
+from .serializers import ModuleSerializer, QuizQuestionSerializer
+
+CACHE_TIMEOUT  = 60 * 60 * 24
+BUILD_LOCK_TTL = 10
+BUILD_WAIT     = 2.0
+BUILD_POLL     = 0.05
+
+
+def _get_or_build(key, build):
+    value = cache.get(key)
+    if value is not None:
+        return value
+    lock = f"{key}:building"
+    acquired = cache.add(lock, 1, BUILD_LOCK_TTL)
+    if not acquired:
+        deadline = time.monotonic() + BUILD_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(BUILD_POLL)
+            value = cache.get(key)
+            if value is not None:
+                return value
+        # the builder is slow or died; build our own copy
+    try:
+        value = build()
+        cache.set(key, value, CACHE_TIMEOUT)
+    finally:
+        # a waiter that gave up must not release the builder's lock
+        if acquired:
+            cache.delete(lock)
+    return value
+
+
+def modules_version(classroom_id):
+    return get_version('modules', classroom_id)
+
+
+def cached_modules(classroom_id, version):
+    """
+    Serialized modules of a classroom in day order, as plain dicts.
+    """
+    def build():
+        queryset = Module.objects.filter(classroom_id=classroom_id).order_by('day')
+        return [dict(row) for row in ModuleSerializer(queryset, many=True).data]
+    return _get_or_build(f"modules:{classroom_id}:{version}", build)
+
+
+def questions_version(classroom_id, quiz_type):
+    return get_version('quiz-questions', classroom_id, quiz_type)
+
+
+def cached_questions(classroom_id, quiz_type, version):
+    """
+    Serialized questions of one quiz in id order. QuizQuestionSerializer
+    leaves out `answer`, so the cached payload never holds the key.
+    """
+    def build():
+        queryset = QuizQuestion.objects.filter(
+            classroom_id=classroom_id, quiz_type=quiz_type
+        ).order_by('id')
+        return [dict(row) for row in QuizQuestionSerializer(queryset, many=True).data]
+    return _get_or_build(f"quiz-questions:{classroom_id}:{quiz_type}:{version}", build)
+
+
+def conditional_response(request, etag, build):
+    """
+    304 when If-None-Match already holds `etag`, otherwise build(). Either
+    way the response carries the ETag and must be revalidated before reuse.
+    """
+    etag = quote_etag(etag)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = build()
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,98 @@
+# student_activities/grading.py
+"""
+Server-side quiz grading.
+
+attempt_data maps question id -> chosen option key, e.g. {"12": "A"}.
+Scores are the fraction of the quiz's questions answered correctly.
+"""
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from scitrek_backend.cache_versions import get_version, bump_version_on_commit
+from .models import QuizAttempt, QuizQuestion
+from .progress_summary import forget_progress
+
+CACHE_TIMEOUT = 60 * 60 * 24
+CHUNK_SIZE    = 500
+
+
+def answer_key(classroom_id, quiz_type):
+    """
+    {question id (str): correct option} for one quiz, cached until a
+    QuizQuestion of that quiz is saved or deleted.
+    """
+    key = "answer-key:{}:{}:{}".format(
+        classroom_id, quiz_type, get_version('quiz-questions', classroom_id, quiz_type)
+    )
+    answers = cache.get(key)
+    if answers is None:
+        answers = {
+            str(qid): answer
+            for qid, answer in QuizQuestion.objects.filter(
+                classroom_id=classroom_id, quiz_type=quiz_type
+            ).values_list('id', 'answer')
+        }
+        cache.set(key, answers, CACHE_TIMEOUT)
+    return answers
+
+
+def grade(attempt_data, answers):
+    """
+    Fraction of questions in `answers` that `attempt_data` gets right.
+    """
+    if not answers or not isinstance(attempt_data, dict):
+        return 0.0
+    correct = sum(1 for qid, answer in answers.items() if attempt_data.get(qid) == answer)
+    return correct / len(answers)
+
+
+def regrade_attempts(classroom_ids=None, quiz_type=None, chunk_size=CHUNK_SIZE):
+    """
+    Re-score stored attempts against the current answer keys.
+    Changed scores are written with one bulk_update per chunk.
+    Returns (checked, updated).
+    """
+    attempts = QuizAttempt.objects.filter(student__student_profile__classroom__isnull=False)
+    if classroom_ids is not None:
+        attempts = attempts.filter(student__student_profile__classroom__in=classroom_ids)
+    if quiz_type is not None:
+        attempts = attempts.filter(quiz_type=quiz_type)
+    attempts = (
+        attempts.annotate(classroom_id=F('student__student_profile__classroom'))
+        .only('id', 'student_id', 'quiz_type', 'score', 'attempt_data')
+        .order_by('id')
+    )
+
+    keys = {}
+    touched = set()
+    students = set()
+    changed = []
+    checked = updated = 0
+    now = timezone.now()
+    for attempt in attempts.iterator(chunk_size=chunk_size):
+        checked += 1
+        quiz = (attempt.classroom_id, attempt.quiz_type)
+        if quiz not in keys:
+            keys[quiz] = answer_key(*quiz)
+        score = grade(attempt.attempt_data, keys[quiz])
+        if score != attempt.score:
+            attempt.score = score
+            # bulk_update bypasses auto_now; the research export keys on it
+            attempt.updated_at = now
+            changed.append(attempt)
+            touched.add(quiz)
+            students.add(attempt.student_id)
+        if len(changed) >= chunk_size:
+            updated += QuizAttempt.objects.bulk_update(changed, ['score', 'updated_at'])
+            changed = []
+    if changed:
+        updated += QuizAttempt.objects.bulk_update(changed, ['score', 'updated_at'])
+
+    # bulk_update skips post_save, so invalidate attempt-derived caches here
+    for quiz in touched:
+        bump_version_on_commit('quiz-attempts', *quiz)
+    if students:
+        transaction.on_commit(lambda: forget_progress(*students))
+    return checked, updated
@@ -0,0 +1,169 @@
+# student_activities/management/commands/convert_inbox_messages.py
+"""
+Move inbox messages from the old one-row-per-recipient layout (subject,
+body and attachment on every Message) to MessageContent + delivery rows,
+and scheduled-message uploads (a teacher_messages/ file per message) to
+content-addressed Attachment blobs.
+
+Migrations are generated per deployment, so the schema change cannot carry
+a data migration. Upgrade an existing database in this order:
+
+  1. Deploy the new code, but do not migrate yet.
+  2. python manage.py convert_inbox_messages stash
+     Copies every Message row to a holding table and empties the message
+     table; copies every ScheduledMessage attachment path to another and
+     clears the column, which becomes a foreign key.
+  3. python manage.py makemigrations student_activities
+     When asked for a one-off default for Message.content, enter 1: the
+     table is empty at this point, so the value is never used.
+  4. python manage.py migrate
+  5. python manage.py convert_inbox_messages restore
+     Creates one MessageContent per distinct (sender, subject, body,
+     attachment), restores every delivery with its id, timestamp and read
+     state, stores each scheduled message's file as a blob, and drops the
+     holding tables. The old files are deleted once it commits.
+
+Either part is skipped when its table is already converted.
+
+Both steps run in a transaction; a failed step leaves the database as it was.
+"""
+import os
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from classroom_admin.models import ScheduledMessage
+from student_activities.attachments import atomic_with_blobs, store_attachment
+from student_activities.models import Message, MessageContent
+
+LEGACY_TABLE = 'student_activities_legacy_message'
+LEGACY_COLUMNS = ['id', 'sender_id', 'recipient_id', 'subject', 'body', 'timestamp', 'is_read', 'attachment']
+LEGACY_SCHEDULED_TABLE = 'classroom_admin_legacy_scheduled_attachment'
+CHUNK_SIZE = 1000
+
+
+def _columns(table):
+    with connection.cursor() as cursor:
+        return {c.name for c in connection.introspection.get_table_description(cursor, table)}
+
+
+class Command(BaseCommand):
+    help = "Convert pre-MessageContent inbox messages (run `stash` before migrating, `restore` after)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('step', choices=['stash', 'restore'])
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        if options['step'] == 'stash':
+            messages, scheduled = self.stash()
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Stashed {messages} messages and {scheduled} scheduled-message attachments; "
+                "now makemigrations, migrate, then restore"
+            ))
+        else:
+            contents, restored, scheduled = self.restore(options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(
+                f"✅ Restored {restored} messages sharing {contents} message contents "
+                f"and {scheduled} scheduled-message attachments"
+            ))
+
+    def stash(self):
+        messages_table  = Message._meta.db_table
+        scheduled_table = ScheduledMessage._meta.db_table
+        stash_messages  = 'subject' in _columns(messages_table)
+        stash_scheduled = 'attachment' in _columns(scheduled_table)
+        if not (stash_messages or stash_scheduled):
+            raise CommandError("Messages and scheduled messages are already converted; nothing to stash.")
+        tables = connection.introspection.table_names()
+        for table in (LEGACY_TABLE, LEGACY_SCHEDULED_TABLE):
+            if table in tables:
+                raise CommandError(f"{table} already exists; run restore first.")
+
+        qn = connection.ops.quote_name
+        messages = scheduled = 0
+        with transaction.atomic(), connection.cursor() as cursor:
+            if stash_messages:
+                columns = ", ".join(qn(c) for c in LEGACY_COLUMNS)
+                cursor.execute(f"CREATE TABLE {qn(LEGACY_TABLE)} AS SELECT {columns} FROM {qn(messages_table)}")
+                cursor.execute(f"DELETE FROM {qn(messages_table)}")
+                messages = cursor.rowcount
+            if stash_scheduled:
+                attachment = qn('attachment')
+                cursor.execute(
+                    f"CREATE TABLE {qn(LEGACY_SCHEDULED_TABLE)} AS SELECT {qn('id')}, {attachment} "
+                    f"FROM {qn(scheduled_table)} WHERE {attachment} IS NOT NULL AND {attachment} <> ''"
+                )
+                # paths would not cast to the foreign key the column becomes
+                cursor.execute(f"UPDATE {qn(scheduled_table)} SET {attachment} = NULL")
+                cursor.execute(f"SELECT COUNT(*) FROM {qn(LEGACY_SCHEDULED_TABLE)}")
+                scheduled = cursor.fetchone()[0]
+        return messages, scheduled
+
+    def restore(self, chunk_size):
+        tables = connection.introspection.table_names()
+        if LEGACY_TABLE not in tables and LEGACY_SCHEDULED_TABLE not in tables:
+            raise CommandError(f"{LEGACY_TABLE} not found; run stash before migrating.")
+
+        qn = connection.ops.quote_name
+        contents = {}
+        old_files = set()
+        restored = scheduled = 0
+        with atomic_with_blobs():
+            with connection.cursor() as cursor:
+                if LEGACY_TABLE in tables:
+                    columns = ", ".join(qn(c) for c in LEGACY_COLUMNS)
+                    cursor.execute(f"SELECT {columns} FROM {qn(LEGACY_TABLE)} ORDER BY {qn('id')}")
+                    while True:
+                        rows = cursor.fetchmany(chunk_size)
+                        if not rows:
+                            break
+                        restored += self._restore_chunk(rows, contents, old_files)
+                    cursor.execute(f"DROP TABLE {qn(LEGACY_TABLE)}")
+                if LEGACY_SCHEDULED_TABLE in tables:
+                    cursor.execute(f"SELECT {qn('id')}, {qn('attachment')} FROM {qn(LEGACY_SCHEDULED_TABLE)}")
+                    scheduled = self._restore_scheduled(cursor.fetchall(), old_files)
+                    cursor.execute(f"DROP TABLE {qn(LEGACY_SCHEDULED_TABLE)}")
+
+            # the bytes now live in content-addressed blobs
+            def delete_old_files():
+                for path in old_files:
+                    default_storage.delete(path)
+            transaction.on_commit(delete_old_files)
+        return len(contents), restored, scheduled
+
+    def _restore_scheduled(self, rows, old_files):
+        for pk, path in rows:
+            with default_storage.open(path) as fh:
+                blob = store_attachment(fh)
+            ScheduledMessage.objects.filter(pk=pk).update(attachment=blob, attachment_name=os.path.basename(path))
+            old_files.add(path)
+        return len(rows)
+
+    def _restore_chunk(self, rows, contents, old_files):
+        messages, timestamps = [], []
+        for pk, sender_id, recipient_id, subject, body, timestamp, is_read, attachment in rows:
+            key = (sender_id, subject, body, attachment or '')
+            if key not in contents:
+                blob = None
+                if attachment:
+                    with default_storage.open(attachment) as fh:
+                        blob = store_attachment(fh)
+                    old_files.add(attachment)
+                contents[key] = MessageContent.objects.create(
+                    sender_id=sender_id, subject=subject, body=body,
+                    attachment=blob, attachment_name=os.path.basename(attachment or ''),
+                )
+            messages.append(Message(
+                id=pk, content=contents[key], sender_id=sender_id,
+                recipient_id=recipient_id, is_read=is_read,
+            ))
+            timestamps.append(timestamp)
+
+        created = Message.objects.bulk_create(messages, ignore_conflicts=True)
+        # bulk_create stamps auto_now_add fields; put the original times back
+        for message, timestamp in zip(created, timestamps):
+            message.timestamp = timestamp
+        Message.objects.bulk_update(created, ['timestamp'])
+        return Message.objects.filter(id__in=[m.id for m in messages]).count()
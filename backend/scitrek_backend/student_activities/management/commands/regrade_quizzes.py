@@ -0,0 +1,24 @@
+# student_activities/management/commands/regrade_quizzes.py
+
+from django.core.management.base import BaseCommand
+from student_activities.grading import regrade_attempts, CHUNK_SIZE
+from student_activities.models import QuizAttempt
+
+class Command(BaseCommand):
+    help = "Re-score stored quiz attempts against the current answer keys"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--classroom', type=int, action='append', dest='classrooms',
+                            help="Classroom id to regrade (repeatable). Defaults to every classroom.")
+        parser.add_argument('--quiz-type', choices=[QuizAttempt.PRE, QuizAttempt.POST])
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        checked, updated = regrade_attempts(
+            classroom_ids=options['classrooms'],
+            quiz_type=options['quiz_type'],
+            chunk_size=options['chunk_size'],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Regraded {checked} attempts ({updated} scores changed)"
+        ))
@@ -3,7 +3,68 @@
 from django.db import models
 from classroom_admin.models import CustomUser, Classroom
 
+def _attachment_path(instance, filename):
+    return f"inbox_attachments/{instance.sha256[:2]}/{instance.sha256}"
+
+
+class Attachment(models.Model):
+    """
+    A message attachment stored once, keyed by the SHA-256 of its bytes.
+    Every MessageContent carrying the same file points at the same blob.
+    """
+    sha256       = models.CharField(max_length=64, unique=True)
+    file         = models.FileField(upload_to=_attachment_path)
+    size         = models.PositiveBigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True)
+    created_at   = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+
+class MessageContent(models.Model):
+    """
+    The subject/body of a message, stored once no matter how many
+    students receive it. Recipients get a thin Message delivery row.
+    Databases from before this split are upgraded with the
+    convert_inbox_messages command (see its module docstring).
+    """
+    sender      = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='authored_messages'
+    )
+    subject     = models.CharField(max_length=255)
+    body        = models.TextField()
+    attachment  = models.ForeignKey(
+        Attachment,
+        on_delete=models.PROTECT,
+        blank=True, null=True,
+        related_name='contents'
+    )
+    # original filename, since the shared blob is named by its hash
+    attachment_name = models.CharField(max_length=255, blank=True)
+    created_at  = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["sender", "subject"]),
+        ]
+
+    def __str__(self):
+        return self.subject
+
+
 class Message(models.Model):
+    """
+    One recipient's copy of a MessageContent: delivery time and read state.
+    `sender` is denormalized from the content so inbox filters need no join.
+    """
+    content     = models.ForeignKey(
+        MessageContent,
+        on_delete=models.CASCADE,
+        related_name='deliveries'
+    )
     sender      = models.ForeignKey(
         CustomUser,
         on_delete=models.CASCADE,
@@ -14,25 +75,42 @@ class Message(models.Model):
         on_delete=models.CASCADE,
         related_name='received_messages'
     )
-    subject     = models.CharField(max_length=255)
-    body        = models.TextField()
     timestamp   = models.DateTimeField(auto_now_add=True)
 
     # — Inbox enhancements —
     is_read     = models.BooleanField(default=False)
-    attachment  = models.FileField(upload_to='inbox_attachments/', blank=True, null=True)
 
     class Meta:
         constraints = [
             models.UniqueConstraint(
-                fields=["sender", "recipient", "subject"],
-                name="uniq_sender_recipient_subject",
+                fields=["recipient", "content"],
+                name="uniq_recipient_content",
             ),
         ]
         indexes = [
             models.Index(fields=["recipient", "is_read", "timestamp"]),
+            # inbox keyset pagination: ORDER BY timestamp DESC, id DESC
+            models.Index(fields=["recipient", "-timestamp", "-id"], name="message_inbox_keyset_idx"),
+            # unread badge: an index-only count over unread rows
+            models.Index(
+                fields=["recipient", "sender"],
+                condition=models.Q(is_read=False),
+                name="message_unread_idx",
+            ),
         ]
 
+    @property
+    def subject(self):
+        return self.content.subject
+
+    @property
+    def body(self):
+        return self.content.body
+
+    @property
+    def attachment(self):
+        return self.content.attachment
+
     def __str__(self):
         return self.subject
 
@@ -103,6 +181,8 @@ class QuizAttempt(models.Model):
     score        = models.FloatField()
     attempt_data = models.JSONField()
     timestamp    = models.DateTimeField(auto_now_add=True)
+    # changes on every resubmission; fingerprints export data versions
+    updated_at   = models.DateTimeField(auto_now=True)
 
     class Meta:
         unique_together = ('student', 'quiz_type')
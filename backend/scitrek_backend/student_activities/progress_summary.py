@@ -0,0 +1,52 @@
+# student_activities/progress_summary.py
+"""
+The student's progress summary (completed days, pre/post quiz scores).
+
+Built by one aggregate query over the student's responses and quiz
+attempts and cached per student. Writes that change it (a new response,
+any quiz attempt, deletes) call forget_progress.
+"""
+from django.core.cache import cache
+from django.db.models import Count, Max, Q
+
+from classroom_admin.models import CustomUser
+from .models import Module, QuizAttempt
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(user_id):
+    return f"student-progress:{user_id}"
+
+
+def build_progress(user_id):
+    """
+    One query: the user row LEFT JOINed to their responses and attempts
+    (at most days x quizzes rows), reduced with filtered aggregates.
+    """
+    days = [day for day, _ in Module.DAY_CHOICES]
+    row = CustomUser.objects.filter(pk=user_id).aggregate(
+        pre_score=Max('quizattempt__score', filter=Q(quizattempt__quiz_type=QuizAttempt.PRE)),
+        post_score=Max('quizattempt__score', filter=Q(quizattempt__quiz_type=QuizAttempt.POST)),
+        **{
+            f'day_{day}': Count('studentresponse', filter=Q(studentresponse__module__day=day), distinct=True)
+            for day in days
+        },
+    )
+    return {
+        'completed_days': [day for day in days if row[f'day_{day}']],
+        'pre_score':      row['pre_score'],
+        'post_score':     row['post_score'],
+    }
+
+
+def progress_summary(user_id):
+    summary = cache.get(_cache_key(user_id))
+    if summary is None:
+        summary = build_progress(user_id)
+        cache.set(_cache_key(user_id), summary, CACHE_TIMEOUT)
+    return summary
+
+
+def forget_progress(*user_ids):
+    cache.delete_many([_cache_key(uid) for uid in user_ids])
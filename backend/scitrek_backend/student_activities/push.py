@@ -0,0 +1,213 @@
+# student_activities/push.py
+"""
+Server-sent events for the student inbox.
+
+Tasks that deliver messages call notify_inbox(user_ids) once their rows
+are committed. Every connected student has an open stream on
+INBOX_STREAM_PATH (served by scitrek_backend/stream_asgi.py) that
+turns each notification into an `inbox` event; the page then refetches
+instead of polling.
+
+Notifications travel over Redis pub/sub when INBOX_PUSH_URL is set, so
+Celery workers and web processes can be separate. Without it an
+in-process broker is used, which is what the tests run against.
+
+EventSource cannot send headers, so a stream is opened with a short-lived,
+single-use ticket from an authenticated POST instead of the access token,
+which would otherwise end up in URLs and access logs. Tickets live in the
+default cache, which must be shared (CACHE_URL) when the stream and the
+API run in separate processes.
+"""
+import asyncio
+import json
+import logging
+import secrets
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from urllib.parse import parse_qs
+
+import redis
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+INBOX_STREAM_PATH = '/api/student/inbox/stream/'
+KEEPALIVE_SECONDS = 25
+RETRY_MS          = 5000
+TICKET_TTL        = 60
+
+
+def channel_for(user_id):
+    return f"inbox:{user_id}"
+
+
+# — Brokers —
+class MemoryBroker:
+    """
+    Pub/sub inside one process. Publishing is thread-safe, so synchronous
+    code (views, eager tasks) can notify streams running on the event loop.
+    """
+    def __init__(self):
+        self._subscribers = defaultdict(set)
+
+    def publish(self, channels, message):
+        for channel in channels:
+            for loop, queue in list(self._subscribers.get(channel, ())):
+                loop.call_soon_threadsafe(queue.put_nowait, message)
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        entry = (asyncio.get_running_loop(), asyncio.Queue())
+        self._subscribers[channel].add(entry)
+        try:
+            yield entry[1].get
+        finally:
+            self._subscribers[channel].discard(entry)
+            if not self._subscribers[channel]:
+                del self._subscribers[channel]
+
+
+class RedisBroker:
+    def __init__(self, url):
+        self.url = url
+        self._client = None
+
+    def publish(self, channels, message):
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        with self._client.pipeline(transaction=False) as pipe:
+            for channel in channels:
+                pipe.publish(channel, message)
+            pipe.execute()
+
+    @asynccontextmanager
+    async def subscribe(self, channel):
+        client = aioredis.Redis.from_url(self.url)
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        await pubsub.subscribe(channel)
+
+        async def next_message():
+            while True:
+                msg = await pubsub.get_message(timeout=None)
+                if msg is not None:
+                    return msg['data'].decode()
+
+        try:
+            yield next_message
+        finally:
+            await pubsub.unsubscribe(channel)
+            await pubsub.aclose()
+            await client.aclose()
+
+
+_broker = None
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        url = getattr(settings, 'INBOX_PUSH_URL', '')
+        _broker = RedisBroker(url) if url else MemoryBroker()
+    return _broker
+
+
+def notify_inbox(user_ids, event='inbox'):
+    """
+    Tell these students' open streams that their inbox changed. Push is
+    best-effort: a broker outage only means clients see it on next load.
+    """
+    channels = [channel_for(uid) for uid in user_ids]
+    if not channels:
+        return
+    try:
+        get_broker().publish(channels, json.dumps({'event': event}))
+    except redis.RedisError:
+        logger.warning("Inbox push failed for %d recipients", len(channels), exc_info=True)
+
+
+# — Stream tickets —
+def _ticket_key(ticket):
+    return f"inbox-stream-ticket:{ticket}"
+
+
+def issue_stream_ticket(user_id):
+    ticket = secrets.token_urlsafe(32)
+    cache.set(_ticket_key(ticket), user_id, TICKET_TTL)
+    return ticket
+
+
+def redeem_stream_ticket(ticket):
+    """
+    The user id the ticket was issued to, or None. A ticket works once:
+    only the caller whose delete removed it gets the id.
+    """
+    key = _ticket_key(ticket)
+    user_id = cache.get(key)
+    if user_id is None or not cache.delete(key):
+        return None
+    return user_id
+
+
+# — ASGI endpoint —
+async def _plain(send, status, text):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'text/plain; charset=utf-8')],
+    })
+    await send({'type': 'http.response.body', 'body': text.encode()})
+
+
+async def inbox_stream(scope, receive, send):
+    """
+    GET INBOX_STREAM_PATH?ticket=<stream ticket> -> text/event-stream.
+    """
+    if scope['method'] != 'GET':
+        return await _plain(send, 405, "Method not allowed")
+    ticket = parse_qs(scope.get('query_string', b'').decode()).get('ticket', [''])[0]
+    user_id = await sync_to_async(redeem_stream_ticket)(ticket) if ticket else None
+    if user_id is None:
+        return await _plain(send, 401, "Authentication required")
+
+    async def wait_for_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    async with get_broker().subscribe(channel_for(user_id)) as next_message:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': f"retry: {RETRY_MS}\nevent: ready\ndata: {{}}\n\n".encode(),
+            'more_body': True,
+        })
+
+        disconnect = asyncio.ensure_future(wait_for_disconnect())
+        message = asyncio.ensure_future(next_message())
+        try:
+            while True:
+                done, _ = await asyncio.wait(
+                    {disconnect, message}, timeout=KEEPALIVE_SECONDS,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                if disconnect in done:
+                    break
+                if message in done:
+                    data = json.loads(message.result())
+                    chunk = f"event: {data['event']}\ndata: {json.dumps(data)}\n\n"
+                    message = asyncio.ensure_future(next_message())
+                else:
+                    chunk = ": keepalive\n\n"
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+        finally:
+            disconnect.cancel()
+            message.cancel()
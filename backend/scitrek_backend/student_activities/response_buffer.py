@@ -0,0 +1,239 @@
+# student_activities/response_buffer.py
+"""
+Optional write-behind buffer for response autosaves.
+
+When RESPONSE_BUFFER_URL is set, autosave PATCHes store the student's
+latest merged answers in Redis instead of writing StudentResponse. A
+celery beat task (flush_response_buffer) writes the buffered drafts in
+batches; a "final" save, or a full POST, writes through immediately.
+Reads go through the buffer, so a student always sees their last draft.
+
+Layout: one hash of drafts keyed "<student>:<module>" plus a set of keys
+that still need writing. A draft is only removed after it has been
+written, and only if it did not change meanwhile, so a crashed flush
+loses nothing and a newer autosave is never dropped. A draft older than
+its row is never written over it.
+"""
+import json
+import logging
+
+import redis
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from classroom_admin.models import CustomUser
+from classroom_admin.progress import record_response_created
+from .models import Module, StudentResponse
+from .progress_summary import forget_progress
+
+logger = logging.getLogger(__name__)
+
+DRAFTS = "response-buffer:drafts"
+DIRTY  = "response-buffer:dirty"
+FLUSH_BATCH_SIZE = 500
+
+# HDEL + SREM only if the draft is still the one that was written
+_RELEASE = """
+if redis.call('HGET', KEYS[1], ARGV[1]) == ARGV[2] then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+    redis.call('SREM', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+def _field(student_id, module_id):
+    return f"{student_id}:{module_id}"
+
+
+class RedisBuffer:
+    def __init__(self, url):
+        self.client  = redis.Redis.from_url(url)
+        self.release = self.client.register_script(_RELEASE)
+
+    def stage(self, field, value):
+        with self.client.pipeline() as pipe:
+            pipe.hset(DRAFTS, field, value)
+            pipe.sadd(DIRTY, field)
+            pipe.execute()
+
+    def get(self, field):
+        value = self.client.hget(DRAFTS, field)
+        return value.decode() if value is not None else None
+
+    def pending(self, count):
+        fields = [f.decode() for f in self.client.srandmember(DIRTY, count)]
+        values = self.client.hmget(DRAFTS, fields) if fields else []
+        orphans = [f for f, v in zip(fields, values) if v is None]
+        if orphans:
+            self.client.srem(DIRTY, *orphans)
+        return [(f, v.decode()) for f, v in zip(fields, values) if v is not None]
+
+    def discard(self, field, value):
+        self.release(keys=[DRAFTS, DIRTY], args=[field, value])
+
+
+class MemoryBuffer:
+    """
+    Same interface inside one process, for tests and single-process dev.
+    """
+    def __init__(self):
+        self.drafts = {}
+        self.dirty  = set()
+
+    def stage(self, field, value):
+        self.drafts[field] = value
+        self.dirty.add(field)
+
+    def get(self, field):
+        return self.drafts.get(field)
+
+    def pending(self, count):
+        fields = sorted(self.dirty)[:count]
+        return [(f, self.drafts[f]) for f in fields if f in self.drafts]
+
+    def discard(self, field, value):
+        if self.drafts.get(field) == value:
+            del self.drafts[field]
+            self.dirty.discard(field)
+
+
+_buffer = None
+
+def get_buffer():
+    """
+    The configured buffer, or None when write-behind is off.
+    """
+    global _buffer
+    url = getattr(settings, 'RESPONSE_BUFFER_URL', '')
+    if _buffer is None and url:
+        _buffer = RedisBuffer(url)
+    return _buffer
+
+
+def read(student_id, module_id):
+    """
+    (raw, draft) for the buffered draft, where draft is
+    {'answers', 'classroom_id', 'day', 'saved_at'}; (None, None) if there is none.
+    """
+    buffer = get_buffer()
+    raw = buffer.get(_field(student_id, module_id)) if buffer else None
+    return raw, (json.loads(raw) if raw is not None else None)
+
+
+def stage(student_id, module_id, classroom_id, day, answers):
+    get_buffer().stage(_field(student_id, module_id), json.dumps({
+        'answers':      answers,
+        'classroom_id': classroom_id,
+        'day':          day,
+        'saved_at':     timezone.now().isoformat(),
+    }))
+
+
+def release(student_id, module_id, raw):
+    """
+    Drop the draft `raw` once a synchronous write has superseded it; a newer
+    autosave staged in the meantime is kept.
+    """
+    buffer = get_buffer()
+    if buffer is not None and raw is not None:
+        buffer.discard(_field(student_id, module_id), raw)
+
+
+def _write_batch(buffer, entries):
+    """
+    Upsert a batch of drafts in a fixed number of queries: the student and
+    module ids, one locked SELECT, one bulk_update, one bulk_create.
+    Returns the entries written. Raises IntegrityError if a synchronous
+    save inserted one of the rows since the SELECT.
+
+    `entries` were read before the rows were locked, so each draft is read
+    again under the lock: one released or restaged meanwhile is left alone,
+    and one older than its row (a final save or POST got there first) is
+    dropped rather than written over the newer answers. So is a draft
+    whose student or module has been deleted: it can never be written.
+    """
+    keys = {}
+    for field, value in entries:
+        student_id, module_id = map(int, field.split(':'))
+        keys[(student_id, module_id)] = (field, value)
+    # taken before the drafts are re-read, so a draft staged after that
+    # read is never older than the row it follows
+    now = timezone.now()
+
+    with transaction.atomic():
+        students = set(CustomUser.objects.filter(id__in={s for s, _ in keys}).values_list('id', flat=True))
+        modules  = set(Module.objects.filter(id__in={m for _, m in keys}).values_list('id', flat=True))
+        existing = {
+            (r.student_id, r.module_id): r
+            for r in StudentResponse.objects.select_for_update().filter(
+                student_id__in={s for s, _ in keys}, module_id__in={m for _, m in keys}
+            ).only('id', 'student_id', 'module_id', 'completed_at')
+        }
+        written, updated, created = [], [], []
+        for key, (field, value) in keys.items():
+            if buffer.get(field) != value:
+                continue
+            if key[0] not in students or key[1] not in modules:
+                logger.warning("Dropping buffered draft %s: its student or module was deleted", field)
+                buffer.discard(field, value)
+                continue
+            data = json.loads(value)
+            saved_at = parse_datetime(data['saved_at'])
+            row = existing.get(key)
+            if row is None:
+                created.append(StudentResponse(student_id=key[0], module_id=key[1], answers=data['answers']))
+            elif row.completed_at > saved_at:
+                # already superseded by committed answers; nothing to lose
+                buffer.discard(field, value)
+                continue
+            else:
+                # the write time, not saved_at: exports fingerprint on Max(completed_at)
+                row.answers      = data['answers']
+                row.completed_at = now
+                updated.append(row)
+            written.append((field, value))
+        StudentResponse.objects.bulk_update(updated, ['answers', 'completed_at'])
+        StudentResponse.objects.bulk_create(created)
+        for row in created:
+            data = json.loads(keys[(row.student_id, row.module_id)][1])
+            record_response_created(data['classroom_id'], data['day'])
+        if created:
+            transaction.on_commit(lambda ids=[row.student_id for row in created]: forget_progress(*ids))
+    return written
+
+
+def flush(batch_size=FLUSH_BATCH_SIZE):
+    """
+    Write every pending draft. Returns the number of drafts written.
+    """
+    buffer = get_buffer()
+    if buffer is None:
+        return 0
+    written = 0
+    # drafts left pending this run: restaged, or still conflicting
+    skipped = set()
+    while True:
+        entries = [
+            (field, value) for field, value in buffer.pending(batch_size + len(skipped))
+            if field not in skipped
+        ]
+        if not entries:
+            return written
+        try:
+            done = _write_batch(buffer, entries)
+        except IntegrityError:
+            # retry the conflicting batch one row at a time
+            done = []
+            for entry in entries:
+                try:
+                    done += _write_batch(buffer, [entry])
+                except IntegrityError:
+                    pass
+        for field, value in done:
+            buffer.discard(field, value)
+        skipped.update(field for field, _ in set(entries) - set(done))
+        written += len(done)
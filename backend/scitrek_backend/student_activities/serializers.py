@@ -1,6 +1,7 @@
 # student_activities/serializers.py
 
 from rest_framework import serializers
+from django.urls import reverse
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
 
@@ -95,21 +96,89 @@ class QuizAttemptSerializer(serializers.ModelSerializer):
     class Meta:
         model  = QuizAttempt
         fields = ['quiz_type', 'score', 'attempt_data', 'timestamp']
+        # score is computed server-side from the answer key
+        read_only_fields = ['score']
 
     def validate_quiz_type(self, value):
         if value not in dict(QuizAttempt.TYPE_CHOICES):
             raise serializers.ValidationError("Invalid quiz_type.")
         return value
 
+    def validate_attempt_data(self, value):
+        if not isinstance(value, dict) or not all(isinstance(v, str) for v in value.values()):
+            raise serializers.ValidationError("attempt_data must map question ids to chosen options.")
+        return value
+
 
 class ReadOnlyMessageSerializer(serializers.ModelSerializer):
     id         = serializers.IntegerField(read_only=True)
+    subject    = serializers.CharField(source='content.subject', read_only=True)
+    body       = serializers.CharField(source='content.body', read_only=True)
     is_read    = serializers.BooleanField(read_only=True)
-    attachment = serializers.FileField(read_only=True)
+    attachment = serializers.SerializerMethodField()
+    attachment_name = serializers.CharField(source='content.attachment_name', read_only=True)
 
     class Meta:
         model  = Message
-        fields = ['id', 'subject', 'body', 'timestamp', 'is_read', 'attachment']
+        fields = ['id', 'subject', 'body', 'timestamp', 'is_read', 'attachment', 'attachment_name']
+
+    def get_attachment(self, obj):
+        if obj.content.attachment_id is None:
+            return None
+        url = reverse('api-inbox-attachment', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+
+class InboxBulkReadSerializer(serializers.Serializer):
+    """
+    Which inbox messages to mark: the listed `ids`, or every message up to
+    and including `through` (in inbox order, i.e. it and everything older),
+    or, when neither is given, the whole inbox.
+    """
+    is_read = serializers.BooleanField(default=True)
+    ids     = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=1000)
+    through = serializers.IntegerField(required=False)
+
+    def validate(self, attrs):
+        if 'ids' in attrs and 'through' in attrs:
+            raise serializers.ValidationError("Pass either ids or through, not both.")
+        return attrs
+
+
+class BatchOperationSerializer(serializers.Serializer):
+    """
+    One batch sub-operation: `op` plus the arguments that op needs.
+    """
+    OPS = {
+        'profile':       [],
+        'modules':       [],
+        'module':        ['id'],
+        'progress':      [],
+        'response':      ['day'],
+        'save_response': ['day', 'answers'],
+    }
+
+    op      = serializers.ChoiceField(choices=list(OPS))
+    id      = serializers.IntegerField(required=False)
+    day     = serializers.IntegerField(required=False)
+    answers = serializers.JSONField(required=False)
+
+    def validate(self, attrs):
+        missing = [name for name in self.OPS[attrs['op']] if name not in attrs]
+        if missing:
+            raise serializers.ValidationError(
+                {name: [f"Required for {attrs['op']}."] for name in missing}
+            )
+        return attrs
+
+
+class BatchSerializer(serializers.Serializer):
+    MAX_OPERATIONS = 20
+
+    operations = serializers.ListField(
+        child=BatchOperationSerializer(), min_length=1, max_length=MAX_OPERATIONS
+    )
 
 
 class QuizQuestionSerializer(serializers.ModelSerializer):
@@ -1,9 +1,15 @@
 # student_activities/signals.py
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 
 from classroom_admin.models import Student as StudentProfile
-from student_activities.tasks import seed_inbox_for_user
+from classroom_admin.progress import record_response_deleted
+from scitrek_backend.cache_versions import bump_version_on_commit
+from student_activities.classroom_lookup import forget_student_classroom
+from student_activities.models import Module, QuizAttempt, QuizQuestion, StudentResponse
+from student_activities.progress_summary import forget_progress
+from student_activities.tasks import inbox_is_current, seed_inbox_for_user
 
 @receiver(post_save, sender=StudentProfile)
 def seed_inbox_when_student_created(sender, instance, created, **kwargs):
@@ -12,5 +18,66 @@ def seed_inbox_when_student_created(sender, instance, created, **kwargs):
     Safe to run because the task is idempotent.
     """
     user = getattr(instance, "user", None)
-    if created and user and getattr(user, "is_active", False) and getattr(user, "is_student", False):
+    if (created and user and getattr(user, "is_active", False) and getattr(user, "is_student", False)
+            and not inbox_is_current(user)):
         seed_inbox_for_user.delay(user.id)
+
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_delete, sender=StudentProfile)
+def forget_cached_classroom(sender, instance, **kwargs):
+    """
+    Drop the cached classroom id used by the student API views.
+    """
+    transaction.on_commit(lambda: forget_student_classroom(instance.user_id))
+
+@receiver(post_save, sender=QuizAttempt)
+@receiver(post_delete, sender=QuizAttempt)
+def bump_quiz_attempt_version(sender, instance, **kwargs):
+    """
+    Invalidate cached attempt-derived reports for the student's classroom.
+    """
+    classroom_id = (
+        StudentProfile.objects.filter(user_id=instance.student_id)
+        .values_list('classroom_id', flat=True).first()
+    )
+    if classroom_id is not None:
+        bump_version_on_commit('quiz-attempts', classroom_id, instance.quiz_type)
+
+@receiver(post_delete, sender=StudentResponse)
+@receiver(post_delete, sender=QuizAttempt)
+def forget_cached_progress(sender, instance, **kwargs):
+    """
+    Deletes (e.g. from the admin) bypass the API views that otherwise
+    drop the cached progress summary.
+    """
+    transaction.on_commit(lambda: forget_progress(instance.student_id))
+
+@receiver(post_delete, sender=StudentResponse)
+def uncount_deleted_response(sender, instance, **kwargs):
+    """
+    Keep the classroom progress rollup in step with deletes (admin, Module
+    cascade), which never go through ResponseUpsert.
+    """
+    classroom_id = (
+        StudentProfile.objects.filter(user_id=instance.student_id)
+        .values_list('classroom_id', flat=True).first()
+    )
+    day = Module.objects.filter(pk=instance.module_id).values_list('day', flat=True).first()
+    if day is not None:
+        record_response_deleted(classroom_id, day)
+
+@receiver(post_save, sender=QuizQuestion)
+@receiver(post_delete, sender=QuizQuestion)
+def bump_quiz_question_version(sender, instance, **kwargs):
+    """
+    Invalidate cached question sets, answer keys and reports for this quiz.
+    """
+    bump_version_on_commit('quiz-questions', instance.classroom_id, instance.quiz_type)
+
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+def bump_module_version(sender, instance, **kwargs):
+    """
+    Invalidate the classroom's cached module payloads and their ETags.
+    """
+    bump_version_on_commit('modules', instance.classroom_id)
@@ -1,12 +1,20 @@
 # student_activities/tasks.py
+import hashlib
+import json
+
 from celery import shared_task
 from django.contrib.auth import get_user_model
 from django.utils.crypto import get_random_string
 from django.db import transaction, IntegrityError
-from .models import Message
+from .models import Message, MessageContent
+from .push import notify_inbox
+from .response_buffer import flush
 
 User = get_user_model()
 
+# Students per reseed transaction in seed_inbox
+SEED_CHUNK_SIZE = 1000
+
 # Centralized templates so both tasks use the same source of truth
 TEMPLATES = [
     ("Welcome to SciTrek!",
@@ -23,6 +31,14 @@ TEMPLATES = [
      "Hello Scientist,\n\nQuick wins & fixes:\n• Title + one-liner: clear claim about over/under-expression.\n• Procedure: 3–5 credible sources; concise method.\n• Visual: label healthy vs. cancer; caption states direction & magnitude.\n• Results/Conclusion: tie function to cancer change; note 1 limitation + improvement.\n• Present: large fonts, consistent colors, QR link; counter “sample bias” with replicates, HK normalization, and a second method.\n\nGood luck!\n\n– Virtual Scientist"),
 ]
 
+# Fingerprint of TEMPLATES; a student whose inbox_version matches is current
+TEMPLATES_VERSION = hashlib.sha256(
+    json.dumps(TEMPLATES, ensure_ascii=False).encode()
+).hexdigest()[:16]
+
+def inbox_is_current(user):
+    return user.inbox_version == TEMPLATES_VERSION
+
 def _get_or_create_vs_user():
     vs, _ = User.objects.get_or_create(
         username="virtual_scientist",
@@ -39,65 +55,142 @@ def _get_or_create_vs_user():
         vs.save(update_fields=["password"])
     return vs
 
-def _apply_templates_to_recipient(vs, recipient):
-    created_count = 0
-    updated_count = 0
-    deleted_dupes = 0
+_VS_ID = None
 
-    for subj, body in TEMPLATES:
-        qs = Message.objects.filter(sender=vs, recipient=recipient, subject=subj).order_by("id")
-        if qs.exists():
-            keep = qs.first()
-            if keep.body != body:
-                keep.body = body
-                keep.save(update_fields=["body"])
-                updated_count += 1
-            to_delete = qs.exclude(pk=keep.pk)
-            if to_delete.exists():
-                deleted_dupes += to_delete.delete()[0]
+def virtual_scientist_id():
+    """
+    The virtual scientist's user id, resolved once per process so inbox
+    queries can filter on sender_id without joining the user table.
+    """
+    global _VS_ID
+    if _VS_ID is None:
+        _VS_ID = _get_or_create_vs_user().id
+    return _VS_ID
+
+def _template_contents(vs):
+    """
+    One MessageContent per template, shared by every recipient.
+    Missing templates are bulk-created, stale bodies bulk-updated and
+    duplicate rows for a subject removed in one DELETE (their deliveries
+    go with them and are re-seeded against the surviving row).
+    Returns ([content, ...] in TEMPLATES order, updated, deleted_dupes).
+    """
+    existing = {}
+    dupes = []
+    for content in MessageContent.objects.filter(
+        sender=vs, subject__in=[subj for subj, _ in TEMPLATES]
+    ).order_by("id"):
+        if content.subject in existing:
+            dupes.append(content.id)
         else:
-            Message.objects.create(sender=vs, recipient=recipient, subject=subj, body=body)
-            created_count += 1
+            existing[content.subject] = content
+    if dupes:
+        MessageContent.objects.filter(id__in=dupes).delete()
 
-    return created_count, updated_count, deleted_dupes
+    new, stale = [], []
+    for subj, body in TEMPLATES:
+        content = existing.get(subj)
+        if content is None:
+            content = existing[subj] = MessageContent(sender=vs, subject=subj, body=body)
+            new.append(content)
+        elif content.body != body:
+            content.body = body
+            stale.append(content)
+    MessageContent.objects.bulk_create(new)
+    MessageContent.objects.bulk_update(stale, ["body"])
+    return [existing[subj] for subj, _ in TEMPLATES], len(stale), len(dupes)
+
+def _apply_templates_to_recipient(vs, recipient, contents):
+    have = set(
+        Message.objects.filter(recipient=recipient, content__in=contents)
+        .values_list("content_id", flat=True)
+    )
+    missing = [
+        Message(content=content, sender=vs, recipient=recipient)
+        for content in contents if content.id not in have
+    ]
+    Message.objects.bulk_create(missing, ignore_conflicts=True)
+    if missing:
+        transaction.on_commit(lambda: notify_inbox([recipient.pk]))
+    return len(missing)
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=15)
 def seed_inbox_for_user(self, user_id: int):
     """
     Idempotently seed inbox for a single student user.
-    Safe to call on every signup/login.
+    Safe to call on every signup/login; callers skip it when
+    inbox_is_current(user), and it stamps inbox_version when done.
     """
     vs = _get_or_create_vs_user()
     recipient = User.objects.get(pk=user_id, is_student=True, is_active=True)
     with transaction.atomic():
         try:
-            c, u, d = _apply_templates_to_recipient(vs, recipient)
+            contents, u, d = _template_contents(vs)
+            c = _apply_templates_to_recipient(vs, recipient, contents)
+            User.objects.filter(pk=recipient.pk).update(inbox_version=TEMPLATES_VERSION)
             return {"created": c, "updated": u, "deleted_dupes": d}
         except IntegrityError:
             # If a DB unique constraint exists and we race, try once more
             self.retry(countdown=2)
 
 @shared_task
-def seed_inbox():
+def seed_inbox(chunk_size=SEED_CHUNK_SIZE):
     """
     Bulk (re)seed for ALL active students. Still idempotent.
     Kept for backfills and ops buttons.
+
+    Set-based: students are walked in id order, `chunk_size` at a time;
+    each chunk costs one SELECT for the deliveries it already has and one
+    bulk INSERT for the rest, committed on its own so no lock is held for
+    the whole backfill.
     """
     vs = _get_or_create_vs_user()
 
-    created_total = 0
-    updated_total = 0
-    deleted_total = 0
-
     with transaction.atomic():
-        students = User.objects.filter(is_student=True, is_active=True).only("id")
-        for student in students:
-            c, u, d = _apply_templates_to_recipient(vs, student)
-            created_total += c
-            updated_total += u
-            deleted_total += d
+        contents, updated_total, deleted_total = _template_contents(vs)
+    content_ids = [content.id for content in contents]
+
+    students = (
+        User.objects.filter(is_student=True, is_active=True)
+        .order_by("id")
+        .values_list("id", flat=True)
+    )
+    created_total = 0
+    last_id = 0
+    while True:
+        ids = list(students.filter(id__gt=last_id)[:chunk_size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        have = set(
+            Message.objects.filter(recipient_id__in=ids, content_id__in=content_ids)
+            .values_list("recipient_id", "content_id")
+        )
+        missing = [
+            Message(content_id=content_id, sender=vs, recipient_id=user_id)
+            for user_id in ids
+            for content_id in content_ids
+            if (user_id, content_id) not in have
+        ]
+        with transaction.atomic():
+            Message.objects.bulk_create(missing, ignore_conflicts=True, batch_size=chunk_size)
+            if missing:
+                recipients = sorted({m.recipient_id for m in missing})
+                transaction.on_commit(lambda ids=recipients: notify_inbox(ids))
+            User.objects.filter(id__in=ids).exclude(
+                inbox_version=TEMPLATES_VERSION
+            ).update(inbox_version=TEMPLATES_VERSION)
+        created_total += len(missing)
 
     return (
         f"Seeded {created_total} new, updated {updated_total}, "
         f"removed {deleted_total} duplicates."
     )
+
+@shared_task
+def flush_response_buffer():
+    """
+    Run by celery beat: write buffered response autosaves to the database.
+    A no-op unless RESPONSE_BUFFER_URL is set.
+    """
+    return flush()
@@ -0,0 +1,165 @@
+# student_activities/tests/test_autosave.py
+from unittest import mock, skipIf
+
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.urls import reverse
+
+from classroom_admin.export_jobs import _fingerprint_responses
+from classroom_admin.models import ClassroomDayProgress, CustomUser, Classroom, Student
+from scitrek_backend.testing import ScitrekAPITestCase
+from student_activities.autosave import _upsert_sql, merge_patch
+from student_activities.models import Module, StudentResponse
+from student_activities.response_buffer import MemoryBuffer
+from student_activities.tasks import flush_response_buffer
+
+
+class AnswersMergePatchTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+
+        teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=teacher)
+        self.module = Module.objects.create(day=1, title="Genes", content="...", classroom=self.classroom)
+        self.user = CustomUser.objects.create_user(username="stu", is_student=True)
+        Student.objects.create(user=self.user, classroom=self.classroom)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('api-module-response', args=[1])
+
+    def test_merge_patch(self):
+        target = {"a": 1, "b": {"c": 2, "d": 3}, "e": [1]}
+        patch = {"a": None, "b": {"c": 5, "d": None}, "e": [2], "f": "new"}
+        self.assertEqual(merge_patch(target, patch), {"b": {"c": 5}, "e": [2], "f": "new"})
+        self.assertEqual(merge_patch(["x"], {"a": 1}), {"a": 1})
+
+    def test_patch_creates_then_merges(self):
+        resp = self.client.patch(self.url, {'answers': {"q1": "A", "notes": {"intro": "hi"}}}, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(ClassroomDayProgress.objects.get(classroom=self.classroom, day=1).completed, 1)
+
+        resp = self.client.patch(self.url, {'answers': {"q1": None, "q2": "B", "notes": {"end": "bye"}}}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        answers = StudentResponse.objects.get(student=self.user, module=self.module).answers
+        self.assertEqual(answers, {"q2": "B", "notes": {"intro": "hi", "end": "bye"}})
+        # the rollup counts responses, not saves
+        self.assertEqual(ClassroomDayProgress.objects.get(classroom=self.classroom, day=1).completed, 1)
+
+    def test_patch_must_be_object(self):
+        resp = self.client.patch(self.url, {'answers': ["q1"]}, format='json')
+        self.assertEqual(resp.status_code, 400)
+
+
+    @skipIf(connection.vendor != 'postgresql', "ON CONFLICT upsert is PostgreSQL-only")
+    def test_sql_upsert(self):
+        with transaction.atomic():
+            created, _ = _upsert_sql(self.user.id, self.module.id, {"q1": "A", "q2": "B"})
+        self.assertTrue(created)
+        self.assertEqual(StudentResponse.objects.get(student=self.user).answers, {"q1": "A", "q2": "B"})
+
+        with transaction.atomic():
+            created, _ = _upsert_sql(self.user.id, self.module.id, {"q1": None, "q3": "C"})
+        self.assertFalse(created)
+        self.assertEqual(StudentResponse.objects.get(student=self.user).answers, {"q2": "B", "q3": "C"})
+
+        # a non-object value is replaced, as merge_patch would
+        StudentResponse.objects.filter(student=self.user).update(answers=["legacy"])
+        with transaction.atomic():
+            created, _ = _upsert_sql(self.user.id, self.module.id, {"q1": None, "q4": "D"})
+        self.assertFalse(created)
+        self.assertEqual(StudentResponse.objects.get(student=self.user).answers, {"q4": "D"})
+        self.assertEqual(StudentResponse.objects.count(), 1)
+
+
+class ResponseBufferTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('student_activities.response_buffer._buffer', MemoryBuffer())
+        self.buffer = patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+
+        teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=teacher)
+        self.module = Module.objects.create(day=1, title="Genes", content="...", classroom=self.classroom)
+        self.user = CustomUser.objects.create_user(username="stu", is_student=True)
+        Student.objects.create(user=self.user, classroom=self.classroom)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('api-module-response', args=[1])
+        self.detail_url = reverse('api-module-response-detail', args=[1])
+
+    def test_autosave_is_buffered_and_readable(self):
+        resp = self.client.patch(self.url, {'answers': {"q1": "A"}}, format='json')
+        self.assertEqual(resp.status_code, 202)
+        resp = self.client.patch(self.url, {'answers': {"q2": "B"}}, format='json')
+        self.assertEqual(resp.status_code, 202)
+        self.assertFalse(StudentResponse.objects.exists())
+
+        resp = self.client.get(self.detail_url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['answers'], {"q1": "A", "q2": "B"})
+
+    def test_flush_writes_drafts(self):
+        self.client.patch(self.url, {'answers': {"q1": "A"}}, format='json')
+        self.assertEqual(flush_response_buffer(), 1)
+        self.assertEqual(StudentResponse.objects.get(student=self.user).answers, {"q1": "A"})
+        self.assertEqual(ClassroomDayProgress.objects.get(classroom=self.classroom, day=1).completed, 1)
+
+        self.client.patch(self.url, {'answers': {"q1": None, "q2": "B"}}, format='json')
+        self.assertEqual(flush_response_buffer(), 1)
+        self.assertEqual(StudentResponse.objects.get(student=self.user).answers, {"q2": "B"})
+        self.assertEqual(ClassroomDayProgress.objects.get(classroom=self.classroom, day=1).completed, 1)
+        self.assertEqual(self.buffer.drafts, {})
+        self.assertEqual(flush_response_buffer(), 0)
+
+    def test_final_save_writes_through(self):
+        self.client.patch(self.url, {'answers': {"q1": "A"}}, format='json')
+        resp = self.client.patch(self.url, {'answers': {"q2": "B"}, 'final': True}, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(StudentResponse.objects.get(student=self.user).answers, {"q1": "A", "q2": "B"})
+        self.assertEqual(self.buffer.drafts, {})
+        self.assertEqual(ClassroomDayProgress.objects.get(classroom=self.classroom, day=1).completed, 1)
+
+    def test_flush_keeps_a_final_save_made_after_it_read_the_draft(self):
+        self.client.patch(self.url, {'answers': {"q1": "A"}}, format='json')
+        stale = self.buffer.pending(10)
+        self.client.patch(self.url, {'answers': {"q1": "B"}, 'final': True}, format='json')
+
+        # the final save released the draft after flush took its batch
+        with mock.patch.object(self.buffer, 'pending', side_effect=[stale, []]):
+            self.assertEqual(flush_response_buffer(), 0)
+        self.assertEqual(StudentResponse.objects.get(student=self.user).answers, {"q1": "B"})
+
+        # the final save committed but has not released the draft yet
+        self.buffer.stage(*stale[0])
+        self.assertEqual(flush_response_buffer(), 0)
+        self.assertEqual(StudentResponse.objects.get(student=self.user).answers, {"q1": "B"})
+        self.assertEqual(self.buffer.drafts, {})
+
+    def test_conflicting_draft_is_kept_for_the_next_flush(self):
+        self.client.patch(self.url, {'answers': {"q1": "A"}}, format='json')
+        with mock.patch.object(StudentResponse.objects, 'bulk_create', side_effect=IntegrityError):
+            self.assertEqual(flush_response_buffer(), 0)
+        self.assertEqual(len(self.buffer.drafts), 1)
+
+        self.assertEqual(flush_response_buffer(), 1)
+        self.assertEqual(StudentResponse.objects.get(student=self.user).answers, {"q1": "A"})
+
+    def test_flushed_update_moves_the_export_fingerprint(self):
+        self.client.patch(self.url, {'answers': {"q1": "A"}, 'final': True}, format='json')
+        # an autosave to this response, saved before another one is written
+        self.client.patch(self.url, {'answers': {"q1": "B"}}, format='json')
+        Module.objects.create(day=2, title="Cells", content="...", classroom=self.classroom)
+        self.client.patch(reverse('api-module-response', args=[2]), {'answers': {"q1": "A"}, 'final': True}, format='json')
+        before = _fingerprint_responses([self.classroom.id])
+
+        self.assertEqual(flush_response_buffer(), 1)
+        self.assertNotEqual(_fingerprint_responses([self.classroom.id]), before)
+
+    def test_draft_for_a_deleted_module_is_dropped(self):
+        self.client.patch(self.url, {'answers': {"q1": "A"}}, format='json')
+        self.module.delete()
+        with self.assertLogs('student_activities.response_buffer', 'WARNING'):
+            self.assertEqual(flush_response_buffer(), 0)
+        self.assertEqual(self.buffer.drafts, {})
+        self.assertEqual(self.buffer.dirty, set())
+        self.assertFalse(StudentResponse.objects.exists())
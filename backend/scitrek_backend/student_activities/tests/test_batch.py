@@ -0,0 +1,74 @@
+# student_activities/tests/test_batch.py
+from django.urls import reverse
+
+from classroom_admin.models import ClassroomDayProgress, CustomUser, Classroom, Student
+from scitrek_backend.testing import ScitrekAPITestCase
+from student_activities.models import Module, StudentResponse
+
+
+class StudentBatchTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+
+        teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=teacher)
+        self.day1 = Module.objects.create(day=1, title="Genes", content="...", classroom=self.classroom)
+        self.day2 = Module.objects.create(day=2, title="Cells", content="...", classroom=self.classroom)
+        self.user = CustomUser.objects.create_user(username="stu", is_student=True)
+        Student.objects.create(user=self.user, classroom=self.classroom)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('api-student-batch')
+
+    def _batch(self, *operations):
+        resp = self.client.post(self.url, {'operations': list(operations)}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        return [(r['op'], r['status'], r['data']) for r in resp.data['results']]
+
+    def test_saves_several_days_then_reads(self):
+        StudentResponse.objects.create(student=self.user, module=self.day2, answers={"q1": "old"})
+        self.client.get(reverse('api-progress'))  # warm the cached summary
+
+        with self.captureOnCommitCallbacks(execute=True):
+            results = self._batch(
+                {'op': 'save_response', 'day': 1, 'answers': {"q1": "A"}},
+                {'op': 'save_response', 'day': 2, 'answers': {"q1": "B"}},
+                {'op': 'progress'},
+                {'op': 'response', 'day': 2},
+            )
+        self.assertEqual([status for _, status, _ in results], [201, 200, 200, 200])
+        self.assertEqual(results[2][2]['completed_days'], [1, 2])
+        self.assertEqual(results[3][2]['answers'], {"q1": "B"})
+        self.assertEqual(ClassroomDayProgress.objects.get(classroom=self.classroom, day=1).completed, 1)
+        # the stale cached summary was dropped on commit
+        self.assertEqual(self.client.get(reverse('api-progress')).data['completed_days'], [1, 2])
+
+    def test_reads_profile_and_modules(self):
+        results = self._batch({'op': 'profile'}, {'op': 'modules'}, {'op': 'module', 'id': self.day2.id})
+        self.assertEqual(results[0][2]['classroom_id'], self.classroom.id)
+        self.assertEqual([m['title'] for m in results[1][2]], ["Genes", "Cells"])
+        self.assertEqual(results[2][2]['title'], "Cells")
+
+    def test_failed_operation_does_not_undo_others(self):
+        results = self._batch(
+            {'op': 'save_response', 'day': 1, 'answers': {"q1": "A"}},
+            {'op': 'save_response', 'day': 4, 'answers': {"q1": "B"}},
+            {'op': 'response', 'day': 2},
+        )
+        self.assertEqual([status for _, status, _ in results], [201, 404, 404])
+        self.assertEqual(StudentResponse.objects.get(student=self.user).module, self.day1)
+
+    def test_saves_count_against_the_response_throttle(self):
+        save = {'op': 'save_response', 'day': 1, 'answers': {"q1": "A"}}
+        self.assertEqual({status for _, status, _ in self._batch(*[save] * 20)}, {200, 201})
+
+        # 'response' allows 30 a minute: ten more saves, then 429s
+        results = self._batch(*[save] * 19, {'op': 'profile'})
+        self.assertEqual([status for _, status, _ in results], [200] * 10 + [429] * 9 + [200])
+        resp = self.client.post(reverse('api-module-response', args=[1]), {'answers': {"q1": "B"}}, format='json')
+        self.assertEqual(resp.status_code, 429)
+
+    def test_invalid_operations_rejected(self):
+        resp = self.client.post(self.url, {'operations': [{'op': 'response'}]}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        resp = self.client.post(self.url, {'operations': [{'op': 'profile'}] * 21}, format='json')
+        self.assertEqual(resp.status_code, 400)
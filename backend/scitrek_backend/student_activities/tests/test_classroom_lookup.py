@@ -0,0 +1,45 @@
+# student_activities/tests/test_classroom_lookup.py
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from classroom_admin.models import CustomUser, Classroom, Student
+from scitrek_backend.testing import ScitrekAPITestCase
+from student_activities.models import Module
+
+
+class StudentClassroomLookupTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+
+        teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.bio1 = Classroom.objects.create(name="Bio 1", teacher=teacher)
+        self.bio2 = Classroom.objects.create(name="Bio 2", teacher=teacher)
+        Module.objects.create(day=1, title="Genes", content="...", classroom=self.bio1)
+        Module.objects.create(day=2, title="Cells", content="...", classroom=self.bio2)
+        self.user = CustomUser.objects.create_user(username="stu", is_student=True)
+        Student.objects.create(user=self.user, classroom=self.bio1)
+        self.client.force_authenticate(user=self.user)
+
+    def _profile_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        return resp, [q for q in ctx.captured_queries if 'classroom_admin_student' in q['sql']]
+
+    def test_classroom_cached_until_profile_changes(self):
+        url = reverse('api-module-list')
+        resp, lookups = self._profile_queries(url)
+        self.assertEqual([m['title'] for m in resp.data['results']], ["Genes"])
+        self.assertEqual(len(lookups), 1)
+
+        resp, lookups = self._profile_queries(url)
+        self.assertEqual(len(lookups), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('api-student-profile'), {'classroom': self.bio2.pk}, format='json')
+        resp, lookups = self._profile_queries(url)
+        self.assertEqual([m['title'] for m in resp.data['results']], ["Cells"])
+
+    def test_user_without_profile_gets_404(self):
+        self.client.force_authenticate(user=CustomUser.objects.create_user(username="nobody"))
+        self.assertEqual(self.client.get(reverse('api-module-list')).status_code, 404)
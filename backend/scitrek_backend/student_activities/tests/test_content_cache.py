@@ -0,0 +1,106 @@
+# student_activities/tests/test_content_cache.py
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from classroom_admin.models import CustomUser, Classroom, Student
+from scitrek_backend.testing import ScitrekAPITestCase
+from student_activities.content_cache import _get_or_build
+from student_activities.models import Module, QuizQuestion
+
+
+class ModuleCacheTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+
+        teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=teacher)
+        self.module = Module.objects.create(day=1, title="Genes", content="...", classroom=self.classroom)
+        user = CustomUser.objects.create_user(username="stu", is_student=True)
+        Student.objects.create(user=user, classroom=self.classroom)
+        self.client.force_authenticate(user=user)
+
+    def test_list_revalidates_with_etag(self):
+        url = reverse('api-module-list')
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.data['results'][0]['title'], "Genes")
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(len(ctx.captured_queries), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.module.title = "Gene regulation"
+            self.module.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['results'][0]['title'], "Gene regulation")
+        self.assertNotEqual(resp['ETag'], first['ETag'])
+
+    def test_detail_served_from_cache(self):
+        url = reverse('api-module-detail', args=[self.module.pk])
+        self.assertEqual(self.client.get(url).data['title'], "Genes")
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(url)
+        self.assertEqual(resp.data['title'], "Genes")
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertIn('no-cache', resp['Cache-Control'])
+
+        other = Classroom.objects.create(name="Bio 2", teacher=self.classroom.teacher)
+        foreign = Module.objects.create(day=2, title="Cells", content="...", classroom=other)
+        self.assertEqual(self.client.get(reverse('api-module-detail', args=[foreign.pk])).status_code, 404)
+
+
+class QuizQuestionCacheTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+
+        teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        classroom = Classroom.objects.create(name="Bio 1", teacher=teacher)
+        self.question = QuizQuestion.objects.create(
+            quiz_type=QuizQuestion.PRE, classroom=classroom, question_text="Q1",
+            choices={"A": "x", "B": "y"}, answer="A",
+        )
+        user = CustomUser.objects.create_user(username="stu", is_student=True)
+        Student.objects.create(user=user, classroom=classroom)
+        self.client.force_authenticate(user=user)
+
+    def test_questions_cached_without_answers(self):
+        url = reverse('api-quiz-pre')
+        first = self.client.get(url)
+        self.assertEqual(first.data['results'][0]['question_text'], "Q1")
+        self.assertNotIn('answer', first.data['results'][0])
+
+        with CaptureQueriesContext(connection) as ctx:
+            again = self.client.get(url)
+        self.assertEqual(len(ctx.captured_queries), 0)
+        self.assertEqual(again.data, first.data)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.question.question_text = "Q1 (revised)"
+            self.question.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['results'][0]['question_text'], "Q1 (revised)")
+        self.assertEqual(self.client.get(reverse('api-quiz-post')).data['results'], [])
+
+    def test_concurrent_miss_waits_for_builder(self):
+        cache.add("payload:building", 1)
+        build = mock.Mock(return_value=["mine"])
+        # another process finishes its build while we wait
+        with mock.patch('student_activities.content_cache.time.sleep',
+                        side_effect=lambda _: cache.set("payload", ["theirs"])):
+            self.assertEqual(_get_or_build("payload", build), ["theirs"])
+        build.assert_not_called()
+
+    def test_waiter_that_gives_up_keeps_builders_lock(self):
+        cache.add("payload:building", 1)
+        with mock.patch('student_activities.content_cache.BUILD_WAIT', 0):
+            self.assertEqual(_get_or_build("payload", lambda: ["mine"]), ["mine"])
+        self.assertIsNotNone(cache.get("payload:building"))
@@ -0,0 +1,81 @@
+# student_activities/tests/test_grading.py
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from classroom_admin.models import CustomUser, Classroom, Student
+from scitrek_backend.testing import ScitrekAPITestCase
+from student_activities.grading import answer_key, grade
+from student_activities.models import QuizAttempt, QuizQuestion
+from student_activities.progress_summary import progress_summary
+
+
+class QuizGradingTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+
+        teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=teacher)
+        self.q1 = QuizQuestion.objects.create(
+            quiz_type=QuizQuestion.PRE, classroom=self.classroom, question_text="Q1",
+            choices={"A": "x", "B": "y"}, answer="A",
+        )
+        self.q2 = QuizQuestion.objects.create(
+            quiz_type=QuizQuestion.PRE, classroom=self.classroom, question_text="Q2",
+            choices={"A": "x", "B": "y"}, answer="B",
+        )
+        self.user = CustomUser.objects.create_user(username="stu", is_student=True)
+        Student.objects.create(user=self.user, classroom=self.classroom)
+        self.client.force_authenticate(user=self.user)
+
+    def test_grade(self):
+        answers = {"1": "A", "2": "B"}
+        self.assertEqual(grade({"1": "A", "2": "B"}, answers), 1.0)
+        self.assertEqual(grade({"1": "A"}, answers), 0.5)
+        self.assertEqual(grade([], answers), 0.0)
+        self.assertEqual(grade({"1": "A"}, {}), 0.0)
+
+    def test_client_score_is_ignored(self):
+        resp = self.client.post(reverse('api-quiz-attempt'), {
+            "quiz_type": "pre", "score": 1.0, "attempt_data": {str(self.q1.pk): "A", str(self.q2.pk): "A"},
+        }, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['score'], 0.5)
+
+    def test_unknown_quiz_is_404(self):
+        resp = self.client.post(reverse('api-quiz-attempt'), {"quiz_type": "post", "attempt_data": {}}, format='json')
+        self.assertEqual(resp.status_code, 404)
+
+    def test_invalid_quiz_type_is_400(self):
+        resp = self.client.post(reverse('api-quiz-attempt'), {"quiz_type": "mid", "attempt_data": {}}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('quiz_type', resp.data)
+
+    def test_answer_key_is_cached_and_invalidated(self):
+        answer_key(self.classroom.pk, 'pre')
+        with self.assertNumQueries(0):
+            answer_key(self.classroom.pk, 'pre')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.q2.answer = "A"
+            self.q2.save()
+        self.assertEqual(answer_key(self.classroom.pk, 'pre')[str(self.q2.pk)], "A")
+
+    def test_regrade_command_after_correction(self):
+        attempt = QuizAttempt.objects.create(
+            student=self.user, quiz_type='pre', score=0.5,
+            attempt_data={str(self.q1.pk): "A", str(self.q2.pk): "A"},
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.q2.answer = "A"
+            self.q2.save()
+
+        self.assertEqual(progress_summary(self.user.id)['pre_score'], 0.5)
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('regrade_quizzes', stdout=out)
+        attempt.refresh_from_db()
+        self.assertEqual(attempt.score, 1.0)
+        self.assertEqual(progress_summary(self.user.id)['pre_score'], 1.0)
+        self.assertIn("1 scores changed", out.getvalue())
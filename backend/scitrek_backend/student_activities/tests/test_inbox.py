@@ -0,0 +1,252 @@
+# student_activities/tests/test_inbox.py
+import io
+import tempfile
+from datetime import datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from classroom_admin.models import CustomUser, Classroom, Student, ScheduledMessage
+from classroom_admin.tasks import schedule_message_task
+from scitrek_backend.testing import ScitrekAPITestCase
+from student_activities.api_views import InboxCursorPagination
+from student_activities.attachments import atomic_with_blobs, store_attachment
+from student_activities.management.commands.convert_inbox_messages import LEGACY_SCHEDULED_TABLE, LEGACY_TABLE
+from student_activities.models import Attachment, Message, MessageContent
+from student_activities.tasks import TEMPLATES, TEMPLATES_VERSION, seed_inbox, seed_inbox_for_user
+
+
+class InboxTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+        # the virtual scientist id is cached per process
+        patcher = mock.patch('student_activities.tasks._VS_ID', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = override_settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = classroom = Classroom.objects.create(name="Bio 1", teacher=teacher)
+        self.users = CustomUser.objects.bulk_create(
+            CustomUser(username=f"stu{i}", is_student=True) for i in range(3)
+        )
+        Student.objects.bulk_create(Student(user=u, classroom=classroom) for u in self.users)
+
+    def test_templates_share_content(self):
+        seed_inbox(chunk_size=2)
+        seed_inbox()
+        self.assertEqual(MessageContent.objects.count(), len(TEMPLATES))
+        self.assertEqual(Message.objects.count(), len(TEMPLATES) * len(self.users))
+
+        MessageContent.objects.filter(subject=TEMPLATES[0][0]).update(body="old")
+        self.assertEqual(
+            seed_inbox_for_user(self.users[0].id), {"created": 0, "updated": 1, "deleted_dupes": 0}
+        )
+
+    def test_reseed_is_set_based(self):
+        seed_inbox()
+        vs = MessageContent.objects.first().sender
+        MessageContent.objects.create(sender=vs, subject=TEMPLATES[1][0], body="dupe")
+        Message.objects.filter(recipient=self.users[0]).delete()
+
+        with CaptureQueriesContext(connection) as ctx:
+            result = seed_inbox(chunk_size=2)
+        self.assertIn("Seeded 6 new", result)
+        self.assertIn("removed 1 duplicates", result)
+        self.assertEqual(Message.objects.count(), len(TEMPLATES) * len(self.users))
+        # one existing-deliveries lookup per chunk of two students
+        lookups = [q for q in ctx.captured_queries
+                   if q['sql'].startswith('SELECT "student_activities_message"."recipient_id"')]
+        self.assertEqual(len(lookups), 2)
+
+    def test_list_and_toggle_read_through_content(self):
+        seed_inbox_for_user(self.users[0].id)
+        self.client.force_authenticate(user=self.users[0])
+        page = self.client.get(reverse('api-inbox')).data
+        inbox = page['results']
+        self.assertEqual(len(inbox), len(TEMPLATES))
+        self.assertNotIn('count', page)
+        self.assertEqual(self.client.get(reverse('api-inbox-unread-count')).data, {'unread': len(TEMPLATES)})
+        self.assertIn(inbox[0]['subject'], [subj for subj, _ in TEMPLATES])
+
+        resp = self.client.patch(
+            reverse('api-inbox-read', args=[inbox[0]['id']]), {'is_read': True}, format='json'
+        )
+        self.assertTrue(resp.data['is_read'])
+        self.assertEqual(resp.data['subject'], inbox[0]['subject'])
+        self.assertEqual(self.client.get(reverse('api-inbox-unread-count')).data, {'unread': len(TEMPLATES) - 1})
+
+    def test_bulk_read_state(self):
+        seed_inbox_for_user(self.users[0].id)
+        self.client.force_authenticate(user=self.users[0])
+        url = reverse('api-inbox-bulk-read')
+        ids = list(Message.objects.filter(recipient=self.users[0]).order_by('-id').values_list('id', flat=True))
+
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.post(url, {'ids': ids[:2]}, format='json')
+        self.assertEqual(resp.data, {'updated': 2, 'unread': len(TEMPLATES) - 2})
+        self.assertEqual(len([q for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]), 1)
+
+        # ids[3] and everything older; ids[2] stays unread
+        resp = self.client.post(url, {'through': ids[3]}, format='json')
+        self.assertEqual(resp.data, {'updated': 3, 'unread': 1})
+        resp = self.client.post(url, {'is_read': False}, format='json')
+        self.assertEqual(resp.data, {'updated': 5, 'unread': len(TEMPLATES)})
+        self.assertEqual(self.client.post(url, {'ids': [1], 'through': 1}, format='json').status_code, 400)
+
+    def test_inbox_keyset_pages(self):
+        seed_inbox_for_user(self.users[0].id)
+        self.client.force_authenticate(user=self.users[0])
+        with mock.patch.object(InboxCursorPagination, 'page_size', 4):
+            first = self.client.get(reverse('api-inbox')).data
+            second = self.client.get(first['next']).data
+        ids = [m['id'] for m in first['results'] + second['results']]
+        self.assertEqual(len(ids), len(TEMPLATES))
+        self.assertEqual(ids, sorted(ids, reverse=True))
+        self.assertIsNone(second['next'])
+
+    def test_inbox_pages_split_a_run_of_equal_timestamps(self):
+        seed_inbox_for_user(self.users[0].id)
+        messages = Message.objects.filter(recipient=self.users[0]).order_by('id')
+        # all but the newest delivered in the same instant
+        same = timezone.now() - timedelta(hours=1)
+        Message.objects.filter(pk__in=[m.pk for m in messages[:len(TEMPLATES) - 1]]).update(timestamp=same)
+        expected = list(Message.objects.filter(recipient=self.users[0]).order_by('-timestamp', '-id').values_list('id', flat=True))
+
+        self.client.force_authenticate(user=self.users[0])
+        ids, url, pages = [], reverse('api-inbox'), []
+        with mock.patch.object(InboxCursorPagination, 'page_size', 3):
+            while url:
+                with CaptureQueriesContext(connection) as ctx:
+                    page = self.client.get(url).data
+                self.assertFalse(any('OFFSET' in q['sql'] for q in ctx.captured_queries))
+                pages.append(page)
+                ids += [m['id'] for m in page['results']]
+                url = page['next']
+            self.assertEqual(ids, expected)
+
+            # and back again from the last page
+            back = self.client.get(pages[-1]['previous']).data
+        self.assertEqual([m['id'] for m in back['results']], [m['id'] for m in pages[-2]['results']])
+
+    def test_attachment_stored_once_and_cacheable(self):
+        self.client.force_authenticate(user=self.classroom.teacher)
+        url = reverse('teacher-schedule-messages', args=[self.classroom.pk])
+        for subject in ("Lab sheet", "Lab sheet (again)"):
+            with mock.patch('classroom_admin.api_views.send_scheduled_message_task.delay'):
+                resp = self.client.post(url, {
+                    'subject': subject, 'body': "...",
+                    'scheduled_time': (timezone.now() + timedelta(hours=1)).isoformat(),
+                    'attachment': SimpleUploadedFile("sheet.pdf", b"%PDF-1.4 lab", content_type="application/pdf"),
+                })
+            self.assertEqual(resp.status_code, 201)
+            self.assertEqual(resp.data['attachment_name'], "sheet.pdf")
+            schedule_message_task(resp.data['id'])
+        # stored once at upload time; no per-message copy of the upload
+        self.assertEqual(Attachment.objects.count(), 1)
+        self.assertFalse(default_storage.exists("teacher_messages"))
+        self.assertEqual(Message.objects.filter(content__attachment__isnull=False).count(), 6)
+
+        delivery = Message.objects.filter(recipient=self.users[0]).first()
+        url = reverse('api-inbox-attachment', args=[delivery.pk])
+        self.client.force_authenticate(user=self.users[0])
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(b"".join(resp.streaming_content), b"%PDF-1.4 lab")
+        self.assertIn('sheet.pdf', resp['Content-Disposition'])
+        self.assertIn('immutable', resp['Cache-Control'])
+
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=resp['ETag'])
+        self.assertEqual(resp.status_code, 304)
+
+        self.client.force_authenticate(user=self.users[1])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_failed_upload_leaves_no_blob_file(self):
+        with self.assertRaises(RuntimeError):
+            with atomic_with_blobs():
+                blob = store_attachment(SimpleUploadedFile("sheet.pdf", b"%PDF-1.4 lost"))
+                raise RuntimeError("message insert failed")
+        self.assertFalse(Attachment.objects.exists())
+        self.assertFalse(default_storage.exists(blob.file.name))
+
+    def test_login_skips_current_inbox(self):
+        user = CustomUser.objects.create_user(username="login", password="pw-123456", is_student=True)
+        url = reverse('token_obtain_pair')
+        with mock.patch('student_activities.auth_views.seed_inbox_for_user.delay') as delay:
+            self.client.post(url, {'username': "login", 'password': "pw-123456"})
+            self.assertEqual(delay.call_count, 1)
+
+            seed_inbox_for_user(user.id)
+            user.refresh_from_db()
+            self.assertEqual(user.inbox_version, TEMPLATES_VERSION)
+            self.client.post(url, {'username': "login", 'password': "pw-123456"})
+            self.assertEqual(delay.call_count, 1)
+
+    def test_restore_converts_legacy_messages(self):
+        sender = CustomUser.objects.get(username="teach")
+        path = default_storage.save("inbox_attachments/sheet.pdf", ContentFile(b"%PDF-1.4 old"))
+        sent = datetime(2024, 9, 1, 8, 30, tzinfo=dt_timezone.utc)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TABLE {LEGACY_TABLE} (id integer, sender_id integer, recipient_id integer, "
+                "subject varchar(255), body text, timestamp datetime, is_read bool, attachment varchar(100))"
+            )
+            rows = [
+                (10, self.users[0].id, "Welcome", "Hi", True, ""),
+                (11, self.users[1].id, "Welcome", "Hi", False, ""),
+                (12, self.users[0].id, "Lab sheet", "See file", False, path),
+            ]
+            for pk, recipient_id, subject, body, is_read, attachment in rows:
+                cursor.execute(
+                    f"INSERT INTO {LEGACY_TABLE} VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+                    [pk, sender.id, recipient_id, subject, body, sent, is_read, attachment],
+                )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('convert_inbox_messages', 'restore', chunk_size=2, stdout=io.StringIO())
+
+        self.assertEqual(MessageContent.objects.count(), 2)
+        welcome = Message.objects.get(pk=10)
+        self.assertEqual((welcome.subject, welcome.is_read, welcome.timestamp), ("Welcome", True, sent))
+        self.assertEqual(Message.objects.get(pk=11).content_id, welcome.content_id)
+        lab = Message.objects.get(pk=12).content
+        self.assertEqual(lab.attachment.file.read(), b"%PDF-1.4 old")
+        self.assertEqual(lab.attachment_name, "sheet.pdf")
+        self.assertFalse(default_storage.exists(path))
+        self.assertNotIn(LEGACY_TABLE, connection.introspection.table_names())
+
+    def test_restore_converts_legacy_scheduled_attachments(self):
+        msg = ScheduledMessage.objects.create(
+            classroom=self.classroom, subject="Lab sheet", body="...", scheduled_time=timezone.now()
+        )
+        path = default_storage.save("teacher_messages/sheet.pdf", ContentFile(b"%PDF-1.4 pending"))
+        with connection.cursor() as cursor:
+            cursor.execute(f"CREATE TABLE {LEGACY_SCHEDULED_TABLE} (id integer, attachment varchar(100))")
+            cursor.execute(f"INSERT INTO {LEGACY_SCHEDULED_TABLE} VALUES (%s, %s)", [msg.pk, path])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('convert_inbox_messages', 'restore', stdout=io.StringIO())
+
+        msg.refresh_from_db()
+        self.assertEqual(msg.attachment.file.read(), b"%PDF-1.4 pending")
+        self.assertEqual(msg.attachment_name, "sheet.pdf")
+        self.assertFalse(default_storage.exists(path))
+        self.assertNotIn(LEGACY_SCHEDULED_TABLE, connection.introspection.table_names())
+
+        # both tables are in the new layout now
+        with self.assertRaises(CommandError):
+            call_command('convert_inbox_messages', 'stash', stdout=io.StringIO())
@@ -0,0 +1,58 @@
+# student_activities/tests/test_progress.py
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from classroom_admin.models import CustomUser, Classroom, Student
+from scitrek_backend.testing import ScitrekAPITestCase
+from student_activities.models import Module, QuizAttempt, QuizQuestion, StudentResponse
+
+
+class ProgressSummaryTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+
+        teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=teacher)
+        self.day1 = Module.objects.create(day=1, title="Genes", content="...", classroom=self.classroom)
+        self.day3 = Module.objects.create(day=3, title="Cells", content="...", classroom=self.classroom)
+        QuizQuestion.objects.create(
+            quiz_type=QuizQuestion.PRE, classroom=self.classroom,
+            question_text="DNA?", choices={"A": "Yes", "B": "No"}, answer="A",
+        )
+        self.user = CustomUser.objects.create_user(username="stu", is_student=True)
+        Student.objects.create(user=self.user, classroom=self.classroom)
+        self.client.force_authenticate(user=self.user)
+        self.url = reverse('api-progress')
+
+    def _get(self):
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(self.url)
+        return resp.data, len(ctx.captured_queries)
+
+    def test_one_query_then_cached(self):
+        StudentResponse.objects.create(student=self.user, module=self.day3, answers={})
+        StudentResponse.objects.create(student=self.user, module=self.day1, answers={})
+        QuizAttempt.objects.create(student=self.user, quiz_type=QuizAttempt.PRE, score=0.5, attempt_data={})
+
+        data, queries = self._get()
+        self.assertEqual(data, {'completed_days': [1, 3], 'pre_score': 0.5, 'post_score': None})
+        self.assertEqual(queries, 1)
+        self.assertEqual(self._get(), (data, 0))
+
+    def test_writes_invalidate_summary(self):
+        self.assertEqual(self._get()[0]['completed_days'], [])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('api-module-response', args=[1]), {'answers': {"q1": "A"}}, format='json')
+        self.assertEqual(self._get()[0]['completed_days'], [1])
+
+        self.client.post(reverse('api-quiz-attempt'), {
+            'quiz_type': QuizAttempt.PRE, 'attempt_data': {}
+        }, format='json')
+        data, _ = self._get()
+        self.assertEqual(data['pre_score'], 0.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StudentResponse.objects.filter(student=self.user).delete()
+        self.assertEqual(self._get()[0]['completed_days'], [])
@@ -0,0 +1,102 @@
+# student_activities/tests/test_push.py
+from unittest import mock
+
+from asgiref.sync import sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from classroom_admin.models import CustomUser, Classroom, Student, ScheduledMessage
+from classroom_admin.tasks import schedule_message_task
+from scitrek_backend.stream_asgi import application
+from scitrek_backend.testing import ScitrekAPITestCase
+from student_activities.push import INBOX_STREAM_PATH, MemoryBroker, issue_stream_ticket, notify_inbox
+
+
+def stream_scope(query=b''):
+    return {
+        'type': 'http', 'method': 'GET', 'path': INBOX_STREAM_PATH,
+        'query_string': query, 'headers': [],
+    }
+
+
+class InboxPushTests(ScitrekAPITestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch('student_activities.push._broker', MemoryBroker())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache.clear()
+
+        self.teacher = CustomUser.objects.create_user(username="teach", is_teacher=True)
+        self.classroom = Classroom.objects.create(name="Bio 1", teacher=self.teacher)
+        self.user = CustomUser.objects.create_user(username="stu", is_student=True)
+        Student.objects.create(user=self.user, classroom=self.classroom)
+
+    async def open_stream(self, query):
+        comm = ApplicationCommunicator(application, stream_scope(query))
+        await comm.send_input({'type': 'http.request'})
+        return comm, await comm.receive_output(timeout=5)
+
+    async def test_stream_requires_ticket(self):
+        _, start = await self.open_stream(b'')
+        self.assertEqual(start['status'], 401)
+        # access tokens are not accepted in the URL
+        token = str(AccessToken.for_user(self.user))
+        _, start = await self.open_stream(f"token={token}".encode())
+        self.assertEqual(start['status'], 401)
+        _, start = await self.open_stream(f"ticket={token}".encode())
+        self.assertEqual(start['status'], 401)
+
+    async def test_stream_service_serves_only_the_stream(self):
+        comm = ApplicationCommunicator(application, {
+            'type': 'http', 'method': 'GET', 'path': '/api/student/inbox/',
+            'query_string': b'', 'headers': [],
+        })
+        await comm.send_input({'type': 'http.request'})
+        self.assertEqual((await comm.receive_output(timeout=5))['status'], 404)
+
+    def test_ticket_requires_authentication(self):
+        url = reverse('api-inbox-stream-ticket')
+        self.assertEqual(self.client.post(url).status_code, 401)
+        self.client.force_authenticate(user=self.user)
+        resp = self.client.post(url)
+        self.assertEqual(resp.status_code, 201)
+        self.assertTrue(resp.data['ticket'])
+
+    async def test_ticket_is_single_use(self):
+        ticket = await sync_to_async(issue_stream_ticket)(self.user.id)
+        comm, start = await self.open_stream(f"ticket={ticket}".encode())
+        self.assertEqual(start['status'], 200)
+        _, again = await self.open_stream(f"ticket={ticket}".encode())
+        self.assertEqual(again['status'], 401)
+        await comm.send_input({'type': 'http.disconnect'})
+        await comm.wait(timeout=5)
+
+    async def test_stream_pushes_inbox_events(self):
+        ticket = await sync_to_async(issue_stream_ticket)(self.user.id)
+        comm = ApplicationCommunicator(application, stream_scope(f"ticket={ticket}".encode()))
+        await comm.send_input({'type': 'http.request'})
+        start = await comm.receive_output(timeout=5)
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+        self.assertIn(b"event: ready", (await comm.receive_output(timeout=5))['body'])
+
+        notify_inbox([self.user.id])
+        notify_inbox([self.user.id + 1000])   # someone else's inbox
+        self.assertIn(b"event: inbox", (await comm.receive_output(timeout=5))['body'])
+        self.assertTrue(await comm.receive_nothing(timeout=0.1))
+
+        await comm.send_input({'type': 'http.disconnect'})
+        await comm.wait(timeout=5)
+
+    def test_delivery_notifies_after_commit(self):
+        msg = ScheduledMessage.objects.create(
+            classroom=self.classroom, subject="Lab day", body="...", scheduled_time=timezone.now()
+        )
+        with mock.patch('classroom_admin.tasks.notify_inbox') as notify:
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_message_task(msg.pk)
+        notify.assert_called_once_with([self.user.id])
@@ -1,6 +1,6 @@
 # student_activities/tests/test_serializers.py
 from django.test import TestCase
-from student_activities.serializers import StudentResponseSerializer
+from student_activities.serializers import QuizAttemptSerializer, StudentResponseSerializer
 from django.core.files.uploadedfile import SimpleUploadedFile
 
 class StudentResponseSerializerTests(TestCase):
@@ -27,3 +27,12 @@ class StudentResponseSerializerTests(TestCase):
         self.assertFalse(serializer.is_valid())
         self.assertIn('file_upload', serializer.errors)
 
+
+class QuizAttemptSerializerTests(TestCase):
+    def test_attempt_data_values_must_be_strings(self):
+        serializer = QuizAttemptSerializer(data={'quiz_type': 'pre', 'attempt_data': {"12": ["A"]}})
+        self.assertFalse(serializer.is_valid())
+        self.assertIn('attempt_data', serializer.errors)
+
+        serializer = QuizAttemptSerializer(data={'quiz_type': 'pre', 'attempt_data': {"12": "A"}})
+        self.assertTrue(serializer.is_valid())
@@ -1,7 +1,7 @@
 // src/components/StudentProfileBanner.jsx
 import React, { useState, useEffect } from 'react';
 import { Link } from 'react-router-dom';
-import { fetchInbox } from '../services/api';
+import { fetchUnreadCount, openInboxStream } from '../services/api';
 import './StudentProfileBanner.css';
 
 const StudentProfileBanner = ({ user, onLogout }) => {
@@ -11,13 +11,14 @@ const StudentProfileBanner = ({ user, onLogout }) => {
   useEffect(() => {
     async function loadUnread() {
       try {
-        const msgs = await fetchInbox();
-        setUnreadCount(msgs.filter(m => !m.is_read).length);
+        setUnreadCount(await fetchUnreadCount());
       } catch (err) {
         console.error('Failed to fetch unread count', err);
       }
     }
     loadUnread();
+    // shares the page's inbox stream (e.g. with Inbox) rather than opening its own
+    return openInboxStream(loadUnread);
   }, []);
 
   return (
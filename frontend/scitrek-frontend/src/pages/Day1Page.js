@@ -4,7 +4,7 @@ import { DragDropContext, Droppable, Draggable } from '@hello-pangea/dnd';
 import { Link, useParams } from 'react-router-dom';
 import StudentProfileBanner from '../components/StudentProfileBanner';
 import Popup from '../components/Popup';
-import { getCurrentUser, getResponseDetail, upsertResponse } from '../services/api';
+import { loadDayPage, upsertResponse } from '../services/api';
 
 // -----------------------------------------------------------------------------
 // Pacing Mode (Floating Pacing Dashboard)
@@ -318,18 +318,11 @@ const Day1Page = () => {
     (async () => {
       try {
         setLoading(true);
-        const u = await getCurrentUser();
+        // profile + saved answers in one round trip; data is null when none saved
+        const { user: u, response: data } = await loadDayPage(moduleId);
         if (!isMounted) return;
         setUser(u);
 
-        let data = null;
-        try {
-          data = await getResponseDetail(moduleId);
-        } catch {
-          // treat 404 as no previous answers
-        }
-        if (!isMounted) return;
-
         if (data?.answers) {
           const payload = data.answers.answers || data.answers;
           setAnswersData((prev) => {
@@ -405,7 +398,7 @@ const Day1Page = () => {
     if (saving) return;
     try {
       setSaving(true);
-      await upsertResponse(moduleId, answersData);
+      await upsertResponse(moduleId, answersData, { final: !silent });
       if (!unmountedRef.current) {
         setDirty(false);
         setLastSavedAt(new Date());
@@ -3,7 +3,7 @@ import React, { useEffect, useRef, useState } from 'react';
 import { Link, useParams } from 'react-router-dom';
 import StudentProfileBanner from '../components/StudentProfileBanner';
 import Popup from '../components/Popup';
-import { getCurrentUser, getResponseDetail, upsertResponse } from '../services/api';
+import { loadDayPage, upsertResponse } from '../services/api';
 
 /* ------------------------------ UI helpers -------------------------------- */
 
@@ -242,18 +242,11 @@ const Day2Page = () => {
     setLoading(true);
     (async () => {
       try {
-        const u = await getCurrentUser();
+        // profile + saved answers in one round trip; data is null when none saved
+        const { user: u, response: data } = await loadDayPage(moduleId);
         if (!active) return;
         setUser(u);
 
-        let data = null;
-        try {
-          data = await getResponseDetail(moduleId);
-        } catch {
-          // treat 404 as no previous answers
-        }
-        if (!active) return;
-
         if (data?.answers) {
           const payload = data.answers.answers || data.answers;
           setAnswersData(prev => ({ ...prev, ...payload }));
@@ -273,7 +266,7 @@ const Day2Page = () => {
     if (saving) return;
     try {
       setSaving(true);
-      await upsertResponse(moduleId, answersData);
+      await upsertResponse(moduleId, answersData, { final: !silent });
       if (!unmountedRef.current) {
         setDirty(false);
         setLastSavedAt(new Date());
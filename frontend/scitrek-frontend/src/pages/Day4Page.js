@@ -3,7 +3,7 @@ import React, { useEffect, useRef, useState } from 'react';
 import { Link, useParams } from 'react-router-dom';
 import StudentProfileBanner from '../components/StudentProfileBanner';
 import Popup from '../components/Popup';
-import { getCurrentUser, getResponseDetail, upsertResponse } from '../services/api';
+import { loadDayPage, upsertResponse } from '../services/api';
 
 /* ------------------------------ Config/Data ------------------------------ */
 
@@ -180,18 +180,11 @@ const Day4Page = () => {
     let isMounted = true;
     (async () => {
       try {
-        const u = await getCurrentUser();
+        // profile + saved answers in one round trip; data is null when none saved
+        const { user: u, response: data } = await loadDayPage(moduleId);
         if (!isMounted) return;
         setUser(u);
 
-        let data = null;
-        try {
-          data = await getResponseDetail(moduleId);
-        } catch {
-          // treat 404 as no previous answers
-        }
-        if (!isMounted) return;
-
         if (data?.answers) {
           const payload = data.answers.answers || data.answers;
           setAnswersData(prev => {
@@ -228,7 +221,7 @@ const Day4Page = () => {
     if (saving) return;
     try {
       setSaving(true);
-      await upsertResponse(moduleId, answersData);
+      await upsertResponse(moduleId, answersData, { final: !silent });
       setDirty(false);
       setLastSavedAt(new Date());
       if (!silent) alert('Your work has been saved!');
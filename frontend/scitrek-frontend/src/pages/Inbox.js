@@ -1,7 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import StudentProfileBanner from '../components/StudentProfileBanner';
 import Popup from '../components/Popup';
-import { getCurrentUser, fetchInbox, toggleReadMessage } from '../services/api';
+import { getCurrentUser, fetchInbox, toggleReadMessage, openInboxStream } from '../services/api';
 import './Inbox.css';
 
 const formatDate = dateStr => {
@@ -28,6 +28,15 @@ const Inbox = () => {
         console.error('Failed to load inbox', err);
       }
     })();
+
+    // New deliveries are pushed, so there is no need to poll
+    return openInboxStream(async () => {
+      try {
+        setMessages(await fetchInbox());
+      } catch (err) {
+        console.error('Failed to refresh inbox', err);
+      }
+    });
   }, []);
 
   if (!user) return <div className="loading">Loading…</div>;
@@ -97,6 +97,79 @@ export const fetchInbox = async () => {
   return res.data.results;
 };
 
+// Number of unread messages (for the inbox badge)
+export const fetchUnreadCount = async () => {
+  const res = await api.get('/api/student/inbox/unread-count/');
+  return res.data.unread;
+};
+
+// Live inbox updates (server-sent events). One EventSource is shared by
+// every subscriber on the page. EventSource cannot send headers, so each
+// connection uses a single-use ticket from an authenticated POST; since
+// the browser's own reconnect would replay a spent ticket, errors close
+// the stream and it reconnects with a fresh one.
+const STREAM_RETRY_MS = 5000;
+const inboxListeners = new Set();
+let inboxSource = null;
+let inboxConnecting = false;
+let inboxRetry = null;
+
+const retryInboxStream = () => {
+  inboxConnecting = true;
+  inboxRetry = setTimeout(connectInboxStream, STREAM_RETRY_MS);
+};
+
+const connectInboxStream = async () => {
+  inboxConnecting = true;
+  inboxRetry = null;
+  let ticket;
+  try {
+    const res = await api.post('/api/student/inbox/stream/ticket/');
+    ticket = res.data.ticket;
+  } catch (err) {
+    console.error('Failed to open inbox stream', err);
+    inboxConnecting = false;
+    if (inboxListeners.size) retryInboxStream();
+    return;
+  }
+  inboxConnecting = false;
+  if (!inboxListeners.size) return;
+
+  const source = new EventSource(
+    `${API_BASE_URL}/api/student/inbox/stream/?ticket=${encodeURIComponent(ticket)}`
+  );
+  source.addEventListener('inbox', event => {
+    inboxListeners.forEach(listener => listener(event));
+  });
+  source.onerror = () => {
+    source.close();
+    if (inboxSource !== source) return;
+    inboxSource = null;
+    if (inboxListeners.size) retryInboxStream();
+  };
+  inboxSource = source;
+};
+
+// Calls onChange on every inbox event. Returns the unsubscribe function.
+export const openInboxStream = onChange => {
+  inboxListeners.add(onChange);
+  if (!inboxSource && !inboxConnecting) connectInboxStream();
+
+  return () => {
+    inboxListeners.delete(onChange);
+    if (inboxListeners.size) return;
+    if (inboxRetry) {
+      clearTimeout(inboxRetry);
+      inboxRetry = null;
+      inboxConnecting = false;
+    }
+    if (inboxSource) {
+      inboxSource.close();
+      inboxSource = null;
+    }
+  };
+};
+
 // Toggle read/unread status on a message
 export const toggleReadMessage = async (messageId, isRead) => {
   const res = await api.patch(
@@ -122,15 +195,82 @@ export const fetchModuleDetail = async moduleId => {
 
 // — Student Responses —
 
+// Answers the server last acknowledged, per module, so autosaves can send
+// only what changed (a JSON merge-patch) instead of the whole day's answers
+const savedAnswers = new Map();
+
+// Deep copy, so later in-place edits by a page cannot hide changes
+const snapshot = v => (v === undefined ? v : JSON.parse(JSON.stringify(v)));
+
+const isPlainObject = v => v !== null && typeof v === 'object' && !Array.isArray(v);
+
+// JSON merge-patch (RFC 7386) turning `prev` into `next`; null removes a key
+const answersPatch = (prev, next) => {
+  const patch = {};
+  Object.keys(prev).forEach(key => {
+    if (!(key in next)) patch[key] = null;
+  });
+  Object.entries(next).forEach(([key, value]) => {
+    if (isPlainObject(value) && isPlainObject(prev[key])) {
+      const nested = answersPatch(prev[key], value);
+      if (Object.keys(nested).length) patch[key] = nested;
+    } else if (JSON.stringify(value) !== JSON.stringify(prev[key])) {
+      patch[key] = value;
+    }
+  });
+  return patch;
+};
+
+// Whether an object holds a null value at any depth. A merge-patch reads
+// null as "remove the key", so such answers must be sent whole. Arrays are
+// replaced wholesale by a patch, so nulls inside them do not count.
+const hasNullValue = value =>
+  isPlainObject(value) &&
+  Object.values(value).some(v => v === null || hasNullValue(v));
+
 // Get existing answers for a module
 export const getResponseDetail = moduleId =>
-  api.get(`/api/student/modules/${moduleId}/response/detail/`).then(res => res.data);
+  api.get(`/api/student/modules/${moduleId}/response/detail/`).then(res => {
+    savedAnswers.set(moduleId, snapshot(res.data.answers));
+    return res.data;
+  });
 
-// Create or update answers for a module
-export const upsertResponse = (moduleId, answers) =>
-  api
-    .post(`/api/student/modules/${moduleId}/response/`, { answers })
-    .then(res => res.data);
+// Create or update answers for a module. After the first save only the
+// changed answers are sent, merged server-side. Autosaves may be buffered
+// by the server; pass { final: true } for an explicit save written at once.
+export const upsertResponse = async (moduleId, answers, { final = false } = {}) => {
+  const url = `/api/student/modules/${moduleId}/response/`;
+  const prev = savedAnswers.get(moduleId);
+  let data;
+  if (isPlainObject(prev) && isPlainObject(answers) && !hasNullValue(answers)) {
+    const patch = answersPatch(prev, answers);
+    if (!Object.keys(patch).length && !final) return { answers };
+    data = (await api.patch(url, { answers: patch, final })).data;
+  } else {
+    // first save, or null values a merge-patch cannot express
+    data = (await api.post(url, { answers })).data;
+  }
+  savedAnswers.set(moduleId, snapshot(answers));
+  return { ...data, answers };
+};
+
+// Run several student reads/saves in one request, e.g.
+// [{ op: 'profile' }, { op: 'response', day: 2 }]. Resolves to one
+// { op, status, data } per operation, in order.
+export const runBatch = operations =>
+  api.post('/api/student/batch/', { operations }).then(res => res.data.results);
+
+// Profile and saved answers for a day page; response is null when nothing is saved yet
+export const loadDayPage = async moduleId => {
+  const [profile, response] = await runBatch([
+    { op: 'profile' },
+    { op: 'response', day: moduleId },
+  ]);
+  if (profile.status !== 200) throw new Error(profile.data.detail);
+  if (response.status !== 200) return { user: profile.data, response: null };
+  savedAnswers.set(moduleId, snapshot(response.data.answers));
+  return { user: profile.data, response: response.data };
+};
 
 // — Workbooks —
 